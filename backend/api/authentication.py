@@ -0,0 +1,119 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .caching import bump_version, get_version, is_shared_cache
+
+User = get_user_model()
+
+
+def _version_name(user_id):
+    return f"auth_user:{user_id}"
+
+
+def invalidate_user_tokens(user_id):
+    """Make every process look the user's tokens up again."""
+    bump_version(_version_name(user_id))
+
+
+def _shared_key(key):
+    # Tokens are credentials, keep them out of cache keys
+    return f"auth_token:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def _values(instance):
+    return tuple(
+        getattr(instance, field.attname) for field in instance._meta.concrete_fields
+    )
+
+
+def _from_values(model, values):
+    field_names = [field.attname for field in model._meta.concrete_fields]
+    return model.from_db(DEFAULT_DB_ALIAS, field_names, values)
+
+
+class _LRUCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        expires = time.monotonic() + settings.AUTH_TOKEN_CACHE_TIMEOUT
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.AUTH_TOKEN_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """``TokenAuthentication`` keeping token and user rows in a bounded
+    per-process LRU cache, and with ``AUTH_TOKEN_CACHE_SHARED`` in the
+    Django cache too.
+
+    Entries are checked against a per-user version in the shared cache,
+    which signals bump when a token is deleted, as on logout, or when
+    the user is saved, as on deactivation. Every request then rebuilds
+    fresh instances from the cached rows instead of querying them.
+
+    With a per-process cache a logout in one worker could not reach the
+    others, so tokens are then looked up on every request.
+    """
+
+    local_cache = _LRUCache()
+
+    def authenticate_credentials(self, key):
+        if not is_shared_cache():
+            return super().authenticate_credentials(key)
+        entry = self.local_cache.get(key)
+        if entry is None and settings.AUTH_TOKEN_CACHE_SHARED:
+            entry = cache.get(_shared_key(key))
+        if entry is not None:
+            user_id, cached_version, token_values, user_values = entry
+        else:
+            user_id = (
+                self.get_model()
+                .objects.filter(key=key)
+                .values_list("user_id", flat=True)
+                .first()
+            )
+            if user_id is None:
+                raise AuthenticationFailed("Invalid token.")
+        # Read before the lookup, so a change committed after it bumps the
+        # version past the one cached
+        version = get_version(_version_name(user_id))
+        if entry is not None and cached_version == version:
+            self.local_cache.set(key, entry)
+            token = _from_values(self.get_model(), token_values)
+            token.user = _from_values(User, user_values)
+            return token.user, token
+
+        user, token = super().authenticate_credentials(key)
+        entry = (user.pk, version, _values(token), _values(user))
+        self.local_cache.set(key, entry)
+        if settings.AUTH_TOKEN_CACHE_SHARED:
+            cache.set(_shared_key(key), entry, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+        return user, token
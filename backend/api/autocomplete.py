@@ -0,0 +1,174 @@
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from recipes.models import Ingredient
+
+from .caching import bump_version, get_version
+
+VERSION_NAME = "ingredient_index"
+GRAM_SIZE = 3
+# The breve makes "й" a letter of its own, unlike the diaeresis of "ё"
+KEPT_MARKS = frozenset("\u0306")
+
+
+def fold(value):
+    """Case- and accent-insensitive form of ``value`` used for matching."""
+    decomposed = unicodedata.normalize("NFKD", value.casefold())
+    return unicodedata.normalize(
+        "NFC",
+        "".join(
+            char
+            for char in decomposed
+            if char in KEPT_MARKS or not unicodedata.combining(char)
+        ),
+    )
+
+
+def _grams(value):
+    grams = set()
+    for size in range(1, GRAM_SIZE + 1):
+        for start in range(len(value) - size + 1):
+            grams.add(value[start:start + size])
+    return grams
+
+
+class IngredientIndex:
+    """In-memory prefix and substring index over ingredient names.
+
+    Keys are ``(folded name, id)`` tuples. ``_keys`` holds all of them in
+    order for prefix lookups with bisect; ``_postings`` maps every 1-3
+    character substring to the sorted keys containing it for infix
+    lookups. Each process builds its own copy on first use and rebuilds
+    it when another process bumps the version in the shared cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._keys = []
+        self._postings = {}
+        self._items = {}
+        self._key_by_id = {}
+
+    def _store(self, ingredient_id, name, measurement_unit):
+        key = (fold(name), ingredient_id)
+        self._items[key] = {
+            "id": ingredient_id,
+            "name": name,
+            "measurement_unit": measurement_unit,
+        }
+        self._key_by_id[ingredient_id] = key
+        return key
+
+    def _add(self, ingredient_id, name, measurement_unit):
+        key = self._store(ingredient_id, name, measurement_unit)
+        insort(self._keys, key)
+        for gram in _grams(key[0]):
+            insort(self._postings.setdefault(gram, []), key)
+
+    def _remove(self, ingredient_id):
+        key = self._key_by_id.pop(ingredient_id, None)
+        if key is None:
+            return
+        del self._items[key]
+        self._keys.pop(bisect_left(self._keys, key))
+        for gram in _grams(key[0]):
+            posting = self._postings[gram]
+            posting.pop(bisect_left(posting, key))
+            if not posting:
+                del self._postings[gram]
+
+    def _build(self, version):
+        self._keys = []
+        self._postings = {}
+        self._items = {}
+        self._key_by_id = {}
+        rows = Ingredient.objects.values_list(
+            "id", "name", "measurement_unit__name"
+        ).order_by()
+        for ingredient_id, name, measurement_unit in rows.iterator():
+            key = self._store(ingredient_id, name, measurement_unit)
+            for gram in _grams(key[0]):
+                self._postings.setdefault(gram, []).append(key)
+        self._keys = sorted(self._items)
+        for posting in self._postings.values():
+            posting.sort()
+        self._version = version
+
+    def _ensure_current(self):
+        version = self.get_version()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._build(version)
+
+    def get_version(self):
+        return get_version(VERSION_NAME)
+
+    def invalidate(self):
+        """Make every process rebuild its index on the next search."""
+        bump_version(VERSION_NAME)
+
+    def update(self, ingredient_ids):
+        """Reload the ingredients, dropping the deleted ones."""
+        with self._lock:
+            previous = self._version
+            if previous is not None:
+                for ingredient_id in ingredient_ids:
+                    self._remove(ingredient_id)
+                rows = Ingredient.objects.filter(id__in=ingredient_ids).values_list(
+                    "id", "name", "measurement_unit__name"
+                )
+                for row in rows:
+                    self._add(*row)
+            version = bump_version(VERSION_NAME)
+            # Keep the local copy only if no other process changed it meanwhile
+            if previous is not None and version == previous + 1:
+                self._version = version
+
+    def search(self, query, limit=None):
+        """Return up to ``limit`` ingredients whose name contains ``query``,
+        names starting with it first, each group in alphabetical order."""
+        self._ensure_current()
+        if limit is None:
+            limit = settings.INGREDIENT_AUTOCOMPLETE_LIMIT
+        query = fold(query)
+        # update() changes the lists in place
+        with self._lock:
+            return self._search(query, limit)
+
+    def _search(self, query, limit):
+        keys = self._keys
+        results = []
+        start = bisect_left(keys, (query,))
+        for key in keys[start:start + limit]:
+            if not key[0].startswith(query):
+                break
+            results.append(self._items[key])
+        if not query or len(results) >= limit:
+            return results
+
+        candidates = min(
+            (self._postings.get(gram, ()) for gram in _query_grams(query)), key=len
+        )
+        for key in candidates:
+            if query in key[0] and not key[0].startswith(query):
+                results.append(self._items[key])
+                if len(results) >= limit:
+                    break
+        return results
+
+
+def _query_grams(query):
+    if len(query) <= GRAM_SIZE:
+        return (query,)
+    return (
+        query[start:start + GRAM_SIZE]
+        for start in range(len(query) - GRAM_SIZE + 1)
+    )
+
+
+ingredient_index = IngredientIndex()
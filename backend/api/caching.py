@@ -0,0 +1,68 @@
+import hashlib
+import time
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework.renderers import JSONRenderer
+
+
+def is_shared_cache():
+    """Whether the default cache is seen by every process.
+
+    Per-process backends keep a copy of every version in each worker,
+    management command and service, so a version bumped in one of them
+    never reaches the others.
+    """
+    return not isinstance(caches["default"], (DummyCache, LocMemCache))
+
+
+def get_version(name):
+    """Return the current version of ``name`` kept in the shared cache.
+
+    Versions let every process notice that data it keeps locally or
+    under versioned cache keys went stale, without deleting anything.
+    They start from the current time, so a version evicted from the
+    cache never comes back with a value that was used before.
+    """
+    return cache.get_or_set(f"{name}:version", time.time_ns, timeout=None)
+
+
+def bump_version(name):
+    try:
+        return cache.incr(f"{name}:version")
+    except ValueError:
+        version = time.time_ns()
+        cache.set(f"{name}:version", version, timeout=None)
+        return version
+
+
+def make_etag(data):
+    return f'"{hashlib.sha1(JSONRenderer().render(data)).hexdigest()}"'
+
+
+def is_not_modified(request, etag, last_modified=None):
+    """Check the request validators against the current representation.
+
+    As in RFC 7232, If-Modified-Since is ignored when If-None-Match is
+    present.
+    """
+    if "If-None-Match" in request.headers:
+        etags = parse_etags(request.headers["If-None-Match"])
+        return "*" in etags or etag in etags
+    if last_modified is not None:
+        if_modified_since = parse_http_date_safe(
+            request.headers.get("If-Modified-Since", "")
+        )
+        return (
+            if_modified_since is not None
+            and int(last_modified.timestamp()) <= if_modified_since
+        )
+    return False
+
+
+def set_validators(response, etag, last_modified=None):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
@@ -0,0 +1,21 @@
+from django.core import checks
+
+from .caching import is_shared_cache
+
+
+@checks.register()
+def shared_cache_check(app_configs, **kwargs):
+    if is_shared_cache():
+        return []
+    return [
+        checks.Warning(
+            "The default cache is kept per process.",
+            hint=(
+                "Cached ingredients, tags, shopping carts, feeds and tokens "
+                "are only invalidated in the process that changed them. "
+                "Set CACHE_BACKEND and CACHE_LOCATION to a shared cache such "
+                "as Redis when running more than one process."
+            ),
+            id="api.W001",
+        )
+    ]
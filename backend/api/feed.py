@@ -0,0 +1,185 @@
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from recipes.models import Recipe
+
+User = get_user_model()
+
+Entry = namedtuple("Entry", ("created", "id"))
+
+
+def _key(entry):
+    # Descending order of the feed: newest first, then lowest id, as in
+    # RecipePagination
+    return (entry.created, -entry.id)
+
+
+def _newest_first(entries):
+    return sorted(entries, key=_key, reverse=True)
+
+
+def _timeline_key(user_id):
+    return f"feed:timeline:{user_id}"
+
+
+def _follower_count_key(author_id):
+    return f"feed:followers:{author_id}"
+
+
+def _count_followers(author_ids):
+    counts = dict.fromkeys(author_ids, 0)
+    counts.update(
+        User.followed_to.through.objects.filter(to_user__in=author_ids)
+        .values_list("to_user")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    cache.set_many(
+        {_follower_count_key(author_id): count for author_id, count in counts.items()},
+        settings.FEED_FOLLOWER_COUNT_TIMEOUT,
+    )
+    return counts
+
+
+def get_follower_counts(author_ids):
+    """Return follower counts of the authors, cached for a while since
+    they only decide whether an author is fanned out."""
+    keys = {_follower_count_key(author_id): author_id for author_id in author_ids}
+    counts = {keys[key]: count for key, count in cache.get_many(keys).items()}
+    missing = set(author_ids) - counts.keys()
+    if missing:
+        counts.update(_count_followers(missing))
+    return counts
+
+
+def followers_changed(deltas):
+    """Recount the followers of authors whose counts changed by
+    ``deltas``. Followers of an author who moved between being fanned
+    out and being merged in lose their timelines, which miss or hold the
+    author's recipes by the old rule."""
+    counts = _count_followers(deltas)
+    crossed = [
+        author_id
+        for author_id, count in counts.items()
+        if _is_fanned_out(count) != _is_fanned_out(count - deltas[author_id])
+    ]
+    if crossed:
+        invalidate_timelines(
+            User.followed_to.through.objects.filter(to_user__in=crossed)
+            .values_list("from_user", flat=True)
+            .distinct()
+        )
+
+
+def _is_fanned_out(count):
+    return count <= settings.FEED_FANOUT_MAX_FOLLOWERS
+
+
+def _query(author_ids, after, limit):
+    queryset = Recipe.objects.filter(author__in=author_ids)
+    if after is not None:
+        queryset = queryset.filter(
+            Q(created__lt=after.created) | Q(created=after.created, id__gt=after.id)
+        )
+    return [
+        Entry(*row)
+        for row in queryset.order_by("-created", "id").values_list("created", "id")[
+            :limit
+        ]
+    ]
+
+
+def _get_timeline(user_id, author_ids):
+    """Return the cached timeline of the user, built from the database
+    for ``author_ids`` if it expired.
+
+    Timelines expire ``FEED_TIMELINE_TIMEOUT`` after they were built,
+    however often they are read or fanned out to.
+    """
+    key = _timeline_key(user_id)
+    timeline = cache.get(key)
+    if timeline is None or timeline["expires"] <= time.time():
+        size = settings.FEED_TIMELINE_SIZE
+        entries = _query(author_ids, None, size + 1)
+        timeline = {
+            "entries": entries[:size],
+            "complete": len(entries) <= size,
+            "authors": frozenset(author_ids),
+            "expires": time.time() + settings.FEED_TIMELINE_TIMEOUT,
+        }
+        cache.set(key, timeline, settings.FEED_TIMELINE_TIMEOUT)
+    return timeline
+
+
+def get_feed(user_id, followed, after, limit):
+    """Return up to ``limit`` entries of recipes by the ``followed``
+    authors that come after the ``after`` entry, newest first.
+
+    Recipes of authors with up to ``FEED_FANOUT_MAX_FOLLOWERS`` are read
+    from the user's materialized timeline, the database serves pages
+    past its end. Recipes of authors with more followers are never
+    fanned out and are merged in from the database, as are those of
+    fanned out authors the timeline was not built for.
+    """
+    counts = get_follower_counts(followed)
+    fanned_out = [
+        author_id for author_id in followed if _is_fanned_out(counts[author_id])
+    ]
+    timeline = _get_timeline(user_id, fanned_out)
+    covered = [
+        author_id for author_id in fanned_out if author_id in timeline["authors"]
+    ]
+    merged = [author_id for author_id in followed if author_id not in covered]
+
+    entries = [
+        entry
+        for entry in timeline["entries"]
+        if after is None or _key(entry) < _key(after)
+    ][:limit]
+    if len(entries) < limit and not timeline["complete"]:
+        entries += _query(
+            covered, entries[-1] if entries else after, limit - len(entries)
+        )
+    if merged:
+        entries += _query(merged, after, limit)
+    # Recipes of authors no longer fanned out can come from both
+    return _newest_first(set(entries))[:limit]
+
+
+def fan_out(author_id, entries):
+    """Add new recipes of the author to the timelines of followers that
+    have one cached.
+
+    Timelines are updated without locking, an entry lost to a
+    concurrent fan-out is back once the timeline expires.
+    """
+    if not _is_fanned_out(get_follower_counts((author_id,))[author_id]):
+        return
+    followers = User.followed_to.through.objects.filter(to_user=author_id).values_list(
+        "from_user", flat=True
+    )
+    keys = [_timeline_key(follower) for follower in followers]
+    now = time.time()
+    timelines = {
+        key: timeline
+        for key, timeline in cache.get_many(keys).items()
+        if timeline["expires"] > now and author_id in timeline["authors"]
+    }
+    if not timelines:
+        return
+    for timeline in timelines.values():
+        timeline["entries"] = _newest_first(set(timeline["entries"]).union(entries))
+        if len(timeline["entries"]) > settings.FEED_TIMELINE_SIZE:
+            del timeline["entries"][settings.FEED_TIMELINE_SIZE:]
+            timeline["complete"] = False
+    expires = max(timeline["expires"] for timeline in timelines.values())
+    cache.set_many(timelines, int(expires - now) + 1)
+
+
+def invalidate_timelines(user_ids):
+    cache.delete_many([_timeline_key(user_id) for user_id in user_ids])
@@ -0,0 +1,69 @@
+import uuid
+
+from django.core.files.uploadedfile import UploadedFile
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from recipes.renditions import rendition_urls
+
+# Pillow format names of Base64ImageField.ALLOWED_TYPES
+UPLOAD_FORMATS = {"JPEG": "jpg", "PNG": "png", "GIF": "gif"}
+
+
+def read_image_format(file):
+    """Return the Pillow format name of the image in ``file`` or ``None``.
+
+    Only the header is parsed, pixel data is never decoded.
+    """
+    try:
+        with Image.open(file) as image:
+            return image.format
+    except (OSError, Image.DecompressionBombError):
+        return None
+    finally:
+        file.seek(0)
+
+
+class ImageUploadField(Base64ImageField):
+    """Image sent either as a base64 string or as a multipart file.
+
+    Uploaded files are checked by reading the image header only and are
+    passed on as is, so a file spooled to disk by the upload handlers is
+    moved into storage instead of being decoded and copied in memory.
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, UploadedFile):
+            return super().to_internal_value(data)
+        image_format = read_image_format(data)
+        if image_format is None:
+            raise ValidationError(self.INVALID_FILE_MESSAGE)
+        if image_format not in UPLOAD_FORMATS:
+            raise ValidationError(self.INVALID_TYPE_MESSAGE)
+        data.name = f"{uuid.uuid4()}.{UPLOAD_FORMATS[image_format]}"
+        return data
+
+
+class ImageRenditionsField(serializers.Field):
+    """URLs of the resized variants of an image by variant name.
+
+    The URLs are derived from the image name, missing variants are
+    generated when first requested.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get("request")
+        urls = rendition_urls(value.name)
+        if request is None:
+            return urls
+        return {
+            variant: request.build_absolute_uri(url) for variant, url in urls.items()
+        }
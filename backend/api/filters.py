@@ -1,15 +1,13 @@
 from django import forms
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
+from rest_framework.filters import OrderingFilter
 
-from recipes.models import Ingredient, Recipe
+from recipes.models import Recipe, Tag
+from recipes.search import search_recipes
 
-
-class IngredientFilter(filters.FilterSet):
-    name = filters.CharFilter(field_name="name", lookup_expr="istartswith")
-
-    class Meta:
-        model = Ingredient
-        fields = ("name",)
+from .reference import get_ids_by_slug
+from .relations import get_viewer_relations
 
 
 class NonValidatingMultipleChoiceField(forms.MultipleChoiceField):
@@ -17,25 +15,74 @@ class NonValidatingMultipleChoiceField(forms.MultipleChoiceField):
         pass
 
 
-class CustomFilter(filters.AllValuesMultipleFilter):
+def filter_by_tags(queryset, slugs, recipe_field="pk"):
+    """Keep recipes with any of the tags, unknown slugs match nothing.
+
+    Slugs are resolved from the cached slug map and matched with a
+    semi-join on the through table, so the tags table is not joined and
+    recipes with several of the tags are not repeated.
+    """
+    ids_by_slug = get_ids_by_slug(Tag)
+    tag_ids = {ids_by_slug[slug] for slug in slugs if slug in ids_by_slug}
+    if not tag_ids:
+        return queryset.none()
+    return queryset.filter(
+        Exists(
+            Recipe.tags.through.objects.filter(
+                recipe=OuterRef(recipe_field), tag__in=tag_ids
+            )
+        )
+    )
+
+
+class TagFilter(filters.Filter):
     field_class = NonValidatingMultipleChoiceField
 
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        return filter_by_tags(qs, value)
+
 
 class RecipeFilter(filters.FilterSet):
-    tags = CustomFilter(field_name="tags__slug")
+    tags = TagFilter()
     is_favorited = filters.BooleanFilter(method="get_favorite")
     is_in_shopping_cart = filters.BooleanFilter(method="get_in_shopping_cart")
+    search = filters.CharFilter(method="get_search")
 
     def get_favorite(self, queryset, name, value):
         if value:
-            return queryset.filter(in_favourites=self.request.user)
+            return get_viewer_relations(self.request).favourites.filter(queryset)
         return queryset
 
     def get_in_shopping_cart(self, queryset, name, value):
         if value:
-            return queryset.filter(in_shopping_list=self.request.user)
+            return get_viewer_relations(self.request).shopping_list.filter(queryset)
         return queryset
 
+    def get_search(self, queryset, name, value):
+        # Ranked by relevance unless ?ordering= is given
+        return search_recipes(queryset, value)
+
     class Meta:
         model = Recipe
         fields = ("tags", "author")
+
+
+class RecipeOrderingFilter(OrderingFilter):
+    """``?ordering=`` on the view's ``ordering_fields``; ties are broken
+    by the default ``(-created, id)`` order to match the indexes."""
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        ordered = {field.lstrip("-") for field in ordering}
+        return [
+            *ordering,
+            *(
+                field
+                for field in ("-created", "id")
+                if field.lstrip("-") not in ordered
+            ),
+        ]
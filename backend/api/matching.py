@@ -0,0 +1,190 @@
+import threading
+from collections import defaultdict
+
+from recipes.models import Recipe, RecipeIngredientEntry
+
+from .caching import bump_version, get_version
+
+VERSION_NAME = "recipe_match_index"
+# Bitmaps are split into chunks of this many recipe ids, only chunks with
+# a recipe in them are stored
+CHUNK_BITS = 4096
+
+
+def _set(bitmap, recipe_id):
+    chunk, bit = divmod(recipe_id, CHUNK_BITS)
+    bitmap[chunk] = bitmap.get(chunk, 0) | 1 << bit
+
+
+def _clear(bitmaps, key, recipe_id):
+    bitmap = bitmaps[key]
+    chunk, bit = divmod(recipe_id, CHUNK_BITS)
+    bits = bitmap.get(chunk, 0) & ~(1 << bit)
+    if bits:
+        bitmap[chunk] = bits
+    else:
+        bitmap.pop(chunk, None)
+    if not bitmap:
+        del bitmaps[key]
+
+
+def _ids(chunk, bits):
+    while bits:
+        lowest = bits & -bits
+        yield chunk * CHUNK_BITS + lowest.bit_length() - 1
+        bits ^= lowest
+
+
+def _count(bitmaps):
+    """Add up ``bitmaps`` bit by bit into a binary counter per position,
+    returned as planes: bit i of every position's count is in plane i."""
+    planes = []
+    for carry in bitmaps:
+        for index, plane in enumerate(planes):
+            planes[index] = plane ^ carry
+            carry &= plane
+            if not carry:
+                break
+        else:
+            if carry:
+                planes.append(carry)
+    return planes
+
+
+def _at_least(planes, threshold):
+    """Return the positions whose count in ``planes`` is at least the
+    positive ``threshold``."""
+    if threshold.bit_length() > len(planes):
+        return 0
+    greater, equal = 0, -1
+    for index in reversed(range(len(planes))):
+        if threshold >> index & 1:
+            equal &= planes[index]
+        else:
+            greater |= equal & planes[index]
+            equal &= ~planes[index]
+    return greater | equal
+
+
+class RecipeMatchIndex:
+    """In-memory inverted index from ingredients to the recipes using
+    them, for matching recipes against the ingredients a user has.
+
+    ``_postings`` maps every ingredient id to a bitmap of recipe ids and
+    ``_sizes`` maps ingredient counts to bitmaps of the recipes with that
+    many ingredients. A bitmap is a dict of chunk number to an int with a
+    bit set per recipe. Like the ingredient autocomplete index, each
+    process builds its own copy on first use and rebuilds it when another
+    process bumps the version in the shared cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._recipes = {}
+        self._postings = {}
+        self._sizes = {}
+
+    def _add(self, recipe_id, created, ingredient_ids):
+        ingredient_ids = frozenset(ingredient_ids)
+        # Newest first, then lowest id, as in recipe lists
+        self._recipes[recipe_id] = ((-created.timestamp(), recipe_id), ingredient_ids)
+        for ingredient_id in ingredient_ids:
+            _set(self._postings.setdefault(ingredient_id, {}), recipe_id)
+        _set(self._sizes.setdefault(len(ingredient_ids), {}), recipe_id)
+
+    def _remove(self, recipe_id):
+        recipe = self._recipes.pop(recipe_id, None)
+        if recipe is None:
+            return
+        ingredient_ids = recipe[1]
+        for ingredient_id in ingredient_ids:
+            _clear(self._postings, ingredient_id, recipe_id)
+        _clear(self._sizes, len(ingredient_ids), recipe_id)
+
+    def _load(self, recipe_ids=None):
+        recipes = Recipe.objects.order_by()
+        entries = RecipeIngredientEntry.objects.order_by()
+        if recipe_ids is not None:
+            recipes = recipes.filter(id__in=recipe_ids)
+            entries = entries.filter(recipe__in=recipe_ids)
+        ingredients = defaultdict(list)
+        rows = entries.values_list("recipe_id", "ingredient_id")
+        for recipe_id, ingredient_id in rows.iterator():
+            ingredients[recipe_id].append(ingredient_id)
+        for recipe_id, created in recipes.values_list("id", "created").iterator():
+            self._add(recipe_id, created, ingredients[recipe_id])
+
+    def _build(self, version):
+        self._recipes = {}
+        self._postings = {}
+        self._sizes = {}
+        self._load()
+        self._version = version
+
+    def _ensure_current(self):
+        version = self.get_version()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._build(version)
+
+    def get_version(self):
+        return get_version(VERSION_NAME)
+
+    def invalidate(self):
+        """Make every process rebuild its index on the next match."""
+        bump_version(VERSION_NAME)
+
+    def update(self, recipe_ids):
+        """Reload the recipes, dropping the deleted ones."""
+        with self._lock:
+            previous = self._version
+            if previous is not None:
+                for recipe_id in recipe_ids:
+                    self._remove(recipe_id)
+                self._load(recipe_ids)
+            version = bump_version(VERSION_NAME)
+            # Keep the local copy only if no other process changed it meanwhile
+            if previous is not None and version == previous + 1:
+                self._version = version
+
+    def match(self, have, missing_max=None):
+        """Return ``(recipe id, missing ingredient count)`` pairs of the
+        recipes using every ingredient in ``have``, or, if ``missing_max``
+        is given, of the recipes using at least one of them and at most
+        ``missing_max`` others. Fewest missing first, then newest first.
+        """
+        self._ensure_current()
+        have = frozenset(have)
+        with self._lock:
+            postings = [self._postings.get(ingredient_id, {}) for ingredient_id in have]
+            if not postings:
+                return []
+            matched = {}
+            if missing_max is None:
+                for chunk, bits in min(postings, key=len).items():
+                    for posting in postings:
+                        bits &= posting.get(chunk, 0)
+                    if bits:
+                        matched[chunk] = bits
+            else:
+                for chunk in set().union(*postings):
+                    bitmaps = [posting.get(chunk, 0) for posting in postings]
+                    planes = _count(bitmaps)
+                    bits = 0
+                    for size, recipes in self._sizes.items():
+                        threshold = max(size - missing_max, 1)
+                        bits |= recipes.get(chunk, 0) & _at_least(planes, threshold)
+                    if bits:
+                        matched[chunk] = bits
+            results = []
+            for chunk, bits in matched.items():
+                for recipe_id in _ids(chunk, bits):
+                    order, ingredient_ids = self._recipes[recipe_id]
+                    results.append((len(ingredient_ids - have), order))
+        results.sort()
+        return [(recipe_id, missing) for missing, (_, recipe_id) in results]
+
+
+recipe_match_index = RecipeMatchIndex()
@@ -0,0 +1,187 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.db import connection
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (1000, 10000, 100000, 1000000, 10000000)
+
+# Name, help and buckets of the histograms kept per route and method
+HISTOGRAMS = (
+    ("request_duration_seconds", "Time spent handling requests.", DURATION_BUCKETS),
+    ("db_queries", "SQL queries run per request.", QUERY_BUCKETS),
+    ("db_duration_seconds", "Time spent in SQL queries.", DURATION_BUCKETS),
+    (
+        "serialize_duration_seconds",
+        "Time spent in serializers, including the queries they run.",
+        DURATION_BUCKETS,
+    ),
+    ("render_duration_seconds", "Time spent rendering responses.", DURATION_BUCKETS),
+    ("response_size_bytes", "Size of non-streaming response bodies.", SIZE_BUCKETS),
+)
+PREFIX = "foodgram_"
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+        self.render = 0.0
+        self.serializing = False
+
+    def execute(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+            self.queries += 1
+
+
+class MeasuredSerializerMixin:
+    """Adds the time spent representing instances to the request metrics.
+    Only the outermost serializer is measured."""
+
+    def to_representation(self, instance):
+        metrics = _current.get()
+        if metrics is None or metrics.serializing:
+            return super().to_representation(instance)
+        metrics.serializing = True
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serialize += time.perf_counter() - start
+            metrics.serializing = False
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    """Histograms of the requests served by this process, each worker
+    process keeps its own."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def observe(self, route, method, values):
+        with self._lock:
+            for (name, _, buckets), value in zip(HISTOGRAMS, values):
+                if value is None:
+                    continue
+                key = (name, route, method)
+                if key not in self._histograms:
+                    self._histograms[key] = _Histogram(buckets)
+                self._histograms[key].observe(value)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self):
+        """Return the histograms in the Prometheus text format."""
+        with self._lock:
+            histograms = sorted(
+                (key, histogram.counts[:], histogram.sum)
+                for key, histogram in self._histograms.items()
+            )
+        lines = []
+        for name, description, buckets in HISTOGRAMS:
+            lines.append(f"# HELP {PREFIX}{name} {description}")
+            lines.append(f"# TYPE {PREFIX}{name} histogram")
+            for (key_name, route, method), counts, total in histograms:
+                if key_name != name:
+                    continue
+                labels = f'route="{_escape(route)}",method="{method}"'
+                cumulative = 0
+                for bound, count in zip((*buckets, "+Inf"), counts):
+                    cumulative += count
+                    lines.append(
+                        f'{PREFIX}{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+                    )
+                lines.append(f"{PREFIX}{name}_sum{{{labels}}} {total}")
+                lines.append(f"{PREFIX}{name}_count{{{labels}}} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = Registry()
+
+
+def _route(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match is not None else "unmatched"
+
+
+class MetricsMiddleware:
+    """Records per route query counts, database, serializer and render
+    time and response sizes, and reports them in a Server-Timing header.
+
+    Queries run while a streaming response is consumed are not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(metrics.execute):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - start
+
+        size = None if response.streaming else len(response.content)
+        registry.observe(
+            _route(request),
+            request.method,
+            (
+                total,
+                metrics.queries,
+                metrics.db,
+                metrics.serialize,
+                metrics.render,
+                size,
+            ),
+        )
+        response["Server-Timing"] = ", ".join(
+            (
+                f'db;dur={metrics.db * 1000:.1f};desc="{metrics.queries} queries"',
+                f"serialize;dur={metrics.serialize * 1000:.1f}",
+                f"render;dur={metrics.render * 1000:.1f}",
+                f"total;dur={total * 1000:.1f}",
+            )
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        metrics = _current.get()
+        start = time.perf_counter()
+
+        def rendered(response):
+            metrics.render += time.perf_counter() - start
+
+        response.add_post_render_callback(rendered)
+        return response
@@ -1,6 +1,149 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .feed import Entry
 
 
 class PageNumberLimitPagination(pagination.PageNumberPagination):
     page_size_query_param = "limit"
     max_page_size = 50
+
+
+class RecipePagination(PageNumberLimitPagination):
+    """Page number pagination with an opt-in keyset mode.
+
+    ``?pagination=cursor`` or ``?cursor=<token>`` switches to pages keyed
+    on ``(-created, id)``: no ``COUNT(*)`` and no OFFSET scan, only
+    opaque ``next``/``previous`` links. ``?ordering=`` and the relevance
+    order of ``?search=`` do not apply to keyset pages.
+    """
+
+    cursor_query_param = "cursor"
+    mode_query_param = "pagination"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = (
+            self.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param) == "cursor"
+        )
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        created, pk, reverse = self.decode_cursor(request)
+
+        if reverse:
+            queryset = queryset.order_by("created", "-id")
+            if created is not None:
+                queryset = queryset.filter(
+                    Q(created__gt=created) | Q(created=created, id__lt=pk)
+                )
+        else:
+            queryset = queryset.order_by("-created", "id")
+            if created is not None:
+                queryset = queryset.filter(
+                    Q(created__lt=created) | Q(created=created, id__gt=pk)
+                )
+
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = created is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, created is not None
+        self.first, self.last = (results[0], results[-1]) if results else (None, None)
+        return results
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, None, False
+        try:
+            tokens = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            created = parse_datetime(tokens["c"])
+            if created is None:
+                raise ValueError
+            return created, int(tokens["i"]), bool(tokens.get("r"))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, recipe, reverse):
+        tokens = {"c": recipe.created.isoformat(), "i": recipe.id}
+        if reverse:
+            tokens["r"] = 1
+        encoded = urlsafe_b64encode(json.dumps(tokens).encode("ascii")).decode("ascii")
+        url = remove_query_param(self.base_url, self.mode_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next or self.last is None:
+            return None
+        return self.encode_cursor(self.last, reverse=False)
+
+    def get_previous_link(self):
+        if not self.cursor_mode:
+            return super().get_previous_link()
+        if not self.has_previous or self.first is None:
+            return None
+        return self.encode_cursor(self.first, reverse=True)
+
+    def get_page_metadata(self):
+        metadata = {}
+        if not self.cursor_mode:
+            metadata["count"] = self.page.paginator.count
+        metadata["next"] = self.get_next_link()
+        metadata["previous"] = self.get_previous_link()
+        return metadata
+
+    def get_paginated_response(self, data):
+        return Response({**self.get_page_metadata(), "results": data})
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Keyset pagination cursor.",
+                "schema": {"type": "string"},
+            },
+        ]
+
+
+class FeedPagination(RecipePagination):
+    """Keyset pages of the followed authors feed, see ``api.feed``.
+
+    The feed is merged from several sources, so pages only go forward
+    and ``previous`` is always null.
+    """
+
+    def paginate_feed(self, request, get_entries):
+        """Return the page of entries ``get_entries(after, limit)`` gives
+        for the request cursor."""
+        self.cursor_mode = True
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        created, pk, reverse = self.decode_cursor(request)
+        if reverse:
+            raise NotFound(self.invalid_cursor_message)
+        after = None if created is None else Entry(created, pk)
+        entries = get_entries(after, page_size + 1)
+        self.has_next, self.has_previous = len(entries) > page_size, False
+        entries = entries[:page_size]
+        self.first, self.last = (entries[0], entries[-1]) if entries else (None, None)
+        return entries
@@ -0,0 +1,40 @@
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+
+class MultiPartData(dict):
+    # DRF merges the files into a copy of the data with update(), a
+    # MultiValueDict has to go through items() to give single files
+    def copy(self):
+        return MultiPartData(self)
+
+    def update(self, other):
+        super().update(other.items())
+
+
+class MultiPartJSONParser(MultiPartParser):
+    """multipart/form-data for endpoints that also take nested data.
+
+    Fields listed in the view's ``multipart_json_fields`` hold a JSON
+    list or are repeated once per item, like ``tags=1&tags=2``; other
+    repeated fields become lists.
+    Files are streamed by the ``FILE_UPLOAD_HANDLERS``.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        result = super().parse(stream, media_type, parser_context)
+        json_fields = getattr(parser_context.get("view"), "multipart_json_fields", ())
+        data = MultiPartData()
+        for key, values in result.data.lists():
+            if key in json_fields and len(values) == 1:
+                try:
+                    value = json.loads(values[0])
+                except ValueError as error:
+                    raise ParseError(f"{key} must be JSON: {error}")
+                # A single repeated item, e.g. tags=4
+                data[key] = value if isinstance(value, list) else values
+            else:
+                data[key] = values[0] if len(values) == 1 else values
+        return DataAndFiles(data, result.files)
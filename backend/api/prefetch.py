@@ -0,0 +1,140 @@
+from functools import lru_cache
+
+from django.db.models import Prefetch, prefetch_related_objects
+from rest_framework import serializers
+
+
+class _Node:
+    """Relations of one model that a serializer walks through.
+
+    ``selected`` holds single-valued relations (joined with
+    ``select_related``), ``prefetched`` holds multi-valued ones
+    (loaded with a separate ``Prefetch`` query per page).
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.selected = {}
+        self.prefetched = {}
+
+    def child(self, field):
+        related_model = field.related_model
+        if field.many_to_many or field.one_to_many:
+            children = self.prefetched
+        else:
+            children = self.selected
+        name = _accessor_name(field)
+        if name not in children:
+            children[name] = _Node(related_model)
+        return children[name]
+
+
+def _accessor_name(field):
+    if field.auto_created and not field.concrete:
+        return field.get_accessor_name()
+    return field.name
+
+
+def _get_relation(model, attr):
+    for field in model._meta.get_fields():
+        if field.is_relation and _accessor_name(field) == attr:
+            return field
+    return None
+
+
+def _unwrap(field):
+    if isinstance(field, serializers.ListSerializer):
+        return field.child
+    if isinstance(field, serializers.ManyRelatedField):
+        return field.child_relation
+    return field
+
+
+def _walk(serializer, node):
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        nested = _unwrap(field)
+        if field.source == "*":
+            if isinstance(nested, serializers.BaseSerializer):
+                _walk(nested, node)
+            continue
+
+        current = node
+        relation = None
+        for attr in field.source_attrs:
+            relation = _get_relation(current.model, attr)
+            if relation is None:
+                break
+            if (
+                isinstance(nested, serializers.PrimaryKeyRelatedField)
+                and not relation.many_to_many
+                and relation.concrete
+            ):
+                # The primary key is already on the row, nothing to join
+                break
+            current = current.child(relation)
+
+        if relation is not None and isinstance(nested, serializers.BaseSerializer):
+            _walk(nested, current)
+
+
+@lru_cache(maxsize=None)
+def get_plan(serializer_class):
+    """Return the relation tree rendered by ``serializer_class``.
+
+    The tree only depends on the declared fields, so it is built once
+    per serializer class and reused for every request.
+    """
+    model = getattr(getattr(serializer_class, "Meta", None), "model", None)
+    if model is None:
+        return None
+    node = _Node(model)
+    _walk(serializer_class(), node)
+    return node
+
+
+def _lookups(node, prefix=""):
+    select_related = []
+    prefetch_related = []
+    for name, child in node.selected.items():
+        path = f"{prefix}{name}"
+        select_related.append(path)
+        child_select, child_prefetch = _lookups(child, f"{path}__")
+        select_related.extend(child_select)
+        prefetch_related.extend(child_prefetch)
+    for name, child in node.prefetched.items():
+        queryset = apply_plan(child.model._default_manager.all(), child)
+        prefetch_related.append(Prefetch(f"{prefix}{name}", queryset=queryset))
+    return select_related, prefetch_related
+
+
+def apply_plan(queryset, node):
+    select_related, prefetch_related = _lookups(node)
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    return queryset.prefetch_related(*prefetch_related)
+
+
+def optimize_queryset(queryset, serializer_class):
+    """Add the joins and prefetches ``serializer_class`` needs to render
+    every object of ``queryset`` with a fixed number of queries."""
+    plan = get_plan(serializer_class)
+    if plan is None or not issubclass(queryset.model, plan.model):
+        return queryset
+    return apply_plan(queryset, plan)
+
+
+def prefetch_for(instances, serializer_class):
+    """Run the prefetches of ``serializer_class`` on already fetched
+    ``instances``, e.g. a page loaded without them."""
+    plan = get_plan(serializer_class)
+    if plan is not None:
+        prefetch_related_objects(instances, *_lookups(plan)[1])
+
+
+class SerializerPrefetchMixin:
+    """Plans ``get_queryset`` lookups from the view's serializer class."""
+
+    def get_queryset(self):
+        return optimize_queryset(super().get_queryset(), self.get_serializer_class())
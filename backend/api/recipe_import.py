@@ -0,0 +1,307 @@
+import csv
+import json
+import os
+import uuid
+from itertools import islice
+
+from django.conf import settings
+from django.core.files import File
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from recipes.models import Ingredient, Recipe, RecipeIngredientEntry, Tag
+from recipes.search import index_recipes
+
+from .feed import Entry, fan_out
+from .fields import UPLOAD_FORMATS, read_image_format
+from .matching import recipe_match_index
+from .serializers import RecipeImportSerializer
+
+CSV_LIST_SEPARATOR = ";"
+CSV_INGREDIENT_SEPARATOR = "|"
+LOOKUP_CHUNK_SIZE = 500
+
+
+def read_ndjson(lines):
+    """Yield ``(line number, errors, row)`` for every non-blank line."""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            yield number, {"non_field_errors": [f"Invalid JSON: {error}"]}, line
+            continue
+        yield number, None, row
+
+
+def _split(value, separator):
+    return [item.strip() for item in (value or "").split(separator) if item.strip()]
+
+
+def read_csv(lines):
+    """Yield ``(line number, errors, row)`` for every CSV record.
+
+    ``tags`` holds slugs or names separated by ``;``, ``ingredients``
+    holds ``name|measurement unit|amount`` triples separated by ``;``.
+    """
+    reader = csv.DictReader(lines)
+    for row in reader:
+        number = reader.line_num
+        ingredients = []
+        for item in _split(row.get("ingredients"), CSV_LIST_SEPARATOR):
+            parts = [part.strip() for part in item.split(CSV_INGREDIENT_SEPARATOR)]
+            if len(parts) != 3:
+                yield number, {
+                    "ingredients": [f"Expected name|measurement unit|amount: {item}"]
+                }, row
+                break
+            ingredients.append(
+                {"name": parts[0], "measurement_unit": parts[1], "amount": parts[2]}
+            )
+        else:
+            row["tags"] = _split(row.get("tags"), CSV_LIST_SEPARATOR)
+            row["ingredients"] = ingredients
+            yield number, None, row
+
+
+READERS = {"ndjson": read_ndjson, "csv": read_csv}
+
+
+def guess_format(file_name):
+    return "csv" if file_name.lower().endswith(".csv") else "ndjson"
+
+
+class _Images:
+    """Stores every referenced image once, rows sharing an image share
+    the stored file.
+
+    Images are checked by their header and stored under random names,
+    so a file named ``evil.html`` is never served as such.
+    """
+
+    def __init__(self):
+        self.extensions = {}
+        self.stored = {}
+
+    def check(self, path):
+        """Return why the image at ``path`` can't be imported or ``None``."""
+        if path in self.extensions:
+            return None
+        if not self.exists(path):
+            return f"Image not found: {path}"
+        image_format = self.read_format(path)
+        if image_format not in UPLOAD_FORMATS:
+            return f"Not a JPEG, PNG or GIF image: {path}"
+        self.extensions[path] = UPLOAD_FORMATS[image_format]
+        return None
+
+    def save(self, path, field_file):
+        if path in self.stored:
+            field_file.name = self.stored[path]
+            return
+        self.store(path, f"{uuid.uuid4()}.{self.extensions[path]}", field_file)
+        self.stored[path] = field_file.name
+
+
+class DirectoryImages(_Images):
+    """Images referenced by paths relative to a directory."""
+
+    def __init__(self, root):
+        super().__init__()
+        self.root = os.path.realpath(root)
+
+    def _resolve(self, path):
+        full_path = os.path.realpath(os.path.join(self.root, path))
+        if os.path.commonpath((self.root, full_path)) != self.root:
+            return None
+        return full_path
+
+    def exists(self, path):
+        full_path = self._resolve(path)
+        return full_path is not None and os.path.isfile(full_path)
+
+    def read_format(self, path):
+        with open(self._resolve(path), "rb") as image:
+            return read_image_format(image)
+
+    def store(self, path, name, field_file):
+        with open(self._resolve(path), "rb") as image:
+            field_file.save(name, File(image), save=False)
+
+
+class UploadedImages(_Images):
+    """Images uploaded along with the data file, referenced by file name."""
+
+    def __init__(self, files):
+        super().__init__()
+        self.files = {file.name: file for file in files}
+
+    def exists(self, path):
+        return path in self.files
+
+    def read_format(self, path):
+        return read_image_format(self.files[path])
+
+    def store(self, path, name, field_file):
+        # Uploads spooled to disk are moved into storage, not copied
+        field_file.save(name, self.files[path], save=False)
+
+
+class RecipeImporter:
+    """Validates recipe rows in chunks and writes them in batches.
+
+    Tags and ingredients are looked up by name through in-memory maps
+    filled with one query per chunk of unseen names. Rows that fail
+    validation or writing are passed to ``on_error`` and skipped.
+    """
+
+    def __init__(self, author, images, on_error, chunk_size=None, batch_size=None):
+        self.author = author
+        self.images = images
+        self.on_error = on_error
+        self.chunk_size = chunk_size or settings.RECIPE_IMPORT_CHUNK_SIZE
+        self.batch_size = batch_size or settings.RECIPE_IMPORT_BATCH_SIZE
+        self.created = 0
+        self.failed = 0
+        self._tags = None
+        self._ingredients = {}
+
+    def fail(self, number, errors, row):
+        self.failed += 1
+        self.on_error(number, errors, row)
+
+    def run(self, records):
+        records = iter(records)
+        while True:
+            chunk = list(islice(records, self.chunk_size))
+            if not chunk:
+                break
+            self.write(self.validate(chunk))
+        return self.created, self.failed
+
+    @property
+    def tags(self):
+        if self._tags is None:
+            self._tags = {}
+            for tag_id, name, slug in Tag.objects.values_list("id", "name", "slug"):
+                self._tags[slug.lower()] = tag_id
+                self._tags.setdefault(name.lower(), tag_id)
+        return self._tags
+
+    def load_ingredients(self, names):
+        missing = sorted(
+            {name for name in names if name.lower() not in self._ingredients}
+        )
+        for start in range(0, len(missing), LOOKUP_CHUNK_SIZE):
+            lookup = missing[start:start + LOOKUP_CHUNK_SIZE]
+            lowered = {name.lower() for name in lookup}
+            for name in lowered:
+                self._ingredients[name] = {}
+            # Exact names are matched too, LOWER() folds only ASCII on SQLite
+            rows = (
+                Ingredient.objects.annotate(lower_name=Lower("name"))
+                .filter(Q(lower_name__in=lowered) | Q(name__in=lookup))
+                .values_list("name", "measurement_unit__name", "id")
+            )
+            for name, measurement_unit, ingredient_id in rows:
+                self._ingredients.setdefault(name.lower(), {})[
+                    measurement_unit.lower()
+                ] = ingredient_id
+
+    def validate(self, chunk):
+        serialized = []
+        for number, errors, row in chunk:
+            if errors:
+                self.fail(number, errors, row)
+                continue
+            serializer = RecipeImportSerializer(data=row)
+            if not serializer.is_valid():
+                self.fail(number, serializer.errors, row)
+                continue
+            serialized.append((number, row, serializer.validated_data))
+
+        self.load_ingredients(
+            item["name"]
+            for _, _, data in serialized
+            for item in data["ingredients"]
+        )
+        valid = []
+        for number, row, data in serialized:
+            errors = {}
+            tag_ids = []
+            for name in data["tags"]:
+                tag_id = self.tags.get(name.lower())
+                if tag_id is None:
+                    errors.setdefault("tags", []).append(f"Unknown tag: {name}")
+                elif tag_id not in tag_ids:
+                    tag_ids.append(tag_id)
+            amounts = {}
+            for item in data["ingredients"]:
+                ingredient_id = self._ingredients.get(item["name"].lower(), {}).get(
+                    item["measurement_unit"].lower()
+                )
+                if ingredient_id is None:
+                    errors.setdefault("ingredients", []).append(
+                        f"Unknown ingredient: {item['name']}, {item['measurement_unit']}"
+                    )
+                elif ingredient_id in amounts:
+                    errors.setdefault("ingredients", []).append(
+                        "Ingredients must be unique in one recipe."
+                    )
+                else:
+                    amounts[ingredient_id] = item["amount"]
+            image_error = self.images.check(data["image"])
+            if image_error is not None:
+                errors["image"] = [image_error]
+            if errors:
+                self.fail(number, errors, row)
+            else:
+                valid.append((number, row, data, tag_ids, amounts))
+        return valid
+
+    def write(self, valid):
+        for start in range(0, len(valid), self.batch_size):
+            batch = valid[start:start + self.batch_size]
+            try:
+                recipes = self.write_batch(batch)
+            except (DatabaseError, OSError) as error:
+                for number, row, *_ in batch:
+                    self.fail(number, {"non_field_errors": [str(error)]}, row)
+            else:
+                self.created += len(batch)
+                # Bulk inserts send no post_save
+                index_recipes([recipe.pk for recipe in recipes])
+                recipe_match_index.update([recipe.pk for recipe in recipes])
+                fan_out(
+                    self.author.pk,
+                    [Entry(recipe.created, recipe.pk) for recipe in recipes],
+                )
+
+    def write_batch(self, batch):
+        recipes = []
+        for _, _, data, _, _ in batch:
+            recipe = Recipe(
+                author=self.author,
+                name=data["name"],
+                text=data["text"],
+                cooking_time=data["cooking_time"],
+            )
+            self.images.save(data["image"], recipe.image)
+            recipes.append(recipe)
+        with transaction.atomic():
+            Recipe.objects.bulk_create(recipes)
+            RecipeIngredientEntry.objects.bulk_create(
+                RecipeIngredientEntry(
+                    recipe=recipe, ingredient_id=ingredient_id, amount=amount
+                )
+                for recipe, (*_, amounts) in zip(recipes, batch)
+                for ingredient_id, amount in amounts.items()
+            )
+            Recipe.tags.through.objects.bulk_create(
+                Recipe.tags.through(recipe=recipe, tag_id=tag_id)
+                for recipe, (*_, tag_ids, _) in zip(recipes, batch)
+                for tag_id in tag_ids
+            )
+        return recipes
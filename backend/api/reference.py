@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+from .caching import (bump_version, get_version, is_not_modified, make_etag,
+                      set_validators)
+
+
+def _version_name(model):
+    return f"reference:{model._meta.label_lower}"
+
+
+def get_reference_version(model):
+    return get_version(_version_name(model))
+
+
+def invalidate_reference_data(model):
+    bump_version(_version_name(model))
+
+
+_slug_maps = {}
+
+
+def get_ids_by_slug(model):
+    """Return a per-process ``{slug: id}`` map of ``model``, reloaded when
+    its reference data is invalidated."""
+    version = get_reference_version(model)
+    cached = _slug_maps.get(model)
+    if cached is None or cached[0] != version:
+        cached = (version, dict(model.objects.values_list("slug", "id")))
+        _slug_maps[model] = cached
+    return cached[1]
+
+
+class _Snapshot:
+    def __init__(self, version, data):
+        self.version = version
+        self.data = data
+        self.etag = make_etag(data)
+        self.items = {str(item["id"]): (item, make_etag(item)) for item in data}
+
+
+class CachedReferenceMixin:
+    """Serves list and retrieve of a small, rarely changing table from a
+    per-process copy of its serialized rows, with strong ETags.
+
+    The copy is refreshed when ``invalidate_reference_data`` is called
+    for the model, which signals do on every save and delete.
+    """
+
+    _snapshots = {}
+
+    def get_snapshot(self):
+        model = self.queryset.model
+        version = get_reference_version(model)
+        snapshot = self._snapshots.get(model)
+        if snapshot is None or snapshot.version != version:
+            serializer = self.get_serializer(self.get_queryset(), many=True)
+            snapshot = _Snapshot(version, list(serializer.data))
+            self._snapshots[model] = snapshot
+        return snapshot
+
+    def conditional_response(self, request, data, etag):
+        if is_not_modified(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        set_validators(response, etag)
+        patch_cache_control(
+            response, public=True, max_age=settings.REFERENCE_DATA_MAX_AGE
+        )
+        return response
+
+    def list(self, request, *args, **kwargs):
+        snapshot = self.get_snapshot()
+        return self.conditional_response(request, snapshot.data, snapshot.etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        item = self.get_snapshot().items.get(self.kwargs[lookup_url_kwarg])
+        if item is None:
+            raise NotFound
+        return self.conditional_response(request, *item)
@@ -0,0 +1,119 @@
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+
+
+class RelationSet:
+    """IDs of the objects one of the viewer's M2M relations points to.
+
+    Membership of a page of objects is read with one query by ``load``.
+    Other checks and filters read all IDs from the through table once and
+    keep them in a frozenset; if the viewer has more than
+    ``VIEWER_RELATIONS_MAX_IDS`` of them the set is not kept, checks fall
+    back to per-object queries and filters to a semi-join.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self._ids = None
+        self._loaded = False
+        self._members = {}
+
+    def _rows(self):
+        return self.manager.through.objects.filter(
+            **{self.manager.source_field_name: self.manager.instance.pk}
+        )
+
+    @property
+    def ids(self):
+        if not self._loaded:
+            limit = settings.VIEWER_RELATIONS_MAX_IDS
+            ids = list(
+                self._rows().values_list(
+                    f"{self.manager.target_field_name}_id", flat=True
+                )[:limit + 1]
+            )
+            self._ids = frozenset(ids) if len(ids) <= limit else None
+            self._loaded = True
+        return self._ids
+
+    def load(self, pks):
+        """Read which of ``pks`` are in the relation with one query, so
+        checking them costs the same however large the relation is."""
+        if self._ids is not None:
+            return
+        pks = {pk for pk in pks if pk not in self._members}
+        if not pks:
+            return
+        target = f"{self.manager.target_field_name}_id"
+        found = set(
+            self._rows().filter(**{f"{target}__in": pks}).values_list(target, flat=True)
+        )
+        for pk in pks:
+            self._members[pk] = pk in found
+
+    def __contains__(self, pk):
+        if pk in self._members:
+            return self._members[pk]
+        if self.ids is None:
+            return self.manager.filter(pk=pk).exists()
+        return pk in self.ids
+
+    def filter(self, queryset):
+        if self.ids is not None:
+            return queryset.filter(pk__in=self.ids)
+        # Above the limit a semi-join probing the through table's (source,
+        # target) unique index, its cost doesn't grow with the relation
+        return queryset.filter(
+            Exists(
+                self._rows().filter(**{self.manager.target_field_name: OuterRef("pk")})
+            )
+        )
+
+    def add(self, pk):
+        self.manager.add(pk)
+        self._members[pk] = True
+        if self._ids is not None:
+            self._ids = self._ids | {pk}
+
+    def remove(self, pk):
+        self.manager.remove(pk)
+        self._members[pk] = False
+        if self._ids is not None:
+            self._ids = self._ids - {pk}
+
+
+class EmptyRelationSet:
+    def load(self, pks):
+        pass
+
+    def __contains__(self, pk):
+        return False
+
+    def filter(self, queryset):
+        return queryset.none()
+
+
+class ViewerRelations:
+    """Relations of the requesting user shared by serializers and filters."""
+
+    def __init__(self, user):
+        if user.is_authenticated:
+            self.followed = RelationSet(user.followed_to)
+            self.favourites = RelationSet(user.favourite)
+            self.shopping_list = RelationSet(user.shopping_list)
+        else:
+            self.followed = self.favourites = self.shopping_list = EmptyRelationSet()
+
+    def load_recipes(self, recipes):
+        """Read the viewer's relations to ``recipes`` and their authors."""
+        self.followed.load({recipe.author_id for recipe in recipes})
+        self.favourites.load({recipe.id for recipe in recipes})
+        self.shopping_list.load({recipe.id for recipe in recipes})
+
+
+def get_viewer_relations(request):
+    relations = getattr(request, "_viewer_relations", None)
+    if relations is None:
+        relations = ViewerRelations(request.user)
+        request._viewer_relations = relations
+    return relations
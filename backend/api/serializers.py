@@ -1,11 +1,19 @@
-from drf_extra_fields.fields import Base64ImageField
+from django.db import transaction
 from rest_framework import serializers
 
 from recipes.models import Ingredient, Recipe, RecipeIngredientEntry, Tag
+from recipes.transactions import on_commit_once
 from users.models import User
 
+from .fields import ImageRenditionsField, ImageUploadField
+from .matching import recipe_match_index
+from .metrics import MeasuredSerializerMixin
+from .prefetch import prefetch_for
+from .relations import get_viewer_relations
+from .shopping_cart import invalidate_recipe_carts
 
-class UserSerializer(serializers.ModelSerializer):
+
+class UserSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -13,16 +21,10 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ("email", "id", "username", "first_name", "last_name", "is_subscribed")
 
     def get_is_subscribed(self, obj):
-        user = self.context.get("request").user
+        return obj.id in get_viewer_relations(self.context.get("request")).followed
 
-        return (
-            user.followed_to.filter(id=obj.id).exists()
-            if not user.is_anonymous
-            else False
-        )
 
-
-class CurrentUserSerializer(serializers.ModelSerializer):
+class CurrentUserSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = (
@@ -34,14 +36,14 @@ class CurrentUserSerializer(serializers.ModelSerializer):
         )
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ("id", "name", "color", "slug")
         read_only_fields = ("name", "color", "slug")
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     measurement_unit = serializers.CharField(source="measurement_unit.name")
 
     class Meta:
@@ -64,7 +66,8 @@ class RecipeIngredientEntrySerializer(serializers.ModelSerializer):
 
 
 class RecipeIngredientEntryCreateSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    # Resolved to ingredients in one query by RecipeCreateSerializer
+    id = serializers.IntegerField()
     amount = serializers.IntegerField()
 
     class Meta:
@@ -72,21 +75,24 @@ class RecipeIngredientEntryCreateSerializer(serializers.ModelSerializer):
         fields = ("id", "amount")
 
 
-class RecipeShortSerializer(serializers.ModelSerializer):
+class RecipeShortSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
+    image_renditions = ImageRenditionsField(source="image")
+
     class Meta:
         model = Recipe
-        fields = ("id", "name", "image", "cooking_time")
+        fields = ("id", "name", "image", "image_renditions", "cooking_time")
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     tags = TagSerializer(many=True)
     author = UserSerializer(read_only=True)
     ingredients = RecipeIngredientEntrySerializer(
         source="ingredient_entries", many=True
     )
-    image = Base64ImageField()
-    is_favorited = serializers.BooleanField()
-    is_in_shopping_cart = serializers.BooleanField()
+    image = ImageUploadField()
+    image_renditions = ImageRenditionsField(source="image")
+    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -99,14 +105,25 @@ class RecipeSerializer(serializers.ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "image_renditions",
             "text",
             "cooking_time",
+            "favourites_count",
         )
         read_only_fields = (
             "id",
             "author",
             "is_favorited",
             "is_in_shopping_cart",
+            "favourites_count",
+        )
+
+    def get_is_favorited(self, obj):
+        return obj.id in get_viewer_relations(self.context.get("request")).favourites
+
+    def get_is_in_shopping_cart(self, obj):
+        return (
+            obj.id in get_viewer_relations(self.context.get("request")).shopping_list
         )
 
 
@@ -115,31 +132,47 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
     ingredients = RecipeIngredientEntryCreateSerializer(
         many=True,
     )
-    image = Base64ImageField()
+    image = ImageUploadField()
     tags = serializers.PrimaryKeyRelatedField(queryset=Tag.objects.all(), many=True)
 
     def validate(self, data):
-        ingredients = self.initial_data.get("ingredients")
-        ingredients_ids = []
+        ingredients = data.get("ingredients")
+        if ingredients is None:
+            # Only possible on partial updates, the field is required otherwise
+            return data
         if len(ingredients) == 0:
             raise serializers.ValidationError(
                 "There must be at least one ingredient in the recipe."
             )
+        ingredients_ids = set()
         for item in ingredients:
-            try:
-                amount = int(item.get("amount"))
-            except ValueError:
-                raise serializers.ValidationError("'amount' must be an integer.")
-            if amount <= 0:
+            if item["amount"] <= 0:
                 raise serializers.ValidationError(
                     "Ingredient amount must be a positive integer."
                 )
-            elif item["id"] in ingredients_ids:
+            elif item["id"].pk in ingredients_ids:
                 raise serializers.ValidationError(
                     "Ingredients must be unique in one recipe."
                 )
             else:
-                ingredients_ids.append(item["id"])
+                ingredients_ids.add(item["id"].pk)
+        return data
+
+    def validate_ingredients(self, data):
+        # Partial updates don't require the fields of nested items
+        for item in data:
+            if "id" not in item or "amount" not in item:
+                raise serializers.ValidationError(
+                    "Every ingredient needs an 'id' and an 'amount'."
+                )
+        ids = [item["id"] for item in data]
+        ingredients = Ingredient.objects.in_bulk(ids)
+        for item in data:
+            if item["id"] not in ingredients:
+                raise serializers.ValidationError(
+                    f'Invalid pk "{item["id"]}" - object does not exist.'
+                )
+            item["id"] = ingredients[item["id"]]
         return data
 
     def validate_tags(self, data):
@@ -163,35 +196,78 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             )
         return data
 
-    def add_tags(self, tags, recipe):
-        for tag in tags:
-            recipe.tags.add(tag)
-
-    def add_ingredient(self, ingredients, recipe):
-        for ingredient in ingredients:
-            ingredient_entry = ingredient["id"]
-            amount = ingredient["amount"]
-            recipe.ingredient_entries.create(ingredient=ingredient_entry, amount=amount)
+    def add_ingredients(self, ingredients, recipe):
+        RecipeIngredientEntry.objects.bulk_create(
+            RecipeIngredientEntry(
+                recipe=recipe, ingredient=ingredient["id"], amount=ingredient["amount"]
+            )
+            for ingredient in ingredients
+        )
 
+    def update_ingredients(self, ingredients, recipe):
+        """Apply the difference between ``ingredients`` and the stored
+        entries with at most one delete, one update and one insert.
+
+        Bulk operations send no signals, so shopping carts holding the
+        recipe and its ingredient match index entry are updated here if
+        anything changed.
+        """
+        amounts = {
+            ingredient["id"].pk: ingredient["amount"] for ingredient in ingredients
+        }
+        existing = {
+            entry.ingredient_id: entry
+            for entry in RecipeIngredientEntry.objects.filter(recipe=recipe)
+        }
+        removed = existing.keys() - amounts.keys()
+        changed = [
+            entry
+            for ingredient_id, entry in existing.items()
+            if ingredient_id in amounts and entry.amount != amounts[ingredient_id]
+        ]
+        for entry in changed:
+            entry.amount = amounts[entry.ingredient_id]
+        added = [
+            ingredient
+            for ingredient in ingredients
+            if ingredient["id"].pk not in existing
+        ]
+
+        if removed:
+            RecipeIngredientEntry.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        if changed:
+            RecipeIngredientEntry.objects.bulk_update(changed, ("amount",))
+        if added:
+            self.add_ingredients(added, recipe)
+        if removed or changed or added:
+            invalidate_recipe_carts((recipe.pk,))
+        if removed or added:
+            on_commit_once(recipe_match_index.update, (recipe.pk,))
+
+    @transaction.atomic
     def create(self, validated_data):
         tags_data = validated_data.pop("tags")
         ingredients_data = validated_data.pop("ingredients")
         recipe = super().create(validated_data)
-        self.add_ingredient(ingredients_data, recipe)
-        self.add_tags(tags_data, recipe)
+        self.add_ingredients(ingredients_data, recipe)
+        recipe.tags.add(*tags_data)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        tags_data = validated_data.pop("tags")
-        ingredient_data = validated_data.pop("ingredients")
-        instance.tags.clear()
-        self.add_tags(tags_data, instance)
-        instance.ingredients.clear()
-        self.add_ingredient(ingredient_data, instance)
-        super().update(instance, validated_data)
-        return instance
+        tags_data = validated_data.pop("tags", None)
+        ingredients_data = validated_data.pop("ingredients", None)
+        if tags_data is not None:
+            instance.tags.set(tags_data)
+        if ingredients_data is not None:
+            self.update_ingredients(ingredients_data, instance)
+        # Saving the recipe also bumps ``updated`` for the entry changes
+        return super().update(instance, validated_data)
 
     def to_representation(self, instance):
+        prefetch_for([instance], RecipeSerializer)
         return RecipeSerializer(
             instance, context={"request": self.context.get("request")}
         ).data
@@ -210,8 +286,29 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         )
 
 
+class RecipeImportIngredientSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=200)
+    measurement_unit = serializers.CharField(max_length=20)
+    amount = serializers.IntegerField(min_value=1)
+
+
+class RecipeImportSerializer(serializers.ModelSerializer):
+    """One row of a bulk import; tags and ingredients are given by name
+    and resolved by ``api.recipe_import.RecipeImporter``."""
+
+    tags = serializers.ListField(child=serializers.CharField(), allow_empty=False)
+    ingredients = RecipeImportIngredientSerializer(many=True, allow_empty=False)
+    image = serializers.CharField(max_length=255)
+    cooking_time = serializers.IntegerField(min_value=1, max_value=32767)
+
+    class Meta:
+        model = Recipe
+        fields = ("name", "text", "cooking_time", "image", "tags", "ingredients")
+
+
 class UserSubscriptionSerializer(UserSerializer):
-    recipes = serializers.SerializerMethodField()
+    recipes = RecipeShortSerializer(source="recipe_previews", many=True, read_only=True)
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = User
@@ -223,24 +320,5 @@ class UserSubscriptionSerializer(UserSerializer):
             "last_name",
             "is_subscribed",
             "recipes",
+            "recipes_count",
         )
-
-    def get_is_subscribed(self, obj):
-        user = self.context.get("user")
-
-        return (
-            user.followed_to.filter(id=obj.id).exists()
-            if not user.is_anonymous
-            else False
-        )
-
-    def get_recipes(self, obj):
-        request = self.context.get("request")
-        if request.GET.get("recipes_limit"):
-            recipes_limit = int(request.GET.get("recipes_limit"))
-            queryset = Recipe.objects.filter(author__id=obj.id).order_by("id")[
-                :recipes_limit
-            ]
-        else:
-            queryset = Recipe.objects.filter(author__id=obj.id).order_by("id")
-        return RecipeShortSerializer(queryset, many=True).data
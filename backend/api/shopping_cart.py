@@ -0,0 +1,123 @@
+import csv
+import io
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Sum
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from recipes.models import RecipeIngredientEntry
+from recipes.transactions import on_commit_once
+
+from .caching import bump_version, get_version
+
+User = get_user_model()
+
+ITERATOR_CHUNK_SIZE = 2000
+# The built-in PDF fonts have no Cyrillic glyphs
+PDF_FONT = "ShoppingCartFont"
+pdfmetrics.registerFont(TTFont(PDF_FONT, settings.SHOPPING_CART_PDF_FONT))
+
+
+def _bump_cart_versions(user_ids):
+    for user_id in user_ids:
+        bump_version(f"shopping_cart:{user_id}")
+
+
+def invalidate_shopping_carts(user_ids):
+    """Drop the cached carts of ``user_ids`` once the current transaction
+    commits; bumped before, a download in between would cache the old
+    rows under the new version."""
+    on_commit_once(_bump_cart_versions, user_ids)
+
+
+def invalidate_recipe_carts(recipe_ids):
+    # The carts are looked up now, a deleted recipe leaves none of them
+    invalidate_shopping_carts(
+        User.shopping_list.through.objects.filter(recipe_id__in=recipe_ids).values_list(
+            "user_id", flat=True
+        )
+    )
+
+
+def get_shopping_cart_totals(user):
+    """Yield ``(name, measurement_unit, amount)`` for every ingredient in
+    the user's shopping cart.
+
+    Rows are streamed from a server-side cursor the first time and cached
+    until the cart or one of its recipes changes.
+    """
+    key = f"shopping_cart:{user.id}:{get_version(f'shopping_cart:{user.id}')}"
+    totals = cache.get(key)
+    if totals is not None:
+        yield from totals
+        return
+
+    totals = []
+    rows = (
+        RecipeIngredientEntry.objects.filter(recipe__in_shopping_list=user)
+        .values_list("ingredient__name", "ingredient__measurement_unit__name")
+        .annotate(amount=Sum("amount"))
+        .order_by("ingredient__name", "ingredient__measurement_unit__name")
+    )
+    for row in rows.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+        totals.append(row)
+        yield row
+    cache.set(key, totals, settings.SHOPPING_CART_CACHE_TIMEOUT)
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def render_txt(totals):
+    for name, measurement_unit, amount in totals:
+        yield f"{name}      {amount} {measurement_unit} \n"
+
+
+def render_csv(totals):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(("name", "measurement_unit", "amount"))
+    for row in totals:
+        yield writer.writerow(row)
+
+
+def render_json(totals):
+    separator = ""
+    yield "["
+    for name, measurement_unit, amount in totals:
+        item = {"name": name, "measurement_unit": measurement_unit, "amount": amount}
+        yield separator + json.dumps(item, ensure_ascii=False)
+        separator = ","
+    yield "]"
+
+
+def render_pdf(totals):
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    y = height - 50
+    pdf.setFont(PDF_FONT, 12)
+    for name, measurement_unit, amount in totals:
+        if y < 50:
+            pdf.showPage()
+            pdf.setFont(PDF_FONT, 12)
+            y = height - 50
+        pdf.drawString(50, y, f"{name} — {amount} {measurement_unit}")
+        y -= 20
+    pdf.save()
+    yield buffer.getvalue()
+
+
+RENDERERS = {
+    "txt": ("text/plain; charset=utf-8", render_txt),
+    "csv": ("text/csv; charset=utf-8", render_csv),
+    "json": ("application/json", render_json),
+    "pdf": ("application/pdf", render_pdf),
+}
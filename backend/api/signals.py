@@ -0,0 +1,123 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (Ingredient, MeasurementUnit, Recipe,
+                            RecipeIngredientEntry, Tag)
+from recipes.transactions import on_commit_once
+
+from .authentication import invalidate_user_tokens
+from .autocomplete import ingredient_index
+from .feed import Entry, fan_out, followers_changed, invalidate_timelines
+from .matching import recipe_match_index
+from .reference import invalidate_reference_data
+from .shopping_cart import invalidate_recipe_carts, invalidate_shopping_carts
+
+User = get_user_model()
+
+
+@receiver(m2m_changed, sender=User.shopping_list.through)
+def shopping_list_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        invalidate_shopping_carts((instance.pk,))
+    elif pk_set is not None:
+        invalidate_shopping_carts(pk_set)
+    else:
+        invalidate_recipe_carts((instance.pk,))
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_ingredients_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        invalidate_recipe_carts((instance.pk,))
+    elif pk_set is not None:
+        invalidate_recipe_carts(pk_set)
+    else:
+        invalidate_recipe_carts(instance.recipe_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=RecipeIngredientEntry)
+@receiver(post_delete, sender=RecipeIngredientEntry)
+def ingredient_entry_changed(sender, instance, **kwargs):
+    invalidate_recipe_carts((instance.recipe_id,))
+    on_commit_once(recipe_match_index.update, (instance.recipe_id,))
+
+
+@receiver(m2m_changed, sender=User.followed_to.through)
+def followed_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    change = 1 if action == "post_add" else -1
+    if not reverse:
+        followers = (instance.pk,)
+        if pk_set is None:
+            pk_set = sender.objects.filter(from_user=instance).values_list(
+                "to_user", flat=True
+            )
+        deltas = dict.fromkeys(pk_set, change)
+    else:
+        if pk_set is None:
+            pk_set = sender.objects.filter(to_user=instance).values_list(
+                "from_user", flat=True
+            )
+        followers = pk_set = set(pk_set)
+        deltas = {instance.pk: change * len(pk_set)}
+    # Rebuilt before the commit, a timeline would keep the old authors
+    transaction.on_commit(lambda: invalidate_timelines(followers))
+    transaction.on_commit(lambda: followers_changed(deltas))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, raw=False, **kwargs):
+    if created:
+        on_commit_once(recipe_match_index.update, (instance.pk,))
+    if created and not raw:
+        entry = Entry(instance.created, instance.pk)
+        transaction.on_commit(lambda: fan_out(instance.author_id, (entry,)))
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    invalidate_recipe_carts((instance.pk,))
+    on_commit_once(recipe_match_index.update, (instance.pk,))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        transaction.on_commit(ingredient_index.invalidate)
+        return
+    on_commit_once(ingredient_index.update, (instance.pk,))
+
+
+@receiver(post_save, sender=MeasurementUnit)
+@receiver(post_delete, sender=MeasurementUnit)
+def measurement_unit_changed(sender, instance, **kwargs):
+    transaction.on_commit(ingredient_index.invalidate)
+    transaction.on_commit(lambda: invalidate_reference_data(MeasurementUnit))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    # Rebuilt before the commit, the snapshot would keep the old rows
+    transaction.on_commit(lambda: invalidate_reference_data(Tag))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if not created:
+        transaction.on_commit(lambda: invalidate_user_tokens(instance.pk))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_user_tokens(instance.user_id))
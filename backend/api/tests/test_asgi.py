@@ -0,0 +1,48 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (Ingredient, MeasurementUnit, Recipe,
+                            RecipeIngredientEntry, Tag)
+
+User = get_user_model()
+
+
+class ASGITests(TestCase):
+    # The async test client of Django 4.0 takes header names as they are
+    @classmethod
+    def setUpTestData(cls):
+        Tag.objects.create(name="Tag", color="#000000", slug="tag")
+        unit = MeasurementUnit.objects.create(name="г")
+        ingredient = Ingredient.objects.create(name="Соль", measurement_unit=unit)
+        user = User.objects.create(username="user", email="user@example.com")
+        cls.token = Token.objects.create(user=user)
+        recipe = Recipe.objects.create(
+            author=user, image="image.jpg", name="Recipe", text="Text", cooking_time=1
+        )
+        RecipeIngredientEntry.objects.create(
+            recipe=recipe, ingredient=ingredient, amount=5
+        )
+        user.shopping_list.add(recipe)
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_reference_data(self):
+        response = await self.async_client.get("/api/tags/")
+        self.assertEqual(response.json()[0]["slug"], "tag")
+        response = await self.async_client.get(
+            "/api/tags/", **{"If-None-Match": response["ETag"]}
+        )
+        self.assertEqual(response.status_code, 304)
+        response = await self.async_client.get("/api/ingredients/?name=со")
+        self.assertEqual(response.json()[0]["name"], "Соль")
+
+    async def test_shopping_cart_download(self):
+        response = await self.async_client.get(
+            "/api/recipes/download_shopping_cart/?format=csv",
+            Authorization=f"Token {self.token.key}",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Соль", b"".join(response.streaming_content).decode())
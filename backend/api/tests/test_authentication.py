@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import CachedTokenAuthentication
+from api.tests.test_caching import SHARED_CACHES
+
+User = get_user_model()
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        CachedTokenAuthentication.local_cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = User.objects.create(username="user", email="user@example.com")
+            token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def get_me(self):
+        return self.client.get("/api/users/me/")
+
+    def test_cached_lookup(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(self.get_me().json()["id"], self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_me().json()["id"], self.user.pk)
+
+    @override_settings(AUTH_TOKEN_CACHE_SHARED=True)
+    def test_shared_cache(self):
+        self.get_me()
+        CachedTokenAuthentication.local_cache.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_me().json()["id"], self.user.pk)
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_per_process_cache(self):
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                self.assertEqual(self.get_me().json()["id"], self.user.pk)
+
+    @override_settings(AUTH_TOKEN_CACHE_SHARED=True)
+    def test_logout(self):
+        self.get_me()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/auth/token/logout/")
+        self.assertEqual(response.status_code, 204)
+        # This process still holds the token in its LRU cache
+        self.assertEqual(self.get_me().status_code, 401)
+        # Another process only shares the cache
+        CachedTokenAuthentication.local_cache.clear()
+        self.assertEqual(self.get_me().status_code, 401)
+
+    def test_deactivation(self):
+        self.get_me()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.get_me().status_code, 401)
+
+    def test_unknown_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token unknown")
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_me().status_code, 401)
+        self.assertIsNone(cache.get("auth_user:None:version"))
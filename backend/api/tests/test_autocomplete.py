@@ -0,0 +1,88 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, MeasurementUnit
+
+
+class IngredientAutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = MeasurementUnit.objects.create(name="г")
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit=cls.unit)
+            for name in (
+                "Соль",
+                "Сахар",
+                "Морская соль",
+                "Crème fraîche",
+                "Йогурт",
+                "Ёрш",
+            )
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, name):
+        response = APIClient().get("/api/ingredients/", {"name": name})
+        self.assertEqual(response.status_code, 200)
+        return [ingredient["name"] for ingredient in response.json()]
+
+    def test_ranking(self):
+        self.search("")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.search("СОЛ"), ["Соль", "Морская соль"])
+            self.assertEqual(self.search("са"), ["Сахар"])
+            self.assertEqual(self.search("creme"), ["Crème fraîche"])
+            self.assertEqual(self.search("FRAICHE"), ["Crème fraîche"])
+            self.assertEqual(self.search("перец"), [])
+
+    def test_short_i(self):
+        self.assertEqual(self.search("й"), ["Йогурт"])
+        self.assertEqual(self.search("и"), [])
+        self.assertEqual(self.search("иог"), [])
+        self.assertEqual(self.search("ерш"), ["Ёрш"])
+        self.assertEqual(self.search("ёр"), ["Ёрш"])
+
+    @override_settings(INGREDIENT_AUTOCOMPLETE_LIMIT=2)
+    def test_limit(self):
+        self.assertEqual(self.search(""), ["Crème fraîche", "Ёрш"])
+        self.assertEqual(self.search("с"), ["Сахар", "Соль"])
+
+    def test_committed_change(self):
+        self.assertEqual(self.search("сол"), ["Соль", "Морская соль"])
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name="Солод", measurement_unit=self.unit)
+        self.assertEqual(self.search("сол"), ["Солод", "Соль", "Морская соль"])
+
+    def test_rolled_back_change(self):
+        self.assertEqual(self.search("сол"), ["Соль", "Морская соль"])
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError), transaction.atomic():
+                Ingredient.objects.create(name="Солод", measurement_unit=self.unit)
+                raise ValueError
+        self.assertEqual(self.search("сол"), ["Соль", "Морская соль"])
+
+    def test_rename_and_delete(self):
+        self.assertEqual(self.search("сах"), ["Сахар"])
+        ingredient = Ingredient.objects.get(name="Сахар")
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient.name = "Тростниковый сахар"
+            ingredient.save()
+        self.assertEqual(self.search("сах"), ["Тростниковый сахар"])
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient.delete()
+        self.assertEqual(self.search("сах"), [])
+
+    def test_measurement_unit(self):
+        response = APIClient().get("/api/ingredients/", {"name": "сол"})
+        self.assertEqual(
+            response.json()[0],
+            {
+                "id": Ingredient.objects.get(name="Соль").pk,
+                "name": "Соль",
+                "measurement_unit": "г",
+            },
+        )
@@ -0,0 +1,23 @@
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from api.checks import shared_cache_check
+
+# A cache every process sees, standing in for Redis in tests
+SHARED_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": tempfile.mkdtemp(prefix="foodgram-cache-"),
+    }
+}
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    def test_per_process_cache(self):
+        errors = shared_cache_check(None)
+        self.assertEqual([error.id for error in errors], ["api.W001"])
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_shared_cache(self):
+        self.assertEqual(shared_cache_check(None), [])
@@ -0,0 +1,136 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from recipes.models import (Ingredient, MeasurementUnit, Recipe,
+                            RecipeIngredientEntry, Tag)
+
+User = get_user_model()
+
+
+class RecipeConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username="author", email="a@example.com")
+        cls.viewer = User.objects.create(username="viewer", email="v@example.com")
+        cls.tag = Tag.objects.create(name="Ужин", color="#FFFFFF", slug="dinner")
+        cls.ingredient = Ingredient.objects.create(
+            name="Соль", measurement_unit=MeasurementUnit.objects.create(name="г")
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author,
+            image="image.jpg",
+            name="Recipe",
+            text="Text",
+            cooking_time=10,
+        )
+        cls.entry = RecipeIngredientEntry.objects.create(
+            recipe=cls.recipe, ingredient=cls.ingredient, amount=1
+        )
+        cls.url = f"/api/recipes/{cls.recipe.pk}/"
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def get(self, url=None, **headers):
+        return self.client.get(url or self.url, **headers)
+
+    def test_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            response["Last-Modified"], http_date(self.recipe.updated.timestamp())
+        )
+
+        with self.assertNumQueries(1):
+            response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        response = self.get(HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, 304)
+        response = self.get(HTTP_IF_MODIFIED_SINCE=http_date(0))
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_not_modified(self):
+        etag = self.get("/api/recipes/")["ETag"]
+        response = self.get("/api/recipes/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Recipe.objects.create(
+            author=self.author,
+            image="image.jpg",
+            name="Another recipe",
+            text="Text",
+            cooking_time=10,
+        )
+        response = self.get("/api/recipes/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_deletion(self):
+        Recipe.objects.create(
+            author=self.author,
+            image="image.jpg",
+            name="Another recipe",
+            text="Text",
+            cooking_time=10,
+        )
+        response = self.get("/api/recipes/")
+        self.assertNotIn("Last-Modified", response)
+        Recipe.objects.filter(name="Another recipe").delete()
+        response = self.get(
+            "/api/recipes/", HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe["id"] for recipe in response.json()["results"]], [self.recipe.pk]
+        )
+
+    def assert_modified(self, change):
+        etag = self.get()["ETag"]
+        updated = Recipe.objects.get(pk=self.recipe.pk).updated
+        change()
+        self.assertGreater(Recipe.objects.get(pk=self.recipe.pk).updated, updated)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_tags_change(self):
+        self.assert_modified(lambda: self.recipe.tags.add(self.tag))
+        self.assert_modified(lambda: self.tag.recipe_set.clear())
+
+    def test_ingredients_change(self):
+        def change_amount():
+            self.entry.amount = 2
+            self.entry.save()
+
+        self.assert_modified(change_amount)
+        self.assert_modified(self.entry.delete)
+
+    def test_recipe_change(self):
+        def rename():
+            recipe = Recipe.objects.get(pk=self.recipe.pk)
+            recipe.name = "Renamed"
+            recipe.save()
+
+        self.assert_modified(rename)
+
+    def test_personalized(self):
+        self.client.force_authenticate(self.viewer)
+        response = self.get()
+        self.assertNotIn("Last-Modified", response)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("Authorization", response["Vary"])
+        etag = response["ETag"]
+
+        self.viewer.favourite.add(self.recipe)
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["is_favorited"])
+        self.viewer.followed_to.add(self.author)
+        response = self.get(HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["author"]["is_subscribed"])
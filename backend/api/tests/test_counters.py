@@ -0,0 +1,73 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class RecipeCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create(
+            User(username=f"user{index}", email=f"user{index}@example.com")
+            for index in range(3)
+        )
+        cls.recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=cls.users[0],
+                image="image.jpg",
+                name=f"Recipe {index}",
+                text="Text",
+                cooking_time=10,
+            )
+            for index in range(3)
+        )
+
+    def assert_counts(self, field, expected):
+        counts = dict(Recipe.objects.values_list("pk", field))
+        self.assertEqual(
+            [counts[recipe.pk] for recipe in self.recipes], expected, field
+        )
+
+    def test_relation_changes(self):
+        first, second, third = self.users
+        first.favourite.add(*self.recipes)
+        first.favourite.add(self.recipes[0])
+        second.favourite.add(self.recipes[0], self.recipes[1])
+        self.recipes[0].in_favourites.add(third)
+        self.assert_counts("favourites_count", [3, 2, 1])
+
+        first.favourite.remove(self.recipes[1])
+        self.recipes[0].in_favourites.remove(second, third)
+        self.assert_counts("favourites_count", [1, 1, 1])
+
+        first.favourite.clear()
+        self.assert_counts("favourites_count", [0, 1, 0])
+        second.favourite.set((self.recipes[2],))
+        self.assert_counts("favourites_count", [0, 0, 1])
+
+        first.shopping_list.add(*self.recipes)
+        second.shopping_list.add(self.recipes[0])
+        self.recipes[0].in_shopping_list.clear()
+        self.assert_counts("in_carts_count", [0, 1, 1])
+        first.delete()
+        self.assert_counts("in_carts_count", [0, 0, 0])
+
+    def test_api_and_reconcile(self):
+        client = APIClient()
+        client.force_authenticate(self.users[1])
+        client.get(f"/api/recipes/{self.recipes[1].pk}/favorite/")
+        response = client.get("/api/recipes/?ordering=-favourites_count")
+        results = response.json()["results"]
+        self.assertEqual(results[0]["id"], self.recipes[1].pk)
+        self.assertEqual(results[0]["favourites_count"], 1)
+
+        Recipe.objects.update(favourites_count=5, in_carts_count=2)
+        call_command("reconcile_recipe_counters", stdout=StringIO())
+        self.assert_counts("favourites_count", [0, 1, 0])
+        self.assert_counts("in_carts_count", [0, 0, 0])
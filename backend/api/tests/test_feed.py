@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer, *cls.authors = User.objects.bulk_create(
+            User(username=f"user{index}", email=f"user{index}@example.com")
+            for index in range(4)
+        )
+        cls.viewer.followed_to.add(*cls.authors[:2])
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.authors[index % 3],
+                image="image.jpg",
+                name=f"Recipe {index}",
+                text="Text",
+                cooking_time=10,
+            )
+            for index in range(7)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def read_feed(self):
+        ids = []
+        url = "/api/recipes/feed/?limit=2"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [recipe["id"] for recipe in response.json()["results"]]
+            url = response.json()["next"]
+        return ids
+
+    def expected(self):
+        followed = set(self.viewer.followed_to.values_list("id", flat=True))
+        return [
+            recipe.pk
+            for recipe in reversed(self.recipes)
+            if recipe.author_id in followed
+        ]
+
+    def create_recipe(self, author):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                author=author,
+                image="image.jpg",
+                name="New",
+                text="Text",
+                cooking_time=1,
+            )
+        self.recipes.append(recipe)
+
+    @override_settings(FEED_TIMELINE_SIZE=3)
+    def test_fanned_out_timeline(self):
+        self.assertEqual(self.read_feed(), self.expected())
+        self.create_recipe(self.authors[0])
+        self.create_recipe(self.authors[2])
+        self.assertEqual(self.read_feed(), self.expected())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.viewer.followed_to.add(self.authors[2])
+        self.assertEqual(self.read_feed(), self.expected())
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=0)
+    def test_merged_authors(self):
+        self.assertEqual(self.read_feed(), self.expected())
+        self.create_recipe(self.authors[1])
+        self.assertEqual(self.read_feed(), self.expected())
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=1)
+    def test_author_crossing_fanout_limit(self):
+        author, other = self.authors[0], self.authors[2]
+        self.assertEqual(self.read_feed(), self.expected())
+        for change in (other.followed_to.add, other.followed_to.remove):
+            with self.captureOnCommitCallbacks(execute=True):
+                change(author)
+            # Whenever the cached count expires
+            cache.delete(f"feed:followers:{author.pk}")
+            self.create_recipe(author)
+            self.assertEqual(self.read_feed(), self.expected())
+
+    def test_timeline_built_for_other_authors(self):
+        with override_settings(FEED_FANOUT_MAX_FOLLOWERS=0):
+            self.assertEqual(self.read_feed(), self.expected())
+        cache.delete_many([f"feed:followers:{author.pk}" for author in self.authors])
+        self.create_recipe(self.authors[0])
+        self.assertEqual(self.read_feed(), self.expected())
+
+    def test_timeline_rebuilt_before_commit(self):
+        self.assertEqual(self.read_feed(), self.expected())
+        key = f"feed:timeline:{self.viewer.pk}"
+        timeline = cache.get(key)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.viewer.followed_to.remove(self.authors[1])
+            # Another process reads the feed before the commit
+            cache.set(key, timeline)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.read_feed(), self.expected())
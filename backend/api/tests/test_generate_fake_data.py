@@ -0,0 +1,147 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import F
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.counters import COUNTERS, actual_count
+from recipes.management.commands.generate_fake_data import IMAGE_NAME
+from recipes.models import Ingredient, Recipe, RecipeIngredientEntry, Tag
+
+User = get_user_model()
+
+
+class GenerateFakeDataTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def generate(self, seed=1):
+        stdout = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command(
+                "generate_fake_data",
+                users=5,
+                recipes=10,
+                ingredients=20,
+                tags=3,
+                follows=2,
+                favourites=3,
+                cart=2,
+                seed=seed,
+                stdout=stdout,
+            )
+        return stdout.getvalue()
+
+    def snapshot(self):
+        """Generated rows with ids replaced by usernames and recipe
+        positions, and without the timestamps and password hashes."""
+        usernames = dict(User.objects.values_list("id", "username"))
+        recipes = {
+            recipe_id: position
+            for position, recipe_id in enumerate(
+                Recipe.objects.order_by("id").values_list("id", flat=True)
+            )
+        }
+        return {
+            "users": list(
+                User.objects.order_by("id").values_list(
+                    "username", "email", "first_name", "last_name"
+                )
+            ),
+            "recipes": [
+                (usernames[author_id], *values)
+                for author_id, *values in Recipe.objects.order_by("id").values_list(
+                    "author", "name", "text", "cooking_time", *COUNTERS
+                )
+            ],
+            "ingredients": sorted(
+                (recipes[recipe_id], name, amount)
+                for recipe_id, name, amount in RecipeIngredientEntry.objects.values_list(
+                    "recipe", "ingredient__name", "amount"
+                )
+            ),
+            "tags": sorted(
+                (recipes[recipe_id], slug)
+                for recipe_id, slug in Recipe.tags.through.objects.values_list(
+                    "recipe", "tag__slug"
+                )
+            ),
+            "follows": sorted(
+                (usernames[source], usernames[target])
+                for source, target in User.followed_to.through.objects.values_list(
+                    "from_user", "to_user"
+                )
+            ),
+            "favourites": sorted(
+                (usernames[user_id], recipes[recipe_id])
+                for user_id, recipe_id in User.favourite.through.objects.values_list(
+                    "user", "recipe"
+                )
+            ),
+            "cart": sorted(
+                (usernames[user_id], recipes[recipe_id])
+                for user_id, recipe_id in User.shopping_list.through.objects.values_list(
+                    "user", "recipe"
+                )
+            ),
+        }
+
+    def test_generate(self):
+        self.assertIn("Created 5 users and 10 recipes", self.generate())
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Recipe.objects.count(), 10)
+        self.assertEqual(Ingredient.objects.count(), 20)
+        self.assertEqual(Tag.objects.count(), 3)
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, IMAGE_NAME)))
+        self.assertFalse(
+            User.followed_to.through.objects.filter(from_user=F("to_user")).exists()
+        )
+        for field in COUNTERS:
+            self.assertFalse(
+                Recipe.objects.exclude(**{field: actual_count(field)}).exists(),
+                field,
+            )
+
+        client = APIClient()
+        for recipe in Recipe.objects.prefetch_related("ingredient_entries"):
+            ingredient_ids = [
+                entry.ingredient_id for entry in recipe.ingredient_entries.all()
+            ]
+            self.assertTrue(ingredient_ids)
+            response = client.get("/api/recipes/", {"search": recipe.name, "limit": 10})
+            self.assertIn(
+                recipe.pk, [result["id"] for result in response.json()["results"]]
+            )
+            response = client.get(
+                "/api/recipes/match/",
+                {"have": ",".join(map(str, ingredient_ids)), "limit": 10},
+            )
+            self.assertIn(
+                {"id": recipe.pk, "missing": 0},
+                [
+                    {"id": result["id"], "missing": result["missing"]}
+                    for result in response.json()["results"]
+                ],
+            )
+
+    def test_same_seed(self):
+        with transaction.atomic():
+            self.generate()
+            first = self.snapshot()
+            transaction.set_rollback(True)
+        self.assertFalse(Recipe.objects.exists())
+        self.generate()
+        self.assertEqual(self.snapshot(), first)
+        self.assertTrue(first["favourites"])
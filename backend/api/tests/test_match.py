@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import (Ingredient, MeasurementUnit, Recipe,
+                            RecipeIngredientEntry)
+
+User = get_user_model()
+
+
+class RecipeMatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username="author", email="a@example.com")
+        unit = MeasurementUnit.objects.create(name="г")
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f"Ingredient {index}", measurement_unit=unit)
+            for index in range(5)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def create_recipe(self, *ingredients):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                author=self.author,
+                image="image.jpg",
+                name="Recipe",
+                text="Text",
+                cooking_time=10,
+            )
+            for ingredient in ingredients:
+                RecipeIngredientEntry.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=1
+                )
+        return recipe
+
+    def match(self, query):
+        response = APIClient().get(f"/api/recipes/match/?{query}")
+        self.assertEqual(response.status_code, 200)
+        return [
+            (recipe["id"], recipe["missing"]) for recipe in response.json()["results"]
+        ]
+
+    def test_match(self):
+        first, second, third, fourth, fifth = (
+            ingredient.pk for ingredient in self.ingredients
+        )
+        pair = self.create_recipe(*self.ingredients[:2])
+        triple = self.create_recipe(*self.ingredients[:3])
+        other = self.create_recipe(*self.ingredients[3:])
+        self.assertEqual(
+            self.match(f"have={first},{second}"), [(pair.pk, 0), (triple.pk, 1)]
+        )
+        self.assertEqual(self.match(f"have={first},{fourth}"), [])
+        self.assertEqual(
+            self.match(f"have={first},{fourth}&missing_max=1"),
+            [(other.pk, 1), (pair.pk, 1)],
+        )
+
+        # Changes made after the index was built are applied to it
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeIngredientEntry.objects.filter(
+                recipe=triple, ingredient=self.ingredients[2]
+            ).delete()
+            pair.delete()
+        self.assertEqual(self.match(f"have={first},{second}"), [(triple.pk, 0)])
+        self.assertEqual(self.match(f"have={fifth}&missing_max=0"), [])
+        self.assertEqual(
+            APIClient()
+            .get(f"/api/recipes/match/?have={third}&missing_max=x")
+            .status_code,
+            400,
+        )
+
+    def test_recipe_update(self):
+        first, second, *_, fifth = (ingredient.pk for ingredient in self.ingredients)
+        recipe = self.create_recipe(*self.ingredients[:2])
+        self.assertEqual(self.match(f"have={first},{second}"), [(recipe.pk, 0)])
+
+        client = APIClient()
+        client.force_authenticate(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.patch(
+                f"/api/recipes/{recipe.pk}/",
+                {
+                    "ingredients": [
+                        {"id": first, "amount": 1},
+                        {"id": second, "amount": 1},
+                        {"id": fifth, "amount": 2},
+                    ]
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.match(f"have={fifth}&missing_max=2"), [(recipe.pk, 2)])
+        self.assertEqual(self.match(f"have={first},{second}"), [(recipe.pk, 1)])
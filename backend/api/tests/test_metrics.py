@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.metrics import registry
+from recipes.models import Tag
+
+User = get_user_model()
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Tag.objects.create(name="Tag", color="#000000", slug="tag")
+        cls.admin = User.objects.create(
+            username="admin", email="admin@example.com", is_staff=True
+        )
+
+    def setUp(self):
+        registry.clear()
+        self.client = APIClient()
+
+    def test_server_timing(self):
+        response = self.client.get("/api/recipes/")
+        timings = dict(
+            metric.split(";", 1) for metric in response["Server-Timing"].split(", ")
+        )
+        self.assertEqual(set(timings), {"db", "serialize", "render", "total"})
+        self.assertIn("queries", timings["db"])
+
+    def test_endpoint(self):
+        self.client.get("/api/tags/")
+        self.client.get("/api/tags/")
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 401)
+        self.client.force_authenticate(self.admin)
+        lines = self.client.get("/api/metrics/").content.decode().splitlines()
+        self.assertIn(
+            'foodgram_request_duration_seconds_count{route="tag-list",method="GET"} 2',
+            lines,
+        )
+        self.assertIn("# TYPE foodgram_db_queries histogram", lines)
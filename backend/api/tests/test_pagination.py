@@ -0,0 +1,97 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, Tag
+
+User = get_user_model()
+
+
+class RecipeCursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer, cls.author = User.objects.bulk_create(
+            User(username=f"user{index}", email=f"user{index}@example.com")
+            for index in range(2)
+        )
+        cls.tag = Tag.objects.create(name="Ужин", color="#FFFFFF", slug="dinner")
+        now = timezone.now()
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=cls.author,
+                image="image.jpg",
+                name=f"Recipe {index}",
+                text="Text",
+                cooking_time=10,
+            )
+            for index in range(11)
+        )
+        # Pairs of recipes created at the same time, ordered by id
+        for index, recipe in enumerate(recipes):
+            recipe.created = now - timedelta(minutes=index // 2)
+        Recipe.objects.bulk_update(recipes, ("created",))
+        cls.ids = [recipe.pk for recipe in recipes]
+        for recipe in recipes[::3]:
+            recipe.tags.add(cls.tag)
+        cls.viewer.favourite.add(*recipes[1::2])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for query in context.captured_queries:
+            self.assertNotIn("COUNT(", query["sql"])
+            self.assertNotIn("OFFSET", query["sql"])
+        return response.json()
+
+    def walk(self, url):
+        pages = []
+        while url is not None:
+            page = self.get(url)
+            self.assertNotIn("count", page)
+            pages.append([recipe["id"] for recipe in page["results"]])
+            last = page
+            url = page["next"]
+        return pages, last
+
+    def test_forward_and_back(self):
+        pages, last = self.walk("/api/recipes/?pagination=cursor&limit=4")
+        self.assertEqual(pages, [self.ids[:4], self.ids[4:8], self.ids[8:]])
+        self.assertIsNone(self.get("/api/recipes/?pagination=cursor")["previous"])
+
+        back = []
+        url = last["previous"]
+        while url is not None:
+            page = self.get(url)
+            back.append([recipe["id"] for recipe in page["results"]])
+            url = page["previous"]
+        self.assertEqual(back, [self.ids[4:8], self.ids[:4]])
+
+    def test_filters(self):
+        pages, _ = self.walk(
+            "/api/recipes/?pagination=cursor&limit=2&is_favorited=1&tags=dinner"
+        )
+        self.assertEqual(pages, [[self.ids[3], self.ids[9]]])
+        pages, _ = self.walk("/api/recipes/?pagination=cursor&limit=2&is_favorited=1")
+        self.assertEqual(sum(pages, []), self.ids[1::2])
+
+    def test_page_number_mode(self):
+        page = self.client.get("/api/recipes/?page=2&limit=4").json()
+        self.assertEqual(page["count"], 11)
+        self.assertEqual([recipe["id"] for recipe in page["results"]], self.ids[4:8])
+
+    def test_invalid_cursor(self):
+        for cursor in ("garbage", "eyJjIjogIm5vdCBhIGRhdGUiLCAiaSI6IDF9"):
+            response = self.client.get(f"/api/recipes/?cursor={cursor}")
+            self.assertEqual(response.status_code, 404)
@@ -0,0 +1,54 @@
+import io
+import os
+import tempfile
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Ingredient, MeasurementUnit
+
+
+class PopulateIngredientsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def populate(self, lines, batch_size=2):
+        descriptor, path = tempfile.mkstemp(suffix=".csv")
+        self.addCleanup(os.remove, path)
+        with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines))
+        stdout = io.StringIO()
+        with CaptureQueriesContext(connection) as context:
+            call_command(
+                "populate_ingredients",
+                path,
+                batch_size=batch_size,
+                stdout=stdout,
+                stderr=io.StringIO(),
+            )
+        counts = [
+            query["sql"]
+            for query in context.captured_queries
+            if "COUNT(" in query["sql"]
+        ]
+        self.assertEqual(counts, [])
+        return stdout.getvalue()
+
+    def test_rerun(self):
+        output = self.populate(["соль,г", "соль,г", "соль,кг", "мука,г", "bad"])
+        self.assertIn(
+            "3 ingredients added, 1 were already loaded, 1 rows skipped", output
+        )
+        self.assertEqual(MeasurementUnit.objects.count(), 2)
+
+        output = self.populate(["соль,г", "сахар,г", "мука,г"])
+        self.assertIn(
+            "1 ingredients added, 2 were already loaded, 0 rows skipped", output
+        )
+        self.assertEqual(
+            set(Ingredient.objects.values_list("name", "measurement_unit__name")),
+            {("соль", "г"), ("соль", "кг"), ("мука", "г"), ("сахар", "г")},
+        )
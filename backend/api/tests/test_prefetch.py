@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.prefetch import get_plan
+from api.serializers import RecipeSerializer
+from recipes.models import (Ingredient, MeasurementUnit, Recipe,
+                            RecipeIngredientEntry, Tag)
+
+User = get_user_model()
+
+
+class PrefetchPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = User.objects.create(username="viewer", email="v@example.com")
+        authors = User.objects.bulk_create(
+            User(username=f"author{index}", email=f"author{index}@example.com")
+            for index in range(5)
+        )
+        tags = Tag.objects.bulk_create(
+            Tag(name=f"Tag {index}", color="#FFFFFF", slug=f"tag{index}")
+            for index in range(2)
+        )
+        units = MeasurementUnit.objects.bulk_create(
+            MeasurementUnit(name=f"unit {index}") for index in range(3)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f"Ingredient {index}", measurement_unit=unit)
+            for index, unit in enumerate(units)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=authors[index % len(authors)],
+                image="image.jpg",
+                name=f"Recipe {index}",
+                text="Text",
+                cooking_time=10,
+            )
+            for index in range(10)
+        )
+        RecipeIngredientEntry.objects.bulk_create(
+            RecipeIngredientEntry(recipe=recipe, ingredient=ingredient, amount=1)
+            for recipe in recipes
+            for ingredient in ingredients
+        )
+        for recipe in recipes:
+            recipe.tags.set(tags)
+        cls.viewer.followed_to.add(*authors[:2])
+        cls.viewer.favourite.add(*recipes[:3])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def test_recipe_plan(self):
+        plan = get_plan(RecipeSerializer)
+        self.assertEqual(set(plan.selected), {"author"})
+        self.assertEqual(set(plan.prefetched), {"tags", "ingredient_entries"})
+        entries = plan.prefetched["ingredient_entries"]
+        self.assertEqual(set(entries.selected), {"ingredient"})
+        self.assertEqual(
+            set(entries.selected["ingredient"].selected), {"measurement_unit"}
+        )
+
+    def test_recipe_list(self):
+        for limit in (1, 10):
+            cache.clear()
+            with self.assertNumQueries(7):
+                response = self.client.get(f"/api/recipes/?limit={limit}")
+            self.assertEqual(len(response.json()["results"]), limit)
+
+    def test_recipe_detail(self):
+        recipe = Recipe.objects.first()
+        with self.assertNumQueries(6):
+            response = self.client.get(f"/api/recipes/{recipe.pk}/")
+        self.assertEqual(len(response.json()["ingredients"]), 3)
+
+    def test_user_list(self):
+        for limit in (1, 6):
+            with self.assertNumQueries(3):
+                response = self.client.get(f"/api/users/?limit={limit}")
+            self.assertEqual(len(response.json()["results"]), limit)
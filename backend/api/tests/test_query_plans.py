@@ -0,0 +1,218 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.functions import Lower
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import (Ingredient, MeasurementUnit, Recipe,
+                            RecipeIngredientEntry, Tag, TrendingRecipe)
+from recipes.trending import refresh_trending
+
+User = get_user_model()
+
+USERS = 200
+INGREDIENTS = 2000
+RECIPES = 2000
+ENTRIES_PER_RECIPE = 3
+
+# Tables that grow with usage; a full scan of any of them in a request
+# path means a missing index. Tags and measurement units stay small.
+HOT_TABLES = {
+    model._meta.db_table
+    for model in (
+        User,
+        User.favourite.through,
+        User.shopping_list.through,
+        User.followed_to.through,
+        Ingredient,
+        Recipe,
+        Recipe.tags.through,
+        RecipeIngredientEntry,
+        TrendingRecipe,
+    )
+}
+
+# "SCAN recipes_recipe" walks the table, "SCAN ... USING INDEX" and
+# "SEARCH ..." do not
+SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?$")
+POSTGRESQL_SCAN = re.compile(r"Seq Scan on (\w+)")
+ALIAS = re.compile(r'"(\w+)" (U\d+|T\d+)\b')
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute(f"EXPLAIN {sql}")
+        return [row[0] for row in cursor.fetchall()]
+
+
+def full_scans(sql, plan):
+    """Return the hot tables ``plan`` reads sequentially."""
+    aliases = dict((alias, table) for table, alias in ALIAS.findall(sql))
+    tables = set()
+    for line in plan:
+        if connection.vendor == "sqlite":
+            match = SQLITE_SCAN.match(line.strip())
+            if match:
+                name = match.group(2) or match.group(1)
+                tables.add(aliases.get(name, match.group(1)))
+        else:
+            tables.update(POSTGRESQL_SCAN.findall(line))
+    return tables & HOT_TABLES
+
+
+class QueryPlanTests(TestCase):
+    """Every query behind the hot API endpoints must be served by an
+    index once the tables hold a realistic amount of rows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        users = User.objects.bulk_create(
+            User(
+                username=f"user{index}",
+                email=f"user{index}@example.com",
+                first_name="First",
+                last_name="Last",
+            )
+            for index in range(USERS)
+        )
+        cls.viewer = users[0]
+        tags = Tag.objects.bulk_create(
+            Tag(name=f"Tag {index}", color=f"#00000{index}", slug=f"tag{index}")
+            for index in range(5)
+        )
+        units = MeasurementUnit.objects.bulk_create(
+            MeasurementUnit(name=f"unit{index}") for index in range(10)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f"ingredient {index}", measurement_unit=units[index % 10])
+            for index in range(INGREDIENTS)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=users[index % USERS],
+                image="recipes/image.jpg",
+                name=f"Recipe {index}",
+                text="Text",
+                cooking_time=10,
+            )
+            for index in range(RECIPES)
+        )
+        RecipeIngredientEntry.objects.bulk_create(
+            RecipeIngredientEntry(
+                recipe=recipe,
+                ingredient=ingredients[(index * 7 + offset) % INGREDIENTS],
+                amount=1,
+            )
+            for index, recipe in enumerate(recipes)
+            for offset in range(ENTRIES_PER_RECIPE)
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tags[index % len(tags)])
+            for index, recipe in enumerate(recipes)
+        )
+        for user in users[:50]:
+            user.favourite.add(*recipes[user.id % 40::40])
+            user.shopping_list.add(*recipes[user.id % 100::100])
+            user.followed_to.add(*users[user.id % 20::20])
+        refresh_trending()
+        cls.recipe = recipes[RECIPES // 2]
+        cls.author = users[USERS // 2]
+        cls.tag = tags[0]
+        cls.ingredient = ingredients[INGREDIENTS // 2]
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def assert_no_full_scans(self, queries):
+        for query in queries:
+            sql = query["sql"]
+            plan = explain(sql)
+            self.assertFalse(
+                full_scans(sql, plan),
+                msg="Full scan in\n{}\nplan:\n{}".format(sql, "\n".join(plan)),
+            )
+
+    def assert_endpoint_uses_indexes(self, url):
+        with self.subTest(url=url):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+                if response.streaming:
+                    b"".join(response.streaming_content)
+            self.assertEqual(response.status_code, 200, url)
+            self.assert_no_full_scans(
+                query
+                for query in context.captured_queries
+                if query["sql"].lstrip().upper().startswith("SELECT")
+            )
+
+    def test_recipe_endpoints(self):
+        urls = (
+            "/api/recipes/",
+            "/api/recipes/?page=50",
+            "/api/recipes/?pagination=cursor",
+            "/api/recipes/?ordering=-favourites_count",
+            "/api/recipes/?ordering=-favourites_count&page=50",
+            f"/api/recipes/?tags={self.tag.slug}",
+            f"/api/recipes/?author={self.author.id}",
+            "/api/recipes/?is_favorited=1",
+            "/api/recipes/?is_in_shopping_cart=1",
+            "/api/recipes/?search=recipe",
+            f"/api/recipes/?search=recipe&tags={self.tag.slug}",
+            f"/api/recipes/{self.recipe.id}/",
+            "/api/recipes/trending/?limit=50",
+            "/api/recipes/feed/",
+            f"/api/recipes/match/?have={self.ingredient.id}",
+            f"/api/recipes/match/?have={self.ingredient.id}&missing_max=2",
+            f"/api/recipes/trending/?tags={self.tag.slug}",
+            "/api/recipes/download_shopping_cart/",
+        )
+        for url in urls:
+            self.assert_endpoint_uses_indexes(url)
+
+    def test_tag_filter_adds_no_queries(self):
+        tagged = "/api/recipes/?" + "&".join(f"tags=tag{index}" for index in range(3))
+        # Loads the cached slug map
+        self.client.get(tagged)
+        counts = []
+        for url in ("/api/recipes/", tagged):
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            counts.append(len(context.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_user_endpoints(self):
+        urls = (
+            f"/api/users/{self.author.id}/",
+            "/api/users/subscriptions/?recipes_limit=3",
+        )
+        for url in urls:
+            self.assert_endpoint_uses_indexes(url)
+
+    def test_ingredient_lookups(self):
+        querysets = (
+            Ingredient.objects.filter(
+                name=self.ingredient.name,
+                measurement_unit=self.ingredient.measurement_unit,
+            ),
+            Ingredient.objects.annotate(lower_name=Lower("name")).filter(
+                lower_name=self.ingredient.name.lower()
+            ),
+            RecipeIngredientEntry.objects.filter(
+                recipe=self.recipe, ingredient=self.ingredient
+            ),
+        )
+        for queryset in querysets:
+            with CaptureQueriesContext(connection) as context:
+                list(queryset)
+            self.assert_no_full_scans(context.captured_queries)
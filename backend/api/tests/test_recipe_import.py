@@ -0,0 +1,201 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from api.recipe_import import read_csv, read_ndjson
+from recipes.models import Ingredient, MeasurementUnit, Recipe, Tag
+
+User = get_user_model()
+
+
+def make_image(image_format="PNG"):
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), "red").save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def recipe_row(**fields):
+    row = {
+        "name": "Борщ",
+        "text": "Text",
+        "cooking_time": 60,
+        "image": "borscht.png",
+        "tags": ["dinner"],
+        "ingredients": [
+            {"name": "Свекла", "measurement_unit": "г", "amount": 300},
+            {"name": "Соль", "measurement_unit": "г", "amount": 5},
+        ],
+    }
+    row.update(fields)
+    return json.dumps(row, ensure_ascii=False)
+
+
+CSV_HEADER = "name,text,cooking_time,image,tags,ingredients"
+CSV_ROW = "Салат,Text,10,borscht.png,dinner;Завтрак,Свекла|г|100;Соль|г|2"
+
+
+class RecipeImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username="author", email="a@example.com")
+        unit = MeasurementUnit.objects.create(name="г")
+        cls.beetroot, cls.salt = Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit=unit) for name in ("Свекла", "Соль")
+        )
+        cls.dinner, cls.breakfast = Tag.objects.bulk_create(
+            Tag(name=name, color="#FFFFFF", slug=slug)
+            for name, slug in (("Ужин", "dinner"), ("Завтрак", "breakfast"))
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def upload(self, name, lines, images=(("borscht.png", make_image()),)):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/recipes/import/",
+                {
+                    "file": SimpleUploadedFile(name, "\n".join(lines).encode()),
+                    "images": [
+                        SimpleUploadedFile(image_name, content)
+                        for image_name, content in images
+                    ],
+                },
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def assert_recipe(self, name, amounts, tags):
+        recipe = Recipe.objects.get(name=name)
+        self.assertEqual(recipe.author, self.author)
+        self.assertEqual(
+            dict(recipe.ingredient_entries.values_list("ingredient", "amount")),
+            amounts,
+        )
+        self.assertEqual(set(recipe.tags.all()), tags)
+        self.assertRegex(recipe.image.name, r"^[0-9a-f-]{36}\.png$")
+        return recipe
+
+    def test_ndjson(self):
+        result = self.upload("recipes.ndjson", [recipe_row(), ""])
+        self.assertEqual(result, {"created": 1, "failed": 0, "errors": []})
+        self.assert_recipe(
+            "Борщ", {self.beetroot.pk: 300, self.salt.pk: 5}, {self.dinner}
+        )
+
+    def test_csv(self):
+        result = self.upload("recipes.csv", [CSV_HEADER, CSV_ROW])
+        self.assertEqual(result["created"], 1)
+        self.assert_recipe(
+            "Салат",
+            {self.beetroot.pk: 100, self.salt.pk: 2},
+            {self.dinner, self.breakfast},
+        )
+
+    def test_rejected_rows(self):
+        duplicate = {"name": "Соль", "measurement_unit": "г", "amount": 1}
+        result = self.upload(
+            "recipes.ndjson",
+            [
+                "{not json",
+                recipe_row(tags=["lunch"]),
+                recipe_row(
+                    ingredients=[
+                        {"name": "Перец", "measurement_unit": "г", "amount": 1}
+                    ]
+                ),
+                recipe_row(ingredients=[duplicate, duplicate]),
+                recipe_row(image="missing.png"),
+                recipe_row(name="Суп"),
+            ],
+        )
+        self.assertEqual((result["created"], result["failed"]), (1, 5))
+        errors = {error["line"]: error["errors"] for error in result["errors"]}
+        self.assertIn("Invalid JSON", errors[1]["non_field_errors"][0])
+        self.assertEqual(errors[2], {"tags": ["Unknown tag: lunch"]})
+        self.assertEqual(errors[3], {"ingredients": ["Unknown ingredient: Перец, г"]})
+        self.assertEqual(
+            errors[4], {"ingredients": ["Ingredients must be unique in one recipe."]}
+        )
+        self.assertEqual(errors[5], {"image": ["Image not found: missing.png"]})
+        self.assertEqual(list(Recipe.objects.values_list("name", flat=True)), ["Суп"])
+
+    def test_non_image_rejected(self):
+        result = self.upload(
+            "recipes.ndjson",
+            [recipe_row(image="evil.html"), recipe_row(image="photo.bmp")],
+            images=(
+                ("evil.html", b"<script>alert(1)</script>"),
+                ("photo.bmp", make_image("BMP")),
+            ),
+        )
+        self.assertEqual((result["created"], result["failed"]), (0, 2))
+        self.assertEqual(
+            [error["errors"] for error in result["errors"]],
+            [
+                {"image": ["Not a JPEG, PNG or GIF image: evil.html"]},
+                {"image": ["Not a JPEG, PNG or GIF image: photo.bmp"]},
+            ],
+        )
+        self.assertEqual(os.listdir(self.media_root), [])
+
+    def test_readers(self):
+        (valid, _, row), (invalid, errors, line) = read_ndjson(["", "{}", "["])
+        self.assertEqual((valid, row), (2, {}))
+        self.assertEqual((invalid, line), (3, "["))
+        self.assertIn("Invalid JSON", errors["non_field_errors"][0])
+        records = list(
+            read_csv([CSV_HEADER, CSV_ROW, "Суп,Text,10,a.png,dinner,Соль|г"])
+        )
+        self.assertEqual(records[0][2]["tags"], ["dinner", "Завтрак"])
+        self.assertEqual(
+            records[0][2]["ingredients"][0],
+            {"name": "Свекла", "measurement_unit": "г", "amount": "100"},
+        )
+        self.assertEqual(
+            records[1][1],
+            {"ingredients": ["Expected name|measurement unit|amount: Соль|г"]},
+        )
+
+    def test_command(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with open(os.path.join(directory, "borscht.png"), "wb") as image:
+            image.write(make_image())
+        file_path = os.path.join(directory, "recipes.ndjson")
+        with open(file_path, "w", encoding="utf-8") as file:
+            file.write("\n".join((recipe_row(), recipe_row(tags=["lunch"]))))
+
+        stdout = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command(
+                "populate_recipes", file_path, author=self.author.email, stdout=stdout
+            )
+        self.assertIn("1 recipes were created", stdout.getvalue())
+        self.assert_recipe(
+            "Борщ", {self.beetroot.pk: 300, self.salt.pk: 5}, {self.dinner}
+        )
+        with open(f"{file_path}.errors.ndjson", encoding="utf-8") as report:
+            entries = [json.loads(line) for line in report]
+        self.assertEqual(
+            [(entry["line"], entry["errors"]) for entry in entries],
+            [(2, {"tags": ["Unknown tag: lunch"]})],
+        )
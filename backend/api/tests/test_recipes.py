@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import (Ingredient, MeasurementUnit, Recipe,
+                            RecipeIngredientEntry, Tag)
+
+User = get_user_model()
+
+
+class RecipeWriteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username="author", email="a@example.com")
+        unit = MeasurementUnit.objects.create(name="г")
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f"Ingredient {index}", measurement_unit=unit)
+            for index in range(3)
+        )
+        cls.tag = Tag.objects.create(name="Tag", color="#000000", slug="tag")
+        cls.recipe = Recipe.objects.create(
+            author=cls.author,
+            image="image.jpg",
+            name="Recipe",
+            text="Text",
+            cooking_time=10,
+        )
+        cls.recipe.tags.add(cls.tag)
+        RecipeIngredientEntry.objects.bulk_create(
+            RecipeIngredientEntry(recipe=cls.recipe, ingredient=ingredient, amount=1)
+            for ingredient in cls.ingredients[:2]
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def patch(self, data):
+        return self.client.patch(f"/api/recipes/{self.recipe.pk}/", data, format="json")
+
+    def test_invalid_ingredients(self):
+        first, second, _ = (ingredient.pk for ingredient in self.ingredients)
+        for ingredients in (
+            [{"id": first}],
+            [{"amount": 1}],
+            [],
+            [{"id": first, "amount": 0}],
+            [{"id": first, "amount": "x"}],
+            [{"id": first, "amount": 1}, {"id": first, "amount": 2}],
+            [{"id": 0, "amount": 1}],
+        ):
+            with self.subTest(ingredients=ingredients):
+                self.assertEqual(
+                    self.patch({"ingredients": ingredients}).status_code, 400
+                )
+        self.assertEqual(
+            self.patch({"ingredients": [{"id": first, "amount": 0}]}).json(),
+            {"non_field_errors": ["Ingredient amount must be a positive integer."]},
+        )
+
+    def test_removing_ingredient_invalidates_carts(self):
+        first = self.ingredients[0].pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.shopping_list.add(self.recipe)
+        download = "/api/recipes/download_shopping_cart/?format=csv"
+        self.assertEqual(
+            b"".join(self.client.get(download).streaming_content).count(b"\n"), 3
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.patch({"ingredients": [{"id": first, "amount": 1}]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            b"".join(self.client.get(download).streaming_content).count(b"\n"), 2
+        )
@@ -0,0 +1,82 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.reference import get_ids_by_slug, get_reference_version
+from recipes.models import Tag
+
+
+class TagEndpointTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.breakfast, cls.dinner = Tag.objects.bulk_create(
+            Tag(name=name, color="#FFFFFF", slug=slug)
+            for name, slug in (("Завтрак", "breakfast"), ("Ужин", "dinner"))
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_list(self):
+        response = self.client.get("/api/tags/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [tag["slug"] for tag in response.json()], ["breakfast", "dinner"]
+        )
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("max-age", response["Cache-Control"])
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith('"'))
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/tags/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_retrieve(self):
+        response = self.client.get(f"/api/tags/{self.dinner.pk}/")
+        self.assertEqual(response.json()["name"], "Ужин")
+        etag = response["ETag"]
+        self.assertNotEqual(etag, self.client.get("/api/tags/")["ETag"])
+        response = self.client.get(
+            f"/api/tags/{self.dinner.pk}/", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get("/api/tags/0/").status_code, 404)
+
+    def test_invalidated_on_change(self):
+        etag = self.client.get("/api/tags/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dinner.name = "Обед"
+            self.dinner.save()
+        response = self.client.get("/api/tags/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()[1]["name"], "Обед")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.breakfast.delete()
+        self.assertEqual(len(self.client.get("/api/tags/").json()), 1)
+
+    def test_ids_by_slug(self):
+        self.assertEqual(
+            get_ids_by_slug(Tag),
+            {"breakfast": self.breakfast.pk, "dinner": self.dinner.pk},
+        )
+        with self.assertNumQueries(0):
+            get_ids_by_slug(Tag)
+        with self.captureOnCommitCallbacks(execute=True):
+            lunch = Tag.objects.create(name="Обед", color="#000000", slug="lunch")
+        self.assertEqual(get_ids_by_slug(Tag)["lunch"], lunch.pk)
+
+    def test_invalidated_on_commit(self):
+        self.client.get("/api/tags/")
+        version = get_reference_version(Tag)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Tag.objects.create(name="Обед", color="#000000", slug="lunch")
+            self.assertEqual(get_reference_version(Tag), version)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(self.client.get("/api/tags/").json()), 3)
+        self.assertIn("lunch", get_ids_by_slug(Tag))
@@ -0,0 +1,151 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.relations import get_viewer_relations
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class ViewerRelationFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.few, cls.many = User.objects.bulk_create(
+            User(username=f"user{index}", email=f"user{index}@example.com")
+            for index in range(3)
+        )
+        cls.recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=cls.author,
+                image="image.jpg",
+                name=f"Recipe {index}",
+                text="Text",
+                cooking_time=10,
+            )
+            for index in range(300)
+        )
+        cls.few.favourite.add(*cls.recipes[:2])
+        cls.many.favourite.add(*cls.recipes)
+
+    def get(self, user, url, sql=False):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        if sql:
+            return response.json(), " ".join(q["sql"] for q in context.captured_queries)
+        return response.json(), len(context.captured_queries)
+
+    def test_queries_do_not_grow_with_relation(self):
+        url = "/api/recipes/?is_favorited=1&limit=2"
+        few, few_queries = self.get(self.few, url)
+        many, many_queries = self.get(self.many, url)
+        self.assertEqual((few["count"], many["count"]), (2, 300))
+        self.assertTrue(
+            all(recipe["is_favorited"] for recipe in few["results"] + many["results"])
+        )
+        self.assertEqual(few_queries, many_queries)
+
+    @override_settings(VIEWER_RELATIONS_MAX_IDS=100)
+    def test_filter_above_limit(self):
+        url = "/api/recipes/?is_favorited=1&limit=2"
+        few, few_sql = self.get(self.few, url, sql=True)
+        many, many_sql = self.get(self.many, url, sql=True)
+        self.assertEqual((few["count"], many["count"]), (2, 300))
+        self.assertNotIn("EXISTS", few_sql)
+        self.assertIn("EXISTS", many_sql)
+
+    def test_anonymous(self):
+        for url in (
+            "/api/recipes/?is_favorited=1",
+            "/api/recipes/?is_in_shopping_cart=1",
+        ):
+            data, _ = self.get(None, url)
+            self.assertEqual(data["count"], 0)
+        data, _ = self.get(None, "/api/recipes/?is_favorited=0&limit=1")
+        self.assertEqual(data["count"], 300)
+        self.assertFalse(data["results"][0]["is_favorited"])
+
+
+class ViewerRelationsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer, cls.author = User.objects.bulk_create(
+            User(username=f"user{index}", email=f"user{index}@example.com")
+            for index in range(2)
+        )
+        cls.recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=cls.author,
+                image="image.jpg",
+                name=f"Recipe {index}",
+                text="Text",
+                cooking_time=10,
+            )
+            for index in range(4)
+        )
+        cls.viewer.followed_to.add(cls.author)
+        cls.viewer.favourite.add(*cls.recipes[:2])
+        cls.viewer.shopping_list.add(cls.recipes[3])
+
+    def get_relations(self, user):
+        request = RequestFactory().get("/")
+        request.user = user
+        relations = get_viewer_relations(request)
+        self.assertIs(get_viewer_relations(request), relations)
+        return relations
+
+    def test_ids_read_once(self):
+        relations = self.get_relations(self.viewer)
+        pks = [recipe.pk for recipe in self.recipes]
+        with self.assertNumQueries(1):
+            favourites = [pk for pk in pks if pk in relations.favourites]
+            self.assertEqual(favourites, pks[:2])
+        with self.assertNumQueries(1):
+            self.assertIn(self.author.pk, relations.followed)
+            self.assertNotIn(self.viewer.pk, relations.followed)
+
+    def test_load_page(self):
+        relations = self.get_relations(self.viewer)
+        with self.assertNumQueries(3):
+            relations.load_recipes(self.recipes)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [recipe.pk in relations.shopping_list for recipe in self.recipes],
+                [False, False, False, True],
+            )
+            self.assertIn(self.author.pk, relations.followed)
+
+    @override_settings(VIEWER_RELATIONS_MAX_IDS=1)
+    def test_above_limit(self):
+        relations = self.get_relations(self.viewer)
+        with self.assertNumQueries(2):
+            self.assertIn(self.recipes[0].pk, relations.favourites)
+        with self.assertNumQueries(1):
+            self.assertNotIn(self.recipes[2].pk, relations.favourites)
+
+    def test_add_remove(self):
+        relations = self.get_relations(self.viewer)
+        favourites = relations.favourites
+        favourites.remove(self.recipes[0].pk)
+        favourites.add(self.recipes[2].pk)
+        with self.assertNumQueries(0):
+            self.assertNotIn(self.recipes[0].pk, favourites)
+            self.assertIn(self.recipes[2].pk, favourites)
+        self.assertEqual(
+            set(self.viewer.favourite.values_list("pk", flat=True)),
+            {self.recipes[1].pk, self.recipes[2].pk},
+        )
+
+    def test_anonymous(self):
+        relations = self.get_relations(AnonymousUser())
+        with self.assertNumQueries(0):
+            relations.load_recipes(self.recipes)
+            self.assertNotIn(self.recipes[0].pk, relations.favourites)
+            self.assertFalse(relations.followed.filter(User.objects.all()).exists())
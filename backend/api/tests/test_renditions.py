@@ -0,0 +1,111 @@
+import io
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from recipes.renditions import (generate_renditions, parse_rendition_name,
+                                rendition_name)
+
+User = get_user_model()
+
+
+class RecipeImageRenditionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer, cls.author = User.objects.bulk_create(
+            User(username=f"user{index}", email=f"user{index}@example.com")
+            for index in range(2)
+        )
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def create_recipe(self, size=(2000, 1000)):
+        buffer = io.BytesIO()
+        Image.new("RGB", size, "red").save(buffer, "JPEG")
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe(
+                author=self.author, name="Recipe", text="Text", cooking_time=10
+            )
+            recipe.image.save("photo.jpg", ContentFile(buffer.getvalue()), save=False)
+            recipe.save()
+        return recipe
+
+    def test_generated_on_save(self):
+        recipe = self.create_recipe()
+        for variant, size in (("thumb", 160), ("card", 480), ("full", 1280)):
+            with default_storage.open(
+                rendition_name(recipe.image.name, variant)
+            ) as file:
+                with Image.open(file) as image:
+                    self.assertEqual(image.size, (size, size // 2))
+
+    def test_generated_on_request(self):
+        recipe = self.create_recipe(size=(100, 100))
+        name = rendition_name(recipe.image.name, "card")
+        default_storage.delete(name)
+        response = self.client.get(f"/media/{name}")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("max-age", response["Cache-Control"])
+        self.assertTrue(default_storage.exists(name))
+        # Smaller images are not scaled up
+        with Image.open(io.BytesIO(b"".join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (100, 100))
+
+        for path in (
+            f"{recipe.image.name}.huge.webp",
+            "missing.jpg.card.webp",
+            "../secret.jpg.card.webp",
+        ):
+            self.assertEqual(
+                self.client.get(f"/media/renditions/{path}").status_code, 404
+            )
+
+    def test_names(self):
+        name = rendition_name("photo.jpg", "thumb")
+        self.assertTrue(name.startswith("renditions/photo.jpg.thumb."))
+        self.assertEqual(
+            parse_rendition_name(name.split("/", 1)[1]), ("photo.jpg", "thumb")
+        )
+        self.assertIsNone(parse_rendition_name("photo.jpg.thumb.gif"))
+
+    def test_idempotent(self):
+        recipe = self.create_recipe(size=(200, 200))
+        _, files = default_storage.listdir("renditions")
+        modified = [
+            default_storage.get_modified_time(f"renditions/{name}") for name in files
+        ]
+        generate_renditions(recipe.image.name)
+        self.assertEqual(default_storage.listdir("renditions")[1], files)
+        self.assertEqual(
+            [default_storage.get_modified_time(f"renditions/{name}") for name in files],
+            modified,
+        )
+
+    def test_serialized(self):
+        recipe = self.create_recipe(size=(200, 200))
+        self.viewer.favourite.add(recipe)
+        client = APIClient()
+        client.force_authenticate(self.viewer)
+        urls = client.get(f"/api/recipes/{recipe.pk}/").json()["image_renditions"]
+        self.assertEqual(set(urls), {"thumb", "card", "full"})
+        self.assertTrue(
+            urls["thumb"].startswith(
+                f"http://testserver/media/renditions/{recipe.image.name}.thumb."
+            )
+        )
+        response = client.get(f"/api/users/{self.author.pk}/subscribe/")
+        self.assertEqual(response.json()["recipes"][0]["image_renditions"], urls)
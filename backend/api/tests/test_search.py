@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import (Ingredient, MeasurementUnit, Recipe,
+                            RecipeIngredientEntry)
+
+User = get_user_model()
+
+
+class RecipeSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username="author", email="a@example.com")
+        cls.salt = Ingredient.objects.create(
+            name="соль", measurement_unit=MeasurementUnit.objects.create(name="г")
+        )
+
+    def create_recipe(self, name, text, *ingredients):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                author=self.author,
+                image="image.jpg",
+                name=name,
+                text=text,
+                cooking_time=10,
+            )
+            for ingredient in ingredients:
+                RecipeIngredientEntry.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=1
+                )
+        return recipe
+
+    def search(self, query):
+        response = APIClient().get("/api/recipes/", {"search": query})
+        self.assertEqual(response.status_code, 200)
+        return [recipe["id"] for recipe in response.json()["results"]]
+
+    def test_ranking_and_updates(self):
+        in_text = self.create_recipe("Суп", "Посолить по вкусу, соль в конце")
+        in_name = self.create_recipe("Соленые огурцы", "Залить рассолом")
+        in_ingredients = self.create_recipe("Хлеб", "Испечь", self.salt)
+        self.assertEqual(
+            self.search("сол"), [in_name.pk, in_ingredients.pk, in_text.pk]
+        )
+        self.assertEqual(self.search("СОЛЬ конце"), [in_text.pk])
+        self.assertEqual(self.search("?"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.salt.name = "сахар"
+            self.salt.save()
+            in_name.delete()
+        self.assertEqual(self.search("сахар"), [in_ingredients.pk])
+        self.assertEqual(self.search("сол"), [in_text.pk])
@@ -0,0 +1,150 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from reportlab.pdfbase import pdfmetrics
+from rest_framework.test import APIClient
+
+from api.caching import get_version
+from api.shopping_cart import PDF_FONT
+from recipes.models import (Ingredient, MeasurementUnit, Recipe,
+                            RecipeIngredientEntry)
+
+User = get_user_model()
+
+
+class ShoppingCartDownloadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = MeasurementUnit.objects.create(name="г")
+        cls.user = User.objects.create(username="user", email="user@example.com")
+        with cls.captureOnCommitCallbacks(execute=True):
+            for name, amount in (("Соль", 5), ("Мука", 200)):
+                recipe = cls.create_recipe(
+                    Ingredient.objects.create(name=name, measurement_unit=cls.unit),
+                    amount,
+                )
+                cls.user.shopping_list.add(recipe)
+
+    @classmethod
+    def create_recipe(cls, ingredient, amount):
+        recipe = Recipe.objects.create(
+            author=cls.user,
+            image="image.jpg",
+            name="Recipe",
+            text="Text",
+            cooking_time=1,
+        )
+        RecipeIngredientEntry.objects.create(
+            recipe=recipe, ingredient=ingredient, amount=amount
+        )
+        return recipe
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def download(self, export_format):
+        response = self.client.get(
+            f"/api/recipes/download_shopping_cart/?format={export_format}"
+        )
+        self.assertEqual(response.status_code, 200)
+        return response, b"".join(response.streaming_content)
+
+    def test_txt(self):
+        response, content = self.download("txt")
+        self.assertEqual(response["Content-Type"], "text/plain; charset=utf-8")
+        self.assertEqual(
+            response["Content-Disposition"], 'attachment; filename="to_buy.txt"'
+        )
+        self.assertEqual(
+            content.decode().splitlines(), ["Мука      200 г ", "Соль      5 г "]
+        )
+
+    def test_csv(self):
+        response, content = self.download("csv")
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertEqual(
+            content.decode().splitlines(),
+            ["name,measurement_unit,amount", "Мука,г,200", "Соль,г,5"],
+        )
+
+    def test_json(self):
+        response, content = self.download("json")
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(
+            json.loads(content),
+            [
+                {"name": "Мука", "measurement_unit": "г", "amount": 200},
+                {"name": "Соль", "measurement_unit": "г", "amount": 5},
+            ],
+        )
+
+    def test_unknown_format(self):
+        response = self.client.get("/api/recipes/download_shopping_cart/?format=xls")
+        self.assertEqual(response.status_code, 400)
+
+    def test_units_do_not_collide(self):
+        salt = Ingredient.objects.get(name="Соль")
+        kilogram = MeasurementUnit.objects.create(name="кг")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.shopping_list.add(
+                self.create_recipe(salt, 3),
+                self.create_recipe(
+                    Ingredient.objects.create(name="Соль", measurement_unit=kilogram),
+                    1,
+                ),
+            )
+        _, content = self.download("csv")
+        self.assertEqual(
+            content.decode().splitlines()[1:],
+            ["Мука,г,200", "Соль,г,8", "Соль,кг,1"],
+        )
+
+    def test_cached_totals(self):
+        self.download("txt")
+        with self.assertNumQueries(0):
+            _, content = self.download("csv")
+        self.assertIn("Соль,г,5", content.decode())
+
+        entry = RecipeIngredientEntry.objects.get(ingredient__name="Соль")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f"/api/recipes/{entry.recipe_id}/",
+                {"ingredients": [{"id": entry.ingredient_id, "amount": 7}]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        _, content = self.download("csv")
+        self.assertIn("Соль,г,7", content.decode())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.shopping_list.remove(entry.recipe_id)
+        _, content = self.download("csv")
+        self.assertNotIn("Соль", content.decode())
+
+    def test_pdf(self):
+        response, content = self.download("pdf")
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertTrue(content.startswith(b"%PDF"))
+        # The text is drawn with the embedded TrueType font, which has the
+        # glyphs of the Cyrillic ingredient names
+        self.assertIn(b"+DejaVuSans", content)
+        glyphs = pdfmetrics.getFont(PDF_FONT).face.charToGlyph
+        self.assertTrue(all(ord(char) in glyphs for char in "Мука Соль г"))
+
+    def test_invalidated_on_commit(self):
+        self.download("csv")
+        version = get_version(f"shopping_cart:{self.user.pk}")
+        recipe = Recipe.objects.get(ingredients__name="Соль")
+        with self.captureOnCommitCallbacks() as callbacks:
+            recipe.delete()
+            # Another process reading the cart now still sees the old rows
+            self.assertEqual(get_version(f"shopping_cart:{self.user.pk}"), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_version(f"shopping_cart:{self.user.pk}"), version)
+        _, content = self.download("csv")
+        self.assertNotIn("Соль", content.decode())
@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class SubscriptionsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer, *cls.authors = User.objects.bulk_create(
+            User(username=f"user{index}", email=f"user{index}@example.com")
+            for index in range(6)
+        )
+        cls.recipes = {}
+        for count, author in enumerate(cls.authors):
+            cls.recipes[author.pk] = [
+                recipe.pk
+                for recipe in Recipe.objects.bulk_create(
+                    Recipe(
+                        author=author,
+                        image="image.jpg",
+                        name=f"Recipe {index}",
+                        text="Text",
+                        cooking_time=10,
+                    )
+                    for index in range(count)
+                )
+            ]
+        cls.viewer.followed_to.add(*cls.authors[:4])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def test_previews(self):
+        with self.assertNumQueries(4):
+            response = self.client.get("/api/users/subscriptions/?recipes_limit=2")
+        self.assertEqual(response.status_code, 200)
+        authors = response.json()["results"]
+        self.assertEqual(
+            [author["id"] for author in authors],
+            [author.pk for author in self.authors[:4]],
+        )
+        for author in authors:
+            recipes = self.recipes[author["id"]]
+            self.assertEqual(author["recipes_count"], len(recipes))
+            self.assertEqual(
+                [recipe["id"] for recipe in author["recipes"]], recipes[:2]
+            )
+            self.assertTrue(author["is_subscribed"])
+
+    def test_queries_do_not_grow_with_page(self):
+        for limit in (1, 4):
+            with self.assertNumQueries(4):
+                response = self.client.get(f"/api/users/subscriptions/?limit={limit}")
+            authors = response.json()["results"]
+            self.assertEqual(len(authors), limit)
+            for author in authors:
+                self.assertEqual(
+                    len(author["recipes"]), len(self.recipes[author["id"]])
+                )
+
+    def test_invalid_recipes_limit(self):
+        for recipes_limit in ("0", "-1", "many"):
+            response = self.client.get(
+                f"/api/users/subscriptions/?recipes_limit={recipes_limit}"
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("recipes_limit", response.json())
+
+    def test_subscribe(self):
+        author = self.authors[4]
+        response = self.client.get(f"/api/users/{author.pk}/subscribe/?recipes_limit=1")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["recipes_count"], 4)
+        self.assertEqual(
+            [recipe["id"] for recipe in response.json()["recipes"]],
+            self.recipes[author.pk][:1],
+        )
+        self.assertTrue(self.viewer.followed_to.filter(pk=author.pk).exists())
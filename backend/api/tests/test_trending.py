@@ -0,0 +1,103 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, RecipeEvent, Tag, TrendingRecipe
+from recipes.trending import refresh_trending
+
+User = get_user_model()
+
+DAY = 60 * 60 * 24
+
+
+@override_settings(
+    TRENDING_HALF_LIFE=DAY,
+    TRENDING_EVENT_WEIGHTS={"FAVOURITE": 1.0, "SHOPPING_CART": 0.5},
+    TRENDING_MIN_SCORE=0.05,
+)
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create(
+            User(username=f"user{index}", email=f"user{index}@example.com")
+            for index in range(2)
+        )
+        cls.tag = Tag.objects.create(name="Tag", color="#000000", slug="tag")
+        cls.recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=cls.users[0],
+                image="image.jpg",
+                name=f"Recipe {index}",
+                text="Text",
+                cooking_time=10,
+            )
+            for index in range(3)
+        )
+        cls.recipes[2].tags.add(cls.tag)
+
+    def scores(self):
+        return dict(TrendingRecipe.objects.values_list("recipe", "score"))
+
+    def test_refresh_decays_scores(self):
+        now = timezone.now()
+        first, second, third = self.recipes
+        self.users[0].favourite.add(first, second)
+        first.in_shopping_list.add(*self.users)
+        RecipeEvent.objects.update(created=now - timedelta(days=1))
+        self.assertEqual(refresh_trending(now), 3)
+        self.assertEqual(self.scores(), {first.pk: 1.0, second.pk: 0.5})
+
+        self.users[1].favourite.add(third)
+        RecipeEvent.objects.update(created=now + timedelta(days=1))
+        self.assertEqual(refresh_trending(now + timedelta(days=1)), 1)
+        self.assertEqual(self.scores(), {first.pk: 0.5, second.pk: 0.25, third.pk: 1.0})
+
+        refresh_trending(now + timedelta(days=5))
+        self.assertEqual(self.scores(), {third.pk: 0.0625})
+        self.assertFalse(RecipeEvent.objects.exists())
+
+    def test_late_event_kept(self):
+        first, second, third = self.recipes
+        self.users[0].favourite.add(first, second, third)
+        late_id = RecipeEvent.objects.get(recipe=second).id
+        RecipeEvent.objects.filter(id=late_id).delete()
+        in_bulk = TrendingRecipe.objects.in_bulk
+
+        def commit_late_event(*args, **kwargs):
+            # Committed by another transaction once the events were read,
+            # with an id taken before the last one
+            RecipeEvent.objects.create(
+                id=late_id, recipe=second, kind=RecipeEvent.Kind.FAVOURITE
+            )
+            return in_bulk(*args, **kwargs)
+
+        with mock.patch.object(
+            TrendingRecipe.objects, "in_bulk", side_effect=commit_late_event
+        ):
+            self.assertEqual(refresh_trending(), 2)
+        self.assertEqual(set(self.scores()), {first.pk, third.pk})
+        self.assertEqual(refresh_trending(), 1)
+        self.assertEqual(set(self.scores()), {first.pk, second.pk, third.pk})
+        self.assertFalse(RecipeEvent.objects.exists())
+
+    def test_endpoint(self):
+        self.users[0].favourite.add(*self.recipes)
+        self.users[1].favourite.add(self.recipes[1])
+        self.users[1].shopping_list.add(self.recipes[0])
+        refresh_trending()
+        client = APIClient()
+        response = client.get("/api/recipes/trending/")
+        self.assertEqual(
+            [recipe["id"] for recipe in response.json()],
+            [self.recipes[1].pk, self.recipes[0].pk, self.recipes[2].pk],
+        )
+        response = client.get("/api/recipes/trending/?tags=tag&limit=1")
+        self.assertEqual(
+            [recipe["id"] for recipe in response.json()], [self.recipes[2].pk]
+        )
+        response = client.get("/api/recipes/trending/?limit=100")
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,111 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from base64 import b64encode
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, MeasurementUnit, Recipe, Tag
+
+User = get_user_model()
+
+
+def make_image(image_format="PNG", size=(64, 48)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "red").save(buffer, image_format)
+    return buffer.getvalue()
+
+
+class RecipeImageUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username="author", email="a@example.com")
+        cls.ingredient = Ingredient.objects.create(
+            name="Соль", measurement_unit=MeasurementUnit.objects.create(name="г")
+        )
+        cls.tag = Tag.objects.create(name="Ужин", color="#FFFFFF", slug="dinner")
+
+    def setUp(self):
+        self.media_root = media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        # Every upload is spooled to a temporary file, as large ones are
+        settings = override_settings(
+            MEDIA_ROOT=media_root, FILE_UPLOAD_MAX_MEMORY_SIZE=0
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def data(self, image):
+        return {
+            "name": "Recipe",
+            "text": "Text",
+            "cooking_time": 10,
+            "image": image,
+            "tags": json.dumps([self.tag.pk]),
+            "ingredients": json.dumps([{"id": self.ingredient.pk, "amount": 5}]),
+        }
+
+    def post(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                "/api/recipes/", self.data(image), format="multipart"
+            )
+
+    def test_multipart(self):
+        content = make_image()
+        response = self.post(SimpleUploadedFile("photo.bin", content))
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()["ingredients"][0]["amount"], 5)
+        self.assertEqual([tag["id"] for tag in response.json()["tags"]], [self.tag.pk])
+        image = Recipe.objects.get(pk=response.json()["id"]).image
+        self.assertTrue(image.name.endswith(".png"))
+        # Stored as uploaded, without decoding and encoding it again
+        with image.open() as file:
+            self.assertEqual(file.read(), content)
+
+    def test_repeated_tags(self):
+        other = Tag.objects.create(name="Обед", color="#000000", slug="lunch")
+        for tags, expected in (
+            ([self.tag.pk], [self.tag.pk]),
+            ([self.tag.pk, other.pk], [self.tag.pk, other.pk]),
+        ):
+            data = self.data(SimpleUploadedFile("photo.png", make_image()))
+            data["tags"] = [str(tag) for tag in tags]
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post("/api/recipes/", data, format="multipart")
+            self.assertEqual(response.status_code, 201, response.content)
+            self.assertEqual(
+                sorted(tag["id"] for tag in response.json()["tags"]), expected
+            )
+
+    def test_base64(self):
+        data = self.data(f"data:image/png;base64,{b64encode(make_image()).decode()}")
+        data["tags"] = json.loads(data["tags"])
+        data["ingredients"] = json.loads(data["ingredients"])
+        response = self.client.post("/api/recipes/", data, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def test_rejects_non_image(self):
+        for name, content in (
+            ("photo.png", b"not an image at all"),
+            ("photo.bmp", make_image("BMP")),
+        ):
+            response = self.post(SimpleUploadedFile(name, content))
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("image", response.json())
+        self.assertFalse(Recipe.objects.exists())
+        self.assertEqual(os.listdir(self.media_root), [])
+
+    def test_invalid_json_field(self):
+        data = self.data(SimpleUploadedFile("photo.png", make_image()))
+        data["ingredients"] = "[{"
+        response = self.client.post("/api/recipes/", data, format="multipart")
+        self.assertEqual(response.status_code, 400)
@@ -2,12 +2,13 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (DownloadShoppingCart, IngredientViewSet, ListFollowViewSet,
-                    RecipeViewSet, TagViewSet, subscribe)
+                    RecipeViewSet, TagViewSet, UserViewSet, metrics, subscribe)
 
 router = DefaultRouter()
 router.register(r"tags", TagViewSet)
 router.register(r"ingredients", IngredientViewSet)
 router.register(r"recipes", RecipeViewSet, basename="recipes")
+router.register(r"users", UserViewSet)
 
 
 urlpatterns = (
@@ -18,7 +19,7 @@ urlpatterns = (
         DownloadShoppingCart.as_view(),
         name="download_shopping_cart",
     ),
+    path("metrics/", metrics, name="metrics"),
     path("", include(router.urls)),
-    path("", include("djoser.urls")),
     path("auth/", include("djoser.urls.authtoken")),
 )
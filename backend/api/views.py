@@ -1,46 +1,115 @@
+import codecs
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Exists, OuterRef, Sum, Value
-from django.http import HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django_filters import rest_framework as filters
+from djoser import views as djoser_views
 from rest_framework import generics, permissions, status, viewsets
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import Ingredient, Recipe, Tag, TrendingRecipe
 
-from .filters import IngredientFilter, RecipeFilter
+from .autocomplete import ingredient_index
+from .caching import is_not_modified, make_etag, set_validators
+from .feed import get_feed
+from .filters import RecipeFilter, RecipeOrderingFilter, filter_by_tags
+from .matching import recipe_match_index
+from .metrics import registry
+from .paginator import (FeedPagination, PageNumberLimitPagination,
+                        RecipePagination)
+from .parsers import MultiPartJSONParser
 from .permissions import IsStaffOrReadOnly, IsStaffOwnerOrReadOnly
+from .prefetch import SerializerPrefetchMixin, optimize_queryset, prefetch_for
+from .recipe_import import (READERS, RecipeImporter, UploadedImages,
+                            guess_format)
+from .reference import CachedReferenceMixin, get_reference_version
+from .relations import get_viewer_relations
 from .serializers import (IngredientSerializer, RecipeCreateSerializer,
                           RecipeSerializer, RecipeShortSerializer,
                           TagSerializer, UserSubscriptionSerializer)
+from .shopping_cart import RENDERERS, get_shopping_cart_totals
 
 User = get_user_model()
 
 
+def get_recipes_limit(request):
+    recipes_limit = request.query_params.get("recipes_limit")
+    if not recipes_limit:
+        return None
+    try:
+        recipes_limit = int(recipes_limit)
+    except ValueError:
+        recipes_limit = 0
+    if recipes_limit <= 0:
+        raise ValidationError(
+            {"recipes_limit": "recipes_limit must be a positive integer."}
+        )
+    return recipes_limit
+
+
+def with_recipe_previews(queryset, recipes_limit):
+    # The first recipes_limit recipes of every author on the page are
+    # fetched with a single query using a correlated LIMIT subquery
+    recipes = Recipe.objects.order_by("id")
+    if recipes_limit is not None:
+        recipes = recipes.filter(
+            pk__in=Subquery(
+                Recipe.objects.filter(author=OuterRef("author"))
+                .order_by("id")
+                .values("pk")[:recipes_limit]
+            )
+        )
+    # A correlated count keeps GROUP BY out of the page and COUNT(*) queries
+    recipes_count = (
+        Recipe.objects.filter(author=OuterRef("pk"))
+        .order_by()
+        .values("author")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    return queryset.annotate(
+        recipes_count=Coalesce(Subquery(recipes_count), 0)
+    ).prefetch_related(Prefetch("recipes", queryset=recipes, to_attr="recipe_previews"))
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAdminUser])
+def metrics(request):
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @api_view(["GET", "DELETE"])
 @permission_classes([permissions.IsAuthenticated])
 def subscribe(request, uid):
-    author = get_object_or_404(User, id=uid)
-    user = request.user
-    serializer = UserSubscriptionSerializer(
-        author,
-        context={
-            "user": user,
-            "request": request,
-        },
+    author = get_object_or_404(
+        with_recipe_previews(User.objects.all(), get_recipes_limit(request)), id=uid
     )
-    in_followed = user.followed_to.filter(id=author.id).exists()
+    followed = get_viewer_relations(request).followed
+    serializer = UserSubscriptionSerializer(author, context={"request": request})
+    followed.load((author.id,))
+    in_followed = author.id in followed
     error_message_part = (
         "already subscribed" if request.method == "GET" else "not subscribed"
     )
     if request.method == "GET" and not in_followed:
-        user.followed_to.add(author)
+        followed.add(author.id)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     if request.method == "DELETE" and in_followed:
-        user.followed_to.remove(author)
+        followed.remove(author.id)
         return Response(status=status.HTTP_204_NO_CONTENT)
     return Response(
         {"errors": f"You're {error_message_part} to this author"},
@@ -48,6 +117,10 @@ def subscribe(request, uid):
     )
 
 
+class UserViewSet(SerializerPrefetchMixin, djoser_views.UserViewSet):
+    pass
+
+
 class ListFollowViewSet(generics.ListAPIView):
     queryset = User.objects.all()
     permission_classes = [
@@ -55,16 +128,15 @@ class ListFollowViewSet(generics.ListAPIView):
     ]
     serializer_class = UserSubscriptionSerializer
 
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        context.update({"request": self.request, "user": self.request.user})
-        return context
-
     def get_queryset(self):
-        return self.request.user.followed_to.prefetch_related()
+        queryset = with_recipe_previews(
+            self.request.user.followed_to.order_by("id"),
+            get_recipes_limit(self.request),
+        )
+        return optimize_queryset(queryset, self.get_serializer_class())
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CachedReferenceMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsStaffOrReadOnly,)
@@ -72,46 +144,270 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
 
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Ingredient.objects.select_related()
+    queryset = Ingredient.objects.select_related("measurement_unit")
     serializer_class = IngredientSerializer
     permission_classes = (IsStaffOrReadOnly,)
-    filter_backends = (filters.DjangoFilterBackend,)
-    filterset_class = IngredientFilter
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        # Answered from the in-memory index, see api.autocomplete
+        return Response(ingredient_index.search(request.query_params.get("name", "")))
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.prefetch_related()
+class RecipeViewSet(SerializerPrefetchMixin, viewsets.ModelViewSet):
+    queryset = Recipe.objects.all()
     permission_classes = (IsStaffOwnerOrReadOnly,)
     http_method_names = ("get", "post", "delete", "put", "patch")
     # Frontend sends PATCH request on recipe update
     # instead of PUT as it is in the api docs
-    filter_backends = (filters.DjangoFilterBackend,)
+    filter_backends = (filters.DjangoFilterBackend, RecipeOrderingFilter)
     filterset_class = RecipeFilter
+    ordering_fields = ("favourites_count", "created")
+    pagination_class = RecipePagination
+    # Besides JSON with a base64 image, recipes can be sent as multipart
+    # with the image as a file and these fields JSON-encoded
+    parser_classes = (JSONParser, MultiPartJSONParser)
+    multipart_json_fields = ("ingredients", "tags")
 
     def get_queryset(self):
-        user = self.request.user
-        return Recipe.objects.prefetch_related().annotate(
-            is_favorited=(
-                Exists(user.favourite.filter(id=OuterRef("id")))
-                if user.is_authenticated
-                else Value(False)
-            ),
-            is_in_shopping_cart=(
-                Exists(user.shopping_list.filter(id=OuterRef("id")))
-                if user.is_authenticated
-                else Value(False)
-            ),
-        )
+        queryset = super().get_queryset()
+        if self.action in ("list", "retrieve", "trending", "feed", "match"):
+            # Prefetched only once validators show the client copy is stale
+            return queryset.prefetch_related(None)
+        if self.action in ("update", "partial_update"):
+            # Prefetched after the write by RecipeCreateSerializer
+            return queryset.prefetch_related(None)
+        return queryset
 
     def get_serializer_class(self):
         if self.action in ("create", "update", "partial_update"):
             return RecipeCreateSerializer
         return RecipeSerializer
 
+    def get_etag(self, recipes, *extra):
+        """Return the ETag of ``recipes`` as the viewer sees them,
+        computed from the already fetched rows."""
+        relations = get_viewer_relations(self.request)
+        relations.load_recipes(recipes)
+        state = [
+            get_reference_version(Tag),
+            ingredient_index.get_version(),
+            *extra,
+        ]
+        for recipe in recipes:
+            author = recipe.author
+            state.append(
+                (
+                    recipe.id,
+                    recipe.updated,
+                    recipe.favourites_count,
+                    (author.id, author.email, author.username),
+                    (author.first_name, author.last_name),
+                    author.id in relations.followed,
+                    recipe.id in relations.favourites,
+                    recipe.id in relations.shopping_list,
+                )
+            )
+        return make_etag(state)
+
+    def conditional_response(self, recipes, etag, last_modified, get_data):
+        if is_not_modified(self.request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            prefetch_for(recipes, self.get_serializer_class())
+            response = get_data()
+        set_validators(response, etag, last_modified)
+        patch_vary_headers(response, ("Authorization",))
+        if self.request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            recipes = list(queryset)
+            return self.conditional_response(
+                recipes,
+                self.get_etag(recipes),
+                None,
+                lambda: Response(self.get_serializer(recipes, many=True).data),
+            )
+        # Deleted recipes and rows moving onto the page don't show in the
+        # dates of the recipes on it, only the ETag validates a list
+        return self.conditional_response(
+            page,
+            self.get_etag(page, self.paginator.get_page_metadata()),
+            None,
+            lambda: self.get_paginated_response(
+                self.get_serializer(page, many=True).data
+            ),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        recipe = self.get_object()
+        # Favourites and cart changes don't touch recipes, so only the
+        # ETag can tell a personalized response is still fresh
+        last_modified = None if request.user.is_authenticated else recipe.updated
+        return self.conditional_response(
+            (recipe,),
+            self.get_etag((recipe,)),
+            last_modified,
+            lambda: Response(self.get_serializer(recipe).data),
+        )
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @action(methods=("GET",), detail=False)
+    def trending(self, request):
+        """Most popular recipes right now, read from the ranking kept by
+        the refresh_trending command. ``?tags=`` and ``?limit=`` apply."""
+        limit = request.query_params.get("limit", RecipePagination.page_size)
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= settings.TRENDING_MAX_SIZE:
+            raise ValidationError(
+                {
+                    "limit": "limit must be a positive integer up to "
+                    f"{settings.TRENDING_MAX_SIZE}."
+                }
+            )
+        ranking = TrendingRecipe.objects.order_by("-score", "recipe_id")
+        tags = request.query_params.getlist("tags")
+        if tags:
+            ranking = filter_by_tags(ranking, tags, recipe_field="recipe_id")
+        # Walks the score index, then fetches the recipes by primary key
+        ids = list(ranking.values_list("recipe", flat=True)[:limit])
+        recipes = self.get_queryset().in_bulk(ids)
+        recipes = [recipes[pk] for pk in ids if pk in recipes]
+        # The ranking changes without touching the recipes, only the
+        # ETag, which covers their order, can validate the response
+        etag = self.get_etag(recipes)
+        return self.conditional_response(
+            recipes,
+            etag,
+            None,
+            lambda: Response(self.get_serializer(recipes, many=True).data),
+        )
+
+    @action(methods=("GET",), detail=False, permission_classes=(IsAuthenticated,))
+    def feed(self, request):
+        """Recipes of the followed authors, newest first, in keyset pages."""
+        followed = get_viewer_relations(request).followed.ids
+        if followed is None:
+            followed = request.user.followed_to.values_list("id", flat=True)
+        paginator = FeedPagination()
+        entries = paginator.paginate_feed(
+            request,
+            lambda after, limit: get_feed(
+                request.user.pk, list(followed), after, limit
+            ),
+        )
+        recipes = self.get_queryset().in_bulk(entry.id for entry in entries)
+        # Recipes deleted since they were fanned out are left out
+        recipes = [recipes[entry.id] for entry in entries if entry.id in recipes]
+        etag = self.get_etag(recipes, paginator.get_page_metadata())
+        return self.conditional_response(
+            recipes,
+            etag,
+            None,
+            lambda: paginator.get_paginated_response(
+                self.get_serializer(recipes, many=True).data
+            ),
+        )
+
+    @action(methods=("GET",), detail=False)
+    def match(self, request):
+        """Recipes to cook with the ingredients in ``?have=1,5,9``: those
+        using all of them, or with ``?missing_max=`` those needing at most
+        that many others. Each recipe tells how many it is ``missing``."""
+        have = request.query_params.get("have", "")
+        try:
+            have = {int(ingredient_id) for ingredient_id in have.split(",")}
+        except ValueError:
+            have = set()
+        if not 0 < len(have) <= settings.RECIPE_MATCH_MAX_INGREDIENTS:
+            raise ValidationError(
+                {
+                    "have": "have must be a comma-separated list of up to "
+                    f"{settings.RECIPE_MATCH_MAX_INGREDIENTS} ingredient ids."
+                }
+            )
+        missing_max = request.query_params.get("missing_max")
+        if missing_max is not None:
+            try:
+                missing_max = int(missing_max)
+            except ValueError:
+                missing_max = -1
+            if missing_max < 0:
+                raise ValidationError(
+                    {"missing_max": "missing_max must be a non-negative integer."}
+                )
+        paginator = PageNumberLimitPagination()
+        page = paginator.paginate_queryset(
+            recipe_match_index.match(have, missing_max), request, self
+        )
+        recipes = self.get_queryset().in_bulk(recipe_id for recipe_id, _ in page)
+        missing = {
+            recipe_id: count for recipe_id, count in page if recipe_id in recipes
+        }
+        recipes = [recipes[recipe_id] for recipe_id in missing]
+        metadata = {
+            "count": paginator.page.paginator.count,
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link(),
+        }
+        return self.conditional_response(
+            recipes,
+            self.get_etag(recipes, metadata, list(missing.items())),
+            None,
+            lambda: paginator.get_paginated_response(
+                [
+                    {**recipe, "missing": missing[recipe["id"]]}
+                    for recipe in self.get_serializer(recipes, many=True).data
+                ]
+            ),
+        )
+
+    @action(
+        methods=("POST",),
+        detail=False,
+        url_path="import",
+        parser_classes=(MultiPartParser,),
+    )
+    def import_recipes(self, request):
+        """Create recipes of the current user from an NDJSON or CSV
+        ``file``. Image paths refer to files uploaded as ``images``."""
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response(
+                {"errors": "Recipes must be uploaded in the file field"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        import_format = request.data.get("format") or guess_format(upload.name)
+        if import_format not in READERS:
+            return Response(
+                {"errors": f"Format must be one of: {', '.join(READERS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        rejected = []
+        importer = RecipeImporter(
+            request.user,
+            UploadedImages(request.FILES.getlist("images")),
+            lambda number, errors, row: rejected.append(
+                {"line": number, "errors": errors}
+            ),
+        )
+        created, failed = importer.run(
+            READERS[import_format](codecs.iterdecode(upload, "utf-8"))
+        )
+        return Response({"created": created, "failed": failed, "errors": rejected})
+
     @action(
         methods=("GET", "DELETE"),
         detail=False,
@@ -119,17 +415,18 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer_class=RecipeShortSerializer,
     )
     def favorite(self, request, recipe_id):
-        user = request.user
+        favourites = get_viewer_relations(request).favourites
         recipe = get_object_or_404(self.get_queryset(), pk=recipe_id)
         serializer = self.get_serializer(recipe)
-        recipe_in_favorite = user.favourite.filter(id=recipe.id).exists()
+        favourites.load((recipe.id,))
+        recipe_in_favorite = recipe.id in favourites
         error_msg_part = "is already" if request.method == "GET" else "is not"
         if request.method == "GET" and not recipe_in_favorite:
-            user.favourite.add(recipe)
+            favourites.add(recipe.id)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if request.method == "DELETE" and recipe_in_favorite:
-            user.favourite.remove(recipe)
+            favourites.remove(recipe.id)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         return Response(
@@ -144,17 +441,18 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer_class=RecipeShortSerializer,
     )
     def shopping_cart(self, request, recipe_id):
-        user = request.user
+        shopping_list = get_viewer_relations(request).shopping_list
         recipe = get_object_or_404(self.get_queryset(), pk=recipe_id)
         serializer = self.get_serializer(recipe)
-        recipe_in_cart = user.shopping_list.filter(id=recipe.id).exists()
+        shopping_list.load((recipe.id,))
+        recipe_in_cart = recipe.id in shopping_list
         error_msg_part = "is already" if request.method == "GET" else "is not"
         if request.method == "GET" and not recipe_in_cart:
-            user.shopping_list.add(recipe)
+            shopping_list.add(recipe.id)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if request.method == "DELETE" and recipe_in_cart:
-            user.shopping_list.remove(recipe)
+            shopping_list.remove(recipe.id)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         return Response(
@@ -163,33 +461,34 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
 
+class IgnoreFormatContentNegotiation(BaseContentNegotiation):
+    # ?format= selects the export format, not a DRF renderer
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return (renderers[0], renderers[0].media_type)
+
+
 class DownloadShoppingCart(APIView):
     permission_classes = (IsAuthenticated,)
+    content_negotiation_class = IgnoreFormatContentNegotiation
 
     def get(self, request):
-        shopping_list = {}
-        user = request.user
-        ingredients = user.shopping_list.values(
-            "ingredient_entries__ingredient__name",
-            "ingredient_entries__ingredient__measurement_unit__name",
-        ).annotate(total=Sum("ingredient_entries__amount"))
-        for ingredient in ingredients:
-            amount = ingredient["total"]
-            name = ingredient["ingredient_entries__ingredient__name"]
-            measurement_unit = ingredient[
-                "ingredient_entries__ingredient__measurement_unit__name"
-            ]
-            shopping_list[name] = {
-                "measurement_unit": measurement_unit,
-                "amount": amount,
-            }
-        to_buy = []
-        for item in shopping_list:
-            to_buy.append(
-                f'{item}      {shopping_list[item]["amount"]} '
-                f'{shopping_list[item]["measurement_unit"]} \n'
+        export_format = request.query_params.get("format", "txt")
+        if export_format not in RENDERERS:
+            return Response(
+                {"errors": f"Format must be one of: {', '.join(RENDERERS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-
-        response = HttpResponse(to_buy, "Content-Type: text/plain")
-        response["Content-Disposition"] = 'attachment; filename="to_buy.txt"'
+        content_type, render = RENDERERS[export_format]
+        totals = get_shopping_cart_totals(request.user)
+        if isinstance(request._request, ASGIRequest):
+            # Under ASGI Django 4.0 iterates streamed content in the event
+            # loop, where the queries of the generator are not allowed
+            totals = list(totals)
+        response = StreamingHttpResponse(render(totals), content_type=content_type)
+        response["Content-Disposition"] = (
+            f'attachment; filename="to_buy.{export_format}"'
+        )
         return response
@@ -34,9 +34,11 @@ INSTALLED_APPS = [
     "djoser",
     "users.apps.UsersConfig",
     "recipes.apps.RecipesConfig",
+    "api.apps.ApiConfig",
 ]
 
 MIDDLEWARE = [
+    "api.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -81,6 +83,22 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+
+# Cached data is invalidated through versions kept in this cache, so it
+# has to be shared by every worker, service and management command, e.g.
+# django.core.cache.backends.redis.RedisCache at redis://redis:6379/0.
+# The per-process default only suits a single development process.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -121,6 +139,12 @@ STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Uploads are streamed to a temporary file instead of memory. With the
+# temporary directory on the same filesystem as MEDIA_ROOT saving an
+# upload is a rename.
+FILE_UPLOAD_HANDLERS = ("django.core.files.uploadhandler.TemporaryFileUploadHandler",)
+FILE_UPLOAD_TEMP_DIR = os.getenv("FILE_UPLOAD_TEMP_DIR")
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
 
@@ -132,12 +156,70 @@ AUTHENTICATION_BACKENDS = ("django.contrib.auth.backends.ModelBackend",)
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_PAGINATION_CLASS": "api.paginator." "PageNumberLimitPagination",
     "PAGE_SIZE": 6,
 }
 
+# Tokens and their users cached per process when the cache is shared,
+# seconds they stay cached, and whether they are also kept in the cache
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_TOKEN_CACHE_TIMEOUT = 60 * 5
+AUTH_TOKEN_CACHE_SHARED = os.getenv("AUTH_TOKEN_CACHE_SHARED", "") == "1"
+
+# Above this many followed authors, favourites or cart items per user
+# membership is checked with per-object queries and lists are filtered
+# with a semi-join instead of an ID set
+VIEWER_RELATIONS_MAX_IDS = 1000
+
+INGREDIENT_AUTOCOMPLETE_LIMIT = 50
+
+# Seconds clients and proxies may reuse tags and other reference data
+# before revalidating them with their ETag
+REFERENCE_DATA_MAX_AGE = 60
+
+SHOPPING_CART_CACHE_TIMEOUT = 60 * 60 * 24
+# TrueType font of PDF shopping lists, it has to cover Cyrillic
+SHOPPING_CART_PDF_FONT = os.getenv(
+    "SHOPPING_CART_PDF_FONT", os.path.join(BASE_DIR, "api", "fonts", "DejaVuSans.ttf")
+)
+
+# Rows validated together by populate_recipes and the import endpoint,
+# and rows written per transaction
+RECIPE_IMPORT_CHUNK_SIZE = 1000
+RECIPE_IMPORT_BATCH_SIZE = 200
+
+# Longest side in pixels of the recipe image variants, WEBP falls back
+# to JPEG when Pillow is built without it
+RECIPE_IMAGE_RENDITIONS = {"thumb": 160, "card": 480, "full": 1280}
+RECIPE_IMAGE_RENDITION_FORMAT = os.getenv("RECIPE_IMAGE_RENDITION_FORMAT", "WEBP")
+# Renditions never change under their name
+RECIPE_IMAGE_RENDITION_MAX_AGE = 60 * 60 * 24 * 365
+
+# Trending recipes: seconds after which an added favourite or cart entry
+# counts half, weight of each kind of event, scores dropped from the
+# ranking and most recipes returned at once
+TRENDING_HALF_LIFE = 60 * 60 * 24
+TRENDING_EVENT_WEIGHTS = {"FAVOURITE": 1.0, "SHOPPING_CART": 0.5}
+TRENDING_MIN_SCORE = 0.05
+TRENDING_MAX_SIZE = 50
+
+# Followed authors feed: recipes kept in a user's cached timeline, seconds
+# an unread timeline stays cached, authors with more followers than this
+# are merged in on read instead of fanned out, and seconds their follower
+# counts are cached
+FEED_TIMELINE_SIZE = 500
+FEED_TIMELINE_TIMEOUT = 60 * 60 * 24
+FEED_FANOUT_MAX_FOLLOWERS = 1000
+FEED_FOLLOWER_COUNT_TIMEOUT = 60 * 10
+
+# Most ingredient ids accepted by /api/recipes/match/
+RECIPE_MATCH_MAX_INGREDIENTS = 100
+
+# Text search configuration of the recipe search documents on PostgreSQL
+SEARCH_CONFIG = os.getenv("SEARCH_CONFIG", "russian")
+
 DJOSER = {
     "SERIALIZERS": {
         "user": "api.serializers.UserSerializer",
@@ -16,7 +16,10 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 
+from recipes.views import rendition
+
 urlpatterns = (
     path("api/", include("api.urls")),
     path("admin/", admin.site.urls),
+    path("media/renditions/<path:name>", rendition, name="rendition"),
 )
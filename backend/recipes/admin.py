@@ -33,7 +33,7 @@ class MeasurementUnitAdmin(admin.ModelAdmin):
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     fields = (
-        ("author", "times_in_favourite"),
+        ("author", "favourites_count", "in_carts_count"),
         "tags",
         "image",
         "name",
@@ -41,9 +41,10 @@ class RecipeAdmin(admin.ModelAdmin):
         "cooking_time",
     )
     inlines = (RecipeIngredientEntryInLine,)
-    readonly_fields = ("times_in_favourite",)
+    readonly_fields = ("favourites_count", "in_carts_count")
     list_display = (
         "name",
         "author",
+        "favourites_count",
     )
     list_filter = ("author__username", "name", "tags")
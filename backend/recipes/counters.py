@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Recipe
+
+User = get_user_model()
+
+# Recipe counter fields of the user to recipe relations. Counters shown
+# in the API also bump Recipe.updated so cached responses are refreshed.
+COUNTERS = {
+    "favourites_count": (User.favourite, True),
+    "in_carts_count": (User.shopping_list, False),
+}
+
+
+def set_counter(field, recipes, value):
+    values = {field: value}
+    if COUNTERS[field][1]:
+        values["updated"] = timezone.now()
+    return recipes.update(**values)
+
+
+def change_counter(field, recipes, delta):
+    return set_counter(field, recipes, Greatest(F(field) + delta, 0))
+
+
+def count_relation_change(field, instance, action, reverse, pk_set):
+    """Apply an ``m2m_changed`` action of the counted relation.
+
+    On add ``pk_set`` holds only the rows actually inserted, on remove
+    the requested ones. ``RelationSet`` and ``set()`` remove existing
+    rows only, drift from other callers is fixed by the
+    reconcile_recipe_counters command.
+    """
+    if action in ("post_add", "post_remove") and pk_set:
+        step = 1 if action == "post_add" else -1
+        if reverse:
+            recipes = Recipe.objects.filter(pk=instance.pk)
+            change_counter(field, recipes, step * len(pk_set))
+        else:
+            change_counter(field, Recipe.objects.filter(pk__in=pk_set), step)
+    elif action == "pre_clear":
+        if reverse:
+            set_counter(field, Recipe.objects.filter(pk=instance.pk), 0)
+        else:
+            remove_user(field, instance)
+
+
+def remove_user(field, user):
+    """Take all recipes related to ``user`` off the counter."""
+    related_name = COUNTERS[field][0].rel.related_name
+    change_counter(field, Recipe.objects.filter(**{related_name: user}), -1)
+
+
+def actual_count(field):
+    """Expression counting the relation rows of the outer recipe."""
+    through = COUNTERS[field][0].through
+    return Coalesce(
+        Subquery(
+            through.objects.filter(recipe=OuterRef("pk"))
+            .order_by()
+            .values("recipe")
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+def reconcile_counter(field):
+    """Set the counter to the actual count where they differ and return
+    the number of recipes fixed."""
+    count = actual_count(field)
+    return Recipe.objects.exclude(**{field: count}).update(**{field: count})
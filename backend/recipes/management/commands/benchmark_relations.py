@@ -0,0 +1,95 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+
+User = get_user_model()
+
+URLS = (
+    "/api/recipes/",
+    "/api/recipes/?is_favorited=1",
+    "/api/recipes/?is_in_shopping_cart=1",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the recipe list for a user with more and more favourites "
+        "and shopping cart recipes. Everything it creates is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[0, 100, 1000, 10000],
+            help="Favourite and shopping cart counts to measure.",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="Requests per measurement."
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.benchmark(sorted(options["sizes"]), options["repeat"])
+            transaction.set_rollback(True)
+
+    def benchmark(self, sizes, repeat):
+        author, viewer = User.objects.bulk_create(
+            User(username=f"benchmark-{role}", email=f"benchmark-{role}@example.com")
+            for role in ("author", "viewer")
+        )
+        missing = sizes[-1] - Recipe.objects.count()
+        Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    author=author,
+                    image="recipes/benchmark.jpg",
+                    name=f"Benchmark {index}",
+                    text="Text",
+                    cooking_time=10,
+                )
+                for index in range(missing)
+            ),
+            batch_size=1000,
+        )
+        recipe_ids = list(
+            Recipe.objects.order_by("-created", "id").values_list("id", flat=True)[
+                : sizes[-1]
+            ]
+        )
+        client = APIClient()
+        client.force_authenticate(viewer)
+
+        added = 0
+        for size in sizes:
+            for relation in (User.favourite, User.shopping_list):
+                relation.through.objects.bulk_create(
+                    (
+                        relation.through(user=viewer, recipe_id=recipe_id)
+                        for recipe_id in recipe_ids[added:size]
+                    ),
+                    batch_size=1000,
+                )
+            added = size
+            for url in URLS:
+                with CaptureQueriesContext(connection) as context:
+                    client.get(url)
+                # Read now, the next request clears the query log
+                queries = len(context.captured_queries)
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    client.get(url)
+                    timings.append((time.perf_counter() - start) * 1000)
+                self.stdout.write(
+                    f"{size:>7} {url:<40} {statistics.median(timings):8.1f} ms "
+                    f"{queries:3} queries"
+                )
@@ -0,0 +1,138 @@
+import asyncio
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from recipes.management.load import fetch, percentiles
+
+SERVERS = {
+    "wsgi": ("foodgram.wsgi:application",),
+    "asgi": ("foodgram.asgi:application", "-k", "uvicorn.workers.UvicornWorker"),
+}
+URLS = (
+    "/api/tags/",
+    "/api/ingredients/?name=%D1%81%D0%BE",
+    "/api/recipes/",
+)
+START_TIMEOUT = 30
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Starts gunicorn with sync workers and with uvicorn workers on the "
+        "configured database and compares their throughput under more and "
+        "more concurrent connections."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            nargs="+",
+            default=[1, 10, 50, 200],
+            help="Concurrent connections to measure.",
+        )
+        parser.add_argument(
+            "--duration", type=float, default=5, help="Seconds per measurement."
+        )
+        parser.add_argument(
+            "--workers", type=int, default=1, help="Worker processes of each server."
+        )
+        parser.add_argument(
+            "--client-delay",
+            type=float,
+            default=0,
+            help="Seconds each client pauses halfway through sending a "
+            "request, as slow clients do.",
+        )
+        parser.add_argument(
+            "--urls", nargs="+", default=URLS, help="Paths requested in turn."
+        )
+
+    def handle(self, *args, **options):
+        for name, app in SERVERS.items():
+            port = _free_port()
+            process = subprocess.Popen(
+                (
+                    sys.executable,
+                    "-m",
+                    "gunicorn",
+                    *app,
+                    "--workers",
+                    str(options["workers"]),
+                    "--bind",
+                    f"127.0.0.1:{port}",
+                    "--log-level",
+                    "warning",
+                ),
+                cwd=settings.BASE_DIR,
+            )
+            try:
+                self.wait_for(process, port)
+                for concurrency in options["concurrency"]:
+                    timings, errors = asyncio.run(
+                        self.load(
+                            port,
+                            options["urls"],
+                            concurrency,
+                            options["duration"],
+                            options["client_delay"],
+                        )
+                    )
+                    self.report(name, concurrency, options["duration"], timings, errors)
+            finally:
+                process.terminate()
+                process.wait()
+
+    def wait_for(self, process, port):
+        deadline = time.monotonic() + START_TIMEOUT
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError("The server exited on start.")
+            try:
+                socket.create_connection(("127.0.0.1", port)).close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise CommandError("The server did not start in time.")
+
+    async def load(self, port, urls, concurrency, duration, client_delay):
+        deadline = time.monotonic() + duration
+        timings = []
+        errors = 0
+
+        async def client(index):
+            nonlocal errors
+            while time.monotonic() < deadline:
+                url = urls[index % len(urls)]
+                index += 1
+                status, elapsed = await fetch(
+                    "127.0.0.1", port, url, client_delay=client_delay
+                )
+                if status == 200:
+                    timings.append(elapsed)
+                else:
+                    errors += 1
+
+        await asyncio.gather(*(client(index) for index in range(concurrency)))
+        return timings, errors
+
+    def report(self, name, concurrency, duration, timings, errors):
+        p50, p99 = percentiles(timings, 50, 99)
+        if p50 is None:
+            self.stdout.write(f"{name} {concurrency:>5} connections: no responses")
+            return
+        self.stdout.write(
+            f"{name} {concurrency:>5} connections {len(timings) / duration:8.1f} "
+            f"req/s  p50 {p50:7.1f} ms  p99 {p99:7.1f} ms  {errors} errors"
+        )
@@ -0,0 +1,275 @@
+import io
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from api.autocomplete import ingredient_index
+from api.matching import recipe_match_index
+from api.reference import invalidate_reference_data
+from recipes.counters import COUNTERS, reconcile_counter
+from recipes.models import (Ingredient, MeasurementUnit, Recipe,
+                            RecipeIngredientEntry, Tag)
+from recipes.search import index_recipes
+
+User = get_user_model()
+
+IMAGE_NAME = "fake_recipe.jpg"
+
+
+class Sampler:
+    """Draws distinct items with Zipf-like popularity: the item at rank
+    r is picked with weight 1 / r ** skew, ranks are shuffled so any
+    item can be popular. A skew of 0 draws uniformly."""
+
+    def __init__(self, rng, items, skew):
+        self.rng = rng
+        self.items = list(items)
+        rng.shuffle(self.items)
+        self.cum_weights = list(
+            accumulate(1 / (rank**skew) for rank in range(1, len(self.items) + 1))
+        )
+
+    def one(self):
+        return self.rng.choices(self.items, cum_weights=self.cum_weights)[0]
+
+    def distinct(self, count, exclude=None):
+        count = min(count, len(self.items) - (exclude is not None))
+        chosen = set()
+        # Popular items repeat, give up on a few rather than loop long
+        for _ in range(10):
+            if len(chosen) >= count:
+                break
+            for item in self.rng.choices(
+                self.items, cum_weights=self.cum_weights, k=2 * count
+            ):
+                if item != exclude:
+                    chosen.add(item)
+                    if len(chosen) >= count:
+                        break
+        return chosen
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates users, recipes with ingredients and tags, follows, "
+        "favourites and shopping carts for load testing. The same seed on "
+        "the same database creates the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--recipes", type=int, default=5000)
+        parser.add_argument(
+            "--ingredients",
+            type=int,
+            default=1000,
+            help="Ingredients to draw from, created as needed.",
+        )
+        parser.add_argument(
+            "--tags", type=int, default=10, help="Tags to draw from, created as needed."
+        )
+        parser.add_argument(
+            "--ingredients-per-recipe",
+            type=int,
+            nargs=2,
+            default=(3, 12),
+            metavar=("MIN", "MAX"),
+        )
+        parser.add_argument(
+            "--tags-per-recipe",
+            type=int,
+            nargs=2,
+            default=(1, 3),
+            metavar=("MIN", "MAX"),
+        )
+        parser.add_argument(
+            "--follows",
+            type=float,
+            default=10,
+            help="Mean followed authors per user, exponentially distributed.",
+        )
+        parser.add_argument(
+            "--favourites", type=float, default=20, help="Mean favourites per user."
+        )
+        parser.add_argument(
+            "--cart", type=float, default=5, help="Mean shopping cart recipes per user."
+        )
+        parser.add_argument(
+            "--skew",
+            type=float,
+            default=1.0,
+            help="Zipf exponent of author, ingredient and recipe popularity, "
+            "0 for uniform.",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="Recipes are spread over this many past days.",
+        )
+        parser.add_argument(
+            "--password", help="Password of the created users, unusable by default."
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        with transaction.atomic():
+            ingredients = self.ensure_ingredients(options["ingredients"])
+            tags = self.ensure_tags(rng, options["tags"])
+            users = self.create_users(options["users"], options["password"])
+            recipes = self.create_recipes(rng, users, ingredients, tags, options)
+            self.create_relations(rng, users, recipes, options)
+            for field in COUNTERS:
+                reconcile_counter(field)
+            # Bulk inserts send no signals
+            index_recipes(recipes)
+            transaction.on_commit(recipe_match_index.invalidate)
+        self.ensure_image()
+        self.stdout.write(
+            f"Created {len(users)} users and {len(recipes)} recipes "
+            f"with seed {options['seed']}"
+        )
+
+    def bulk_create(self, objects):
+        objects = list(objects)
+        if objects:
+            type(objects[0]).objects.bulk_create(objects, batch_size=self.batch_size)
+        return objects
+
+    def ensure_ingredients(self, count):
+        missing = count - Ingredient.objects.count()
+        if missing > 0:
+            unit = MeasurementUnit.objects.get_or_create(name="г")[0]
+            start = Ingredient.objects.count()
+            self.bulk_create(
+                Ingredient(name=f"Ingredient {start + index}", measurement_unit=unit)
+                for index in range(missing)
+            )
+            transaction.on_commit(ingredient_index.invalidate)
+        return list(Ingredient.objects.order_by("id").values_list("id", flat=True))[
+            :count
+        ]
+
+    def ensure_tags(self, rng, count):
+        missing = count - Tag.objects.count()
+        if missing > 0:
+            start = Tag.objects.count()
+            self.bulk_create(
+                Tag(
+                    name=f"Tag {start + index}",
+                    color=f"#{rng.randrange(0x1000000):06X}",
+                    slug=f"tag-{start + index}",
+                )
+                for index in range(missing)
+            )
+            transaction.on_commit(lambda: invalidate_reference_data(Tag))
+        return list(Tag.objects.order_by("id").values_list("id", flat=True))[:count]
+
+    def create_users(self, count, password):
+        password = make_password(password)
+        start = User.objects.count()
+        users = self.bulk_create(
+            User(
+                username=f"fake{start + index}",
+                email=f"fake{start + index}@example.com",
+                first_name="Fake",
+                last_name=f"User {start + index}",
+                password=password,
+            )
+            for index in range(count)
+        )
+        return [user.pk for user in users]
+
+    def create_recipes(self, rng, users, ingredients, tags, options):
+        authors = Sampler(rng, users, options["skew"])
+        ingredient_sampler = Sampler(rng, ingredients, options["skew"])
+        names = dict(Ingredient.objects.values_list("id", "name"))
+        now = timezone.now()
+        recipes = []
+        for _ in range(options["recipes"]):
+            recipe_ingredients = ingredient_sampler.distinct(
+                rng.randint(*options["ingredients_per_recipe"])
+            )
+            recipe_names = [
+                names[ingredient_id] for ingredient_id in recipe_ingredients
+            ]
+            created = now - timedelta(seconds=rng.uniform(0, options["days"] * 86400))
+            recipe = Recipe(
+                author_id=authors.one(),
+                image=IMAGE_NAME,
+                name=", ".join(recipe_names[:2]),
+                text=f"Mix {', '.join(recipe_names)}.",
+                cooking_time=rng.randint(5, 180),
+                created=created,
+                updated=created,
+            )
+            recipe.fake_ingredients = recipe_ingredients
+            recipe.fake_tags = rng.sample(
+                tags, min(rng.randint(*options["tags_per_recipe"]), len(tags))
+            )
+            recipes.append(recipe)
+        self.bulk_create(recipes)
+        # auto_now_add and auto_now fields ignore the values on insert
+        Recipe.objects.bulk_update(
+            recipes, ("created", "updated"), batch_size=self.batch_size
+        )
+        self.bulk_create(
+            RecipeIngredientEntry(
+                recipe=recipe, ingredient_id=ingredient_id, amount=rng.randint(1, 500)
+            )
+            for recipe in recipes
+            for ingredient_id in sorted(recipe.fake_ingredients)
+        )
+        self.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag_id=tag_id)
+            for recipe in recipes
+            for tag_id in recipe.fake_tags
+        )
+        return [recipe.pk for recipe in recipes]
+
+    def create_relations(self, rng, users, recipes, options):
+        authors = Sampler(rng, users, options["skew"])
+        popular = Sampler(rng, recipes, options["skew"])
+        relations = (
+            (
+                User.followed_to.through,
+                "from_user_id",
+                "to_user_id",
+                authors,
+                "follows",
+            ),
+            (User.favourite.through, "user_id", "recipe_id", popular, "favourites"),
+            (User.shopping_list.through, "user_id", "recipe_id", popular, "cart"),
+        )
+        for model, source, target, sampler, option in relations:
+            mean = options[option]
+            self.bulk_create(
+                model(**{source: user_id, target: target_id})
+                for user_id in users
+                for target_id in sorted(
+                    sampler.distinct(
+                        round(rng.expovariate(1 / mean)) if mean else 0,
+                        exclude=user_id if option == "follows" else None,
+                    )
+                )
+            )
+
+    def ensure_image(self):
+        if default_storage.exists(IMAGE_NAME):
+            return
+        image = Image.new("RGB", (1280, 960), (222, 184, 135))
+        content = io.BytesIO()
+        image.save(content, "JPEG")
+        default_storage.save(IMAGE_NAME, ContentFile(content.getvalue()))
@@ -0,0 +1,175 @@
+import asyncio
+import random
+import time
+from collections import Counter, defaultdict
+from urllib.parse import quote, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from recipes.management.load import fetch, percentiles
+from recipes.models import Recipe, Tag
+
+User = get_user_model()
+
+# Endpoint, share of the requests and whether it needs a user
+MIX = (
+    ("recipe list", 35, False),
+    ("recipe detail", 30, False),
+    ("recipe filter", 20, False),
+    ("subscriptions", 10, True),
+    ("cart download", 5, True),
+)
+
+
+class Workload:
+    """Picks requests of the mix from the data in the database."""
+
+    def __init__(self, rng, user_count):
+        recipes = list(
+            Recipe.objects.order_by("id").values_list(
+                "id", "author_id", "favourites_count"
+            )
+        )
+        if not recipes:
+            raise CommandError("There are no recipes, see generate_fake_data.")
+        self.recipe_ids = [recipe[0] for recipe in recipes]
+        self.author_ids = [recipe[1] for recipe in recipes]
+        # Popular recipes are opened more often
+        self.recipe_weights = [recipe[2] + 1 for recipe in recipes]
+        self.tags = list(Tag.objects.order_by("id").values_list("slug", flat=True))
+        users = list(
+            User.objects.filter(followed_to__isnull=False, is_active=True)
+            .distinct()
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        users = rng.sample(users, min(user_count, len(users)))
+        self.tokens = [
+            Token.objects.get_or_create(user_id=user_id)[0].key for user_id in users
+        ]
+        self.page_count = max(len(recipes) // 6, 1)
+
+    def recipe_filter(self, rng, authenticated):
+        choices = [f"author={rng.choice(self.author_ids)}"]
+        if self.tags:
+            choices.append(f"tags={quote(rng.choice(self.tags))}")
+        if authenticated:
+            choices += ["is_favorited=1", "is_in_shopping_cart=1"]
+        return f"/api/recipes/?{rng.choice(choices)}"
+
+    def pick(self, rng, auth_share):
+        endpoint, _, needs_user = rng.choices(MIX, weights=[item[1] for item in MIX])[0]
+        authenticated = bool(self.tokens) and (needs_user or rng.random() < auth_share)
+        if needs_user and not authenticated:
+            return self.pick(rng, auth_share)
+        if endpoint == "recipe list":
+            # Most readers stay on the first pages
+            page = min(int(rng.expovariate(0.5)) + 1, self.page_count)
+            path = f"/api/recipes/?page={page}"
+        elif endpoint == "recipe detail":
+            recipe_id = rng.choices(self.recipe_ids, weights=self.recipe_weights)[0]
+            path = f"/api/recipes/{recipe_id}/"
+        elif endpoint == "recipe filter":
+            path = self.recipe_filter(rng, authenticated)
+        elif endpoint == "subscriptions":
+            path = "/api/users/subscriptions/?recipes_limit=3"
+        else:
+            path = "/api/recipes/download_shopping_cart/"
+        headers = {}
+        if authenticated:
+            headers["Authorization"] = f"Token {rng.choice(self.tokens)}"
+        return endpoint, path, headers
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays a mix of recipe list, detail, filter, subscription and "
+        "shopping cart requests against a running server and reports "
+        "latency percentiles and throughput per endpoint. Creates API "
+        "tokens for the users it signs in as."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url", default="http://127.0.0.1:8000", help="Server to load."
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=20, help="Concurrent connections."
+        )
+        parser.add_argument(
+            "--duration", type=float, default=30, help="Seconds to run for."
+        )
+        parser.add_argument(
+            "--users", type=int, default=100, help="Users requests are signed in as."
+        )
+        parser.add_argument(
+            "--auth-share",
+            type=float,
+            default=0.5,
+            help="Share of the public requests sent signed in.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        url = urlsplit(options["url"])
+        if url.scheme != "http" or not url.hostname:
+            raise CommandError("Only http:// URLs are supported.")
+        rng = random.Random(options["seed"])
+        workload = Workload(rng, options["users"])
+        timings, errors = asyncio.run(
+            self.load(
+                url.hostname,
+                url.port or 80,
+                workload,
+                options["concurrency"],
+                options["duration"],
+                options["auth_share"],
+                options["seed"],
+            )
+        )
+        self.report(timings, errors, options["duration"])
+
+    async def load(self, host, port, workload, concurrency, duration, auth_share, seed):
+        deadline = time.monotonic() + duration
+        timings = defaultdict(list)
+        errors = Counter()
+
+        async def client(index):
+            # Every connection replays its own seeded sequence
+            rng = random.Random(f"{seed}:{index}")
+            while time.monotonic() < deadline:
+                endpoint, path, headers = workload.pick(rng, auth_share)
+                status, elapsed = await fetch(host, port, path, headers)
+                if status == 200:
+                    timings[endpoint].append(elapsed)
+                else:
+                    errors[endpoint] += 1
+
+        await asyncio.gather(*(client(index) for index in range(concurrency)))
+        return timings, errors
+
+    def report(self, timings, errors, duration):
+        self.stdout.write(
+            f"{'endpoint':<16}{'requests':>9}{'req/s':>9}"
+            f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}"
+        )
+        rows = [(endpoint, timings[endpoint], errors[endpoint]) for endpoint, *_ in MIX]
+        rows.append(
+            (
+                "total",
+                [
+                    timing
+                    for _, endpoint_timings, _ in rows
+                    for timing in endpoint_timings
+                ],
+                sum(errors.values()),
+            )
+        )
+        for endpoint, endpoint_timings, endpoint_errors in rows:
+            count = len(endpoint_timings)
+            line = f"{endpoint:<16}{count:>9}{count / duration:>9.1f}"
+            for value in percentiles(endpoint_timings, 50, 95, 99):
+                line += f"{'-':>9}" if value is None else f"{value:>9.1f}"
+            self.stdout.write(f"{line}{endpoint_errors:>8}")
@@ -1,40 +1,162 @@
 import csv
+import io
+import time
+from itertools import islice
 
 from django.core.management import BaseCommand
+from django.db import connection, transaction
 
+from api.autocomplete import ingredient_index
 from recipes.models import Ingredient, MeasurementUnit
 
+NAME_MAX_LENGTH = Ingredient._meta.get_field("name").max_length
+UNIT_MAX_LENGTH = MeasurementUnit._meta.get_field("name").max_length
+
 
 class Command(BaseCommand):
-    help = "Loads ingredients and their measurement units from CSV file."
+    help = (
+        "Loads ingredients and their measurement units from CSV file. "
+        "Ingredients that already exist are left as they are, "
+        "so the command can be rerun with an updated catalogue."
+    )
 
     def add_arguments(self, parser):
         parser.add_argument("file_path", type=str)
+        parser.add_argument(
+            "--batch-size", type=int, default=5000, help="Rows written at once."
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Print the ingredients and units that would be added, write nothing.",
+        )
+        parser.add_argument(
+            "--progress-interval",
+            type=float,
+            default=1,
+            help="Seconds between progress reports.",
+        )
 
     def handle(self, *args, **options):
+        self.dry_run = options["dry_run"]
+        self.units = dict(MeasurementUnit.objects.values_list("name", "id"))
+        self.processed = self.added = self.skipped = 0
+        started = last_report = time.monotonic()
+
         self.stdout.write("Process started")
         file_path = options["file_path"]
-        ingredients = []
         with open(file_path, "r", newline="", encoding="utf-8") as file:
             self.stdout.write(f"Opened {file_path}")
             reader = csv.reader(file, delimiter=",")
-            for entry in reader:
-                measurement_unit = MeasurementUnit.objects.get_or_create(name=entry[1])[
-                    0
-                ]
-                ingredient = Ingredient(
-                    name=entry[0], measurement_unit=measurement_unit
-                )
-                ingredients.append(ingredient)
-                self.stdout.write(f"Entry {entry[0]}, {entry[1]} was parsed")
-
-                if len(ingredients) > 999:
-                    Ingredient.objects.bulk_create(ingredients)
-                    self.stdout.write(f"{len(ingredients)} entries were bulk created")
-                    ingredients = []
-
-        if ingredients:
-            Ingredient.objects.bulk_create(ingredients)
-            self.stdout.write(f"{len(ingredients)} entries were bulk created")
+            entries = (entry for entry in reader if entry)
+            while True:
+                batch = list(islice(entries, options["batch_size"]))
+                if not batch:
+                    break
+                rows = self.parse(batch)
+                if self.dry_run:
+                    self.diff(rows)
+                else:
+                    self.added += self.write(rows)
+                self.processed += len(batch)
+                if time.monotonic() - last_report >= options["progress_interval"]:
+                    last_report = time.monotonic()
+                    self.report_progress(last_report - started)
 
+        self.report_progress(time.monotonic() - started)
+        if not self.dry_run and self.added:
+            ingredient_index.invalidate()
+        self.stdout.write(
+            f"{self.added} ingredients {'would be ' if self.dry_run else ''}added, "
+            f"{self.processed - self.added - self.skipped} were already loaded, "
+            f"{self.skipped} rows skipped"
+        )
         self.stdout.write("Process finished")
+
+    def report_progress(self, elapsed):
+        rate = self.processed / elapsed if elapsed else 0
+        self.stdout.write(f"{self.processed} rows processed, {rate:.0f} rows/sec")
+
+    def get_unit_id(self, name):
+        unit_id = self.units.get(name)
+        if unit_id is None and name not in self.units:
+            if self.dry_run:
+                self.stdout.write(f"+ measurement unit {name}")
+            else:
+                unit_id = MeasurementUnit.objects.create(name=name).id
+            self.units[name] = unit_id
+        return unit_id
+
+    def parse(self, batch):
+        """Map unique ``(name, measurement unit id)`` pairs of the batch
+        to their CSV entries.
+
+        In dry run mode units that don't exist yet get ``None`` as id.
+        """
+        rows = {}
+        for entry in batch:
+            if (
+                len(entry) != 2
+                or not 0 < len(entry[0]) <= NAME_MAX_LENGTH
+                or not 0 < len(entry[1]) <= UNIT_MAX_LENGTH
+            ):
+                self.stderr.write(f"Entry {entry} was skipped")
+                self.skipped += 1
+                continue
+            rows.setdefault((entry[0], self.get_unit_id(entry[1])), entry)
+        return rows
+
+    def existing(self, rows):
+        """Return the ``(name, measurement unit id)`` pairs of ``rows``
+        that are already loaded."""
+        return set(
+            Ingredient.objects.filter(name__in={name for name, _ in rows}).values_list(
+                "name", "measurement_unit_id"
+            )
+        )
+
+    def diff(self, rows):
+        existing = self.existing(rows)
+        for key, (name, measurement_unit) in rows.items():
+            if key not in existing:
+                self.stdout.write(f"+ {name}, {measurement_unit}")
+                self.added += 1
+
+    def write(self, rows):
+        """Insert the ingredients that don't exist yet and return how
+        many were added."""
+        if connection.vendor == "postgresql":
+            return self.copy(rows)
+        existing = self.existing(rows)
+        new = [key for key in rows if key not in existing]
+        Ingredient.objects.bulk_create(
+            (
+                Ingredient(name=name, measurement_unit_id=unit_id)
+                for name, unit_id in new
+            ),
+            # Rows loaded concurrently since the lookup are left as they are
+            ignore_conflicts=True,
+        )
+        return len(new)
+
+    def copy(self, rows):
+        """Stream the batch with COPY into a temporary table and insert
+        the new ingredients from there with a single statement."""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMPORARY TABLE IF NOT EXISTS ingredient_import "
+                f"(name varchar({NAME_MAX_LENGTH}), measurement_unit_id bigint) "
+                "ON COMMIT DELETE ROWS"
+            )
+            cursor.copy_expert(
+                "COPY ingredient_import FROM STDIN WITH (FORMAT csv)", buffer
+            )
+            cursor.execute(
+                f"INSERT INTO {Ingredient._meta.db_table} (name, measurement_unit_id) "
+                "SELECT name, measurement_unit_id FROM ingredient_import "
+                "ON CONFLICT DO NOTHING"
+            )
+            return cursor.rowcount
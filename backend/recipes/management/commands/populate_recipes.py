@@ -0,0 +1,77 @@
+import json
+import os
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+
+from api.recipe_import import (READERS, DirectoryImages, RecipeImporter,
+                               guess_format)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Loads recipes from an NDJSON or CSV file with image paths. "
+        "Rows that fail validation are written to a report file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("file_path", type=str)
+        parser.add_argument(
+            "--author", required=True, help="Email of the user owning the recipes."
+        )
+        parser.add_argument(
+            "--format",
+            choices=tuple(READERS),
+            help="Input format, guessed from the file extension by default.",
+        )
+        parser.add_argument(
+            "--images-dir",
+            help="Directory image paths are relative to, "
+            "the directory of the input file by default.",
+        )
+        parser.add_argument(
+            "--report",
+            help="Where to write rejected rows, <file_path>.errors.ndjson by default.",
+        )
+        parser.add_argument("--chunk-size", type=int, help="Rows validated at once.")
+        parser.add_argument(
+            "--batch-size", type=int, help="Rows written per transaction."
+        )
+
+    def write_error(self, report, number, errors, row):
+        entry = {"line": number, "errors": errors, "row": row}
+        report.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+
+    def handle(self, *args, **options):
+        file_path = options["file_path"]
+        author = User.objects.filter(email=options["author"]).first()
+        if author is None:
+            raise CommandError(f"User {options['author']} does not exist")
+        import_format = options["format"] or guess_format(file_path)
+        images_dir = options["images_dir"] or os.path.dirname(
+            os.path.abspath(file_path)
+        )
+        report_path = options["report"] or f"{file_path}.errors.ndjson"
+
+        self.stdout.write("Process started")
+        with open(report_path, "w", encoding="utf-8") as report:
+            importer = RecipeImporter(
+                author,
+                DirectoryImages(images_dir),
+                partial(self.write_error, report),
+                chunk_size=options["chunk_size"],
+                batch_size=options["batch_size"],
+            )
+            with open(file_path, "r", newline="", encoding="utf-8") as file:
+                self.stdout.write(f"Opened {file_path}")
+                created, failed = importer.run(READERS[import_format](file))
+
+        self.stdout.write(f"{created} recipes were created")
+        if failed:
+            self.stdout.write(f"{failed} rows were rejected, see {report_path}")
+        else:
+            os.remove(report_path)
+        self.stdout.write("Process finished")
@@ -0,0 +1,16 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from recipes.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the full-text search documents of every recipe, e.g. "
+        "after changing SEARCH_CONFIG."
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            indexed = rebuild_index()
+        self.stdout.write(f"{indexed} recipes indexed")
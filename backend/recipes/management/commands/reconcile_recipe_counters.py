@@ -0,0 +1,26 @@
+from django.core.management import BaseCommand
+
+from recipes.counters import COUNTERS, actual_count, reconcile_counter
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        "Recounts favourites and shopping carts of every recipe and fixes "
+        "the stored counters that drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many counters are wrong.",
+        )
+
+    def handle(self, *args, **options):
+        for field in COUNTERS:
+            if options["dry_run"]:
+                wrong = Recipe.objects.exclude(**{field: actual_count(field)}).count()
+                self.stdout.write(f"{field}: {wrong} recipes would be fixed")
+            else:
+                self.stdout.write(f"{field}: {reconcile_counter(field)} recipes fixed")
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management import BaseCommand
+
+from recipes.models import TrendingRecipe
+from recipes.trending import refresh_trending
+
+
+class Command(BaseCommand):
+    help = (
+        "Folds the queued favourite and shopping cart events into the "
+        "trending recipes ranking. Meant to run every few minutes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Keep running, refreshing every this many seconds.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = refresh_trending()
+            self.stdout.write(
+                f"{processed} events processed, "
+                f"{TrendingRecipe.objects.count()} recipes ranked"
+            )
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,45 @@
+import asyncio
+import statistics
+import time
+
+
+async def fetch(host, port, path, headers=None, client_delay=0):
+    """Send a GET request on a new connection and read the response.
+
+    Returns the status code, or None if the connection failed, and the
+    milliseconds until the response was read. With ``client_delay`` the
+    request is sent in two halves that many seconds apart, as slow
+    clients do.
+    """
+    lines = [f"GET {path} HTTP/1.1", f"Host: {host}", "Connection: close"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    request = ("\r\n".join(lines) + "\r\n\r\n").encode()
+    half = len(request) // 2
+    start = time.perf_counter()
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(request[:half])
+        await writer.drain()
+        if client_delay:
+            await asyncio.sleep(client_delay)
+        writer.write(request[half:])
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        writer.close()
+    except OSError:
+        return None, (time.perf_counter() - start) * 1000
+    elapsed = (time.perf_counter() - start) * 1000
+    try:
+        return int(status_line.split()[1]), elapsed
+    except (IndexError, ValueError):
+        return None, elapsed
+
+
+def percentiles(timings, *points):
+    """Return the given percentiles of ``timings``, or None for each if
+    there are fewer than two."""
+    if len(timings) < 2:
+        return (None,) * len(points)
+    cuts = statistics.quantiles(timings, n=100)
+    return tuple(cuts[point - 1] for point in points)
@@ -0,0 +1,24 @@
+# Generated by Django 4.0.3 on 2026-10-18 03:25
+
+from django.db import migrations, models
+
+
+def set_updated_to_created(apps, schema_editor):
+    recipe_model = apps.get_model("recipes", "Recipe")
+    recipe_model.objects.update(updated=models.F("created"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0003_alter_ingredient_options_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="updated",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(set_updated_to_created, migrations.RunPython.noop),
+    ]
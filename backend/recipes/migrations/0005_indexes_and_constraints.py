@@ -0,0 +1,59 @@
+# Generated by Django 4.0.3 on 2026-10-18 03:28
+
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+
+def merge_duplicate_entries(apps, schema_editor):
+    """Sum the amounts of repeated ingredients into the first entry."""
+    entry_model = apps.get_model("recipes", "RecipeIngredientEntry")
+    duplicates = (
+        entry_model.objects.values("recipe", "ingredient")
+        .annotate(count=models.Count("id"))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates:
+        entries = list(
+            entry_model.objects.filter(
+                recipe=duplicate["recipe"], ingredient=duplicate["ingredient"]
+            ).order_by("id")
+        )
+        first = entries[0]
+        first.amount = sum(entry.amount for entry in entries)
+        first.save(update_fields=("amount",))
+        entry_model.objects.filter(id__in=[entry.id for entry in entries[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0004_recipe_updated"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="ingredient",
+            unique_together=set(),
+        ),
+        migrations.AddIndex(
+            model_name="ingredient",
+            index=models.Index(Lower("name"), name="ingredient_lower_name_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(fields=["-created", "id"], name="recipe_created_id_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="ingredient",
+            constraint=models.UniqueConstraint(
+                fields=("name", "measurement_unit"), name="unique_ingredient_unit"
+            ),
+        ),
+        migrations.RunPython(merge_duplicate_entries, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="recipeingrediententry",
+            constraint=models.UniqueConstraint(
+                fields=("recipe", "ingredient"), name="unique_recipe_ingredient"
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.0.3 on 2026-10-18 03:45
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_relations(apps, schema_editor):
+    recipe_model = apps.get_model("recipes", "Recipe")
+    user_model = apps.get_model("users", "User")
+    counters = {
+        "favourites_count": user_model.favourite.through,
+        "in_carts_count": user_model.shopping_list.through,
+    }
+    recipe_model.objects.update(
+        **{
+            field: Coalesce(
+                Subquery(
+                    through.objects.filter(recipe=OuterRef("pk"))
+                    .order_by()
+                    .values("recipe")
+                    .annotate(count=Count("pk"))
+                    .values("count")
+                ),
+                0,
+            )
+            for field, through in counters.items()
+        }
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0005_indexes_and_constraints"),
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="favourites_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="in_carts_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["-favourites_count", "-created", "id"],
+                name="recipe_favourites_idx",
+            ),
+        ),
+        migrations.RunPython(count_relations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.0.3 on 2026-10-18 03:47
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0006_recipe_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecipeEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.PositiveSmallIntegerField(
+                        choices=[(1, "Favourite"), (2, "Shopping Cart")]
+                    ),
+                ),
+                ("weight", models.PositiveIntegerField(default=1)),
+                ("created", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="TrendingRecipe",
+            fields=[
+                (
+                    "recipe",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="trending",
+                        serialize=False,
+                        to="recipes.recipe",
+                    ),
+                ),
+                ("score", models.FloatField()),
+                ("refreshed", models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="trendingrecipe",
+            index=models.Index(
+                fields=["-score", "recipe"], name="trending_score_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipeevent",
+            name="recipe",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="recipes.recipe",
+            ),
+        ),
+    ]
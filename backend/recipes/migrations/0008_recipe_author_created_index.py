@@ -0,0 +1,19 @@
+# Generated by Django 4.0.3 on 2026-10-18 03:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0007_trending"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["author", "-created", "id"], name="recipe_author_created_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.db import migrations
+
+SQLITE_FORWARD = (
+    "CREATE VIRTUAL TABLE recipes_recipe_fts USING fts5("
+    "name, ingredients, text, tokenize='unicode61 remove_diacritics 2')",
+    # Weights of the name, ingredients and text columns in bm25()
+    "INSERT INTO recipes_recipe_fts (recipes_recipe_fts, rank) "
+    "VALUES ('rank', 'bm25(10.0, 5.0, 1.0)')",
+    "INSERT INTO recipes_recipe_fts (rowid, name, ingredients, text) "
+    "SELECT r.id, r.name, COALESCE(("
+    "SELECT group_concat(i.name, ' ') FROM recipes_recipeingrediententry e "
+    "INNER JOIN recipes_ingredient i ON i.id = e.ingredient_id "
+    "WHERE e.recipe_id = r.id), ''), r.text FROM recipes_recipe r",
+)
+SQLITE_BACKWARD = ("DROP TABLE recipes_recipe_fts",)
+
+POSTGRESQL_FORWARD = (
+    "ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector",
+    "CREATE INDEX recipe_search_idx ON recipes_recipe USING GIN (search_vector)",
+    "UPDATE recipes_recipe r SET search_vector = "
+    "setweight(to_tsvector(%(config)s::regconfig, r.name), 'A') || "
+    "setweight(to_tsvector(%(config)s::regconfig, COALESCE(("
+    "SELECT string_agg(i.name, ' ') FROM recipes_recipeingrediententry e "
+    "INNER JOIN recipes_ingredient i ON i.id = e.ingredient_id "
+    "WHERE e.recipe_id = r.id), '')), 'B') || "
+    "setweight(to_tsvector(%(config)s::regconfig, r.text), 'C')",
+)
+POSTGRESQL_BACKWARD = ("ALTER TABLE recipes_recipe DROP COLUMN search_vector",)
+
+
+def _execute(schema_editor, statements, params=None):
+    for statement in statements:
+        schema_editor.execute(statement, params)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        _execute(schema_editor, SQLITE_FORWARD)
+    elif vendor == "postgresql":
+        _execute(schema_editor, POSTGRESQL_FORWARD, {"config": settings.SEARCH_CONFIG})
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        _execute(schema_editor, SQLITE_BACKWARD)
+    elif vendor == "postgresql":
+        _execute(schema_editor, POSTGRESQL_BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0008_recipe_author_created_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
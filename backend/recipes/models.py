@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
 
 from users.models import get_deleted_user
 
@@ -38,7 +40,12 @@ class Ingredient(models.Model):
         verbose_name = "Ingredient"
         verbose_name_plural = "Ingredients"
         ordering = ("name",)
-        unique_together = ("name", "measurement_unit")
+        constraints = (
+            models.UniqueConstraint(
+                fields=("name", "measurement_unit"), name="unique_ingredient_unit"
+            ),
+        )
+        indexes = (models.Index(Lower("name"), name="ingredient_lower_name_idx"),)
 
     def __str__(self):
         return self.name
@@ -55,11 +62,21 @@ class RecipeIngredientEntry(models.Model):
         verbose_name = "Recipe ingredient entry"
         verbose_name_plural = "Recipe ingredient entries"
         ordering = ("id",)
+        constraints = (
+            models.UniqueConstraint(
+                fields=("recipe", "ingredient"), name="unique_recipe_ingredient"
+            ),
+        )
 
     def __str__(self):
         return self.ingredient.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    def touch(self):
+        return self.update(updated=timezone.now())
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         get_user_model(), on_delete=models.SET(get_deleted_user), related_name="recipes"
@@ -73,15 +90,64 @@ class Recipe(models.Model):
     text = models.TextField()
     cooking_time = models.PositiveSmallIntegerField()
     created = models.DateTimeField(auto_now_add=True)
+    # Also bumped when ingredient entries, tags or favourites change,
+    # see recipes.signals
+    updated = models.DateTimeField(auto_now=True)
+    # Kept up to date by recipes.signals, see also reconcile_recipe_counters
+    favourites_count = models.PositiveIntegerField(default=0, editable=False)
+    in_carts_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Recipe"
         verbose_name_plural = "Recipes"
         ordering = ("-created",)
+        # Serve the default ordering and keyset pagination on (-created, id),
+        # the same per author for the followed authors feed, and
+        # ?ordering=-favourites_count with the same tie-breakers
+        indexes = (
+            models.Index(fields=("-created", "id"), name="recipe_created_id_idx"),
+            models.Index(
+                fields=("author", "-created", "id"), name="recipe_author_created_idx"
+            ),
+            models.Index(
+                fields=("-favourites_count", "-created", "id"),
+                name="recipe_favourites_idx",
+            ),
+        )
 
     def __str__(self):
         return self.name
 
-    @property
-    def times_in_favourite(self):
-        return self.in_favourites.count()
+
+class RecipeEvent(models.Model):
+    """A recipe added to favourites or shopping carts, queued until
+    refresh_trending folds it into the ranking."""
+
+    class Kind(models.IntegerChoices):
+        FAVOURITE = 1
+        SHOPPING_CART = 2
+
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name="+")
+    kind = models.PositiveSmallIntegerField(choices=Kind.choices)
+    # Number of users adding the recipe at once
+    weight = models.PositiveIntegerField(default=1)
+    created = models.DateTimeField(default=timezone.now)
+
+
+class TrendingRecipe(models.Model):
+    """Exponentially decayed popularity of recently added recipes,
+    see recipes.trending."""
+
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.CASCADE, primary_key=True, related_name="trending"
+    )
+    score = models.FloatField()
+    # When the score was last decayed, the same for every row
+    refreshed = models.DateTimeField()
+
+    class Meta:
+        indexes = (
+            models.Index(fields=("-score", "recipe"), name="trending_score_idx"),
+        )
@@ -0,0 +1,89 @@
+import io
+import posixpath
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+RENDITIONS_DIR = "renditions"
+EXTENSIONS = {"WEBP": "webp", "JPEG": "jpg"}
+
+
+@lru_cache(maxsize=None)
+def get_format():
+    image_format = settings.RECIPE_IMAGE_RENDITION_FORMAT
+    if image_format == "WEBP" and not features.check("webp"):
+        return "JPEG"
+    return image_format
+
+
+def rendition_name(image_name, variant):
+    """Storage name of a variant of the image, derived from the image
+    name alone so URLs are built without touching the storage."""
+    return f"{RENDITIONS_DIR}/{image_name}.{variant}.{EXTENSIONS[get_format()]}"
+
+
+def rendition_urls(image_name):
+    return {
+        variant: default_storage.url(rendition_name(image_name, variant))
+        for variant in settings.RECIPE_IMAGE_RENDITIONS
+    }
+
+
+def parse_rendition_name(name):
+    """Return ``(image name, variant)`` for a valid rendition name
+    relative to ``RENDITIONS_DIR`` or ``None``."""
+    image_name, _, suffix = name.rpartition(".")
+    image_name, _, variant = image_name.rpartition(".")
+    if (
+        suffix != EXTENSIONS[get_format()]
+        or variant not in settings.RECIPE_IMAGE_RENDITIONS
+        or not image_name
+        or posixpath.normpath(image_name) != image_name
+        or image_name.startswith(("/", "../", f"{RENDITIONS_DIR}/"))
+    ):
+        return None
+    return image_name, variant
+
+
+def _encode(image, image_format):
+    buffer = io.BytesIO()
+    if image_format == "JPEG":
+        image.convert("RGB").save(buffer, "JPEG", quality=82, optimize=True)
+    else:
+        image.save(buffer, "WEBP", quality=80, method=4)
+    return buffer.getvalue()
+
+
+def generate_renditions(image_name):
+    """Write the missing variants of the image, the source is decoded
+    once for all of them."""
+    image_format = get_format()
+    missing = {
+        variant: size
+        for variant, size in settings.RECIPE_IMAGE_RENDITIONS.items()
+        if not default_storage.exists(rendition_name(image_name, variant))
+    }
+    if not missing:
+        return
+    with default_storage.open(image_name) as file, Image.open(file) as source:
+        # JPEG sources are decoded at the smallest scale still large enough
+        largest = max(missing.values())
+        source.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(source)
+        image = image.convert(
+            "RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB"
+        )
+        # Each variant is scaled down from the previous, larger one
+        for variant, size in sorted(missing.items(), key=lambda item: -item[1]):
+            image = image.copy()
+            image.thumbnail((size, size), Image.LANCZOS)
+            name = rendition_name(image_name, variant)
+            stored = default_storage.save(
+                name, ContentFile(_encode(image, image_format))
+            )
+            if stored != name:
+                # Generated concurrently, the first file is kept
+                default_storage.delete(stored)
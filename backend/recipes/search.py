@@ -0,0 +1,115 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+from .models import Ingredient, Recipe, RecipeIngredientEntry
+
+# SQLite keeps the documents in an FTS5 table with the recipe id as
+# rowid, PostgreSQL in a tsvector column of the recipe table. Both are
+# created by migration 0009_search.
+FTS_TABLE = "recipes_recipe_fts"
+SEARCH_COLUMN = "search_vector"
+CHUNK_SIZE = 500
+WORD = re.compile(r"\w+")
+
+RECIPE = Recipe._meta.db_table
+ENTRY = RecipeIngredientEntry._meta.db_table
+INGREDIENT = Ingredient._meta.db_table
+
+
+# Ingredient names of the recipe aliased as r
+INGREDIENT_NAMES = (
+    "(SELECT {aggregate} FROM "
+    f"{ENTRY} e INNER JOIN {INGREDIENT} i ON i.id = e.ingredient_id "
+    "WHERE e.recipe_id = r.id)"
+)
+SQLITE_INGREDIENT_NAMES = INGREDIENT_NAMES.format(aggregate="group_concat(i.name, ' ')")
+POSTGRESQL_INGREDIENT_NAMES = INGREDIENT_NAMES.format(
+    aggregate="string_agg(i.name, ' ')"
+)
+
+
+def index_recipes(recipe_ids):
+    """Rebuild the search documents of the recipes from their name,
+    ingredient names and text. Deleted recipes leave the index."""
+    recipe_ids = list(recipe_ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(recipe_ids), CHUNK_SIZE):
+            chunk = recipe_ids[start:start + CHUNK_SIZE]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            if connection.vendor == "sqlite":
+                cursor.execute(
+                    f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", chunk
+                )
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE} (rowid, name, ingredients, text) "
+                    f"SELECT r.id, r.name, "
+                    f"COALESCE({SQLITE_INGREDIENT_NAMES}, ''), "
+                    f"r.text FROM {RECIPE} r WHERE r.id IN ({placeholders})",
+                    chunk,
+                )
+            elif connection.vendor == "postgresql":
+                config = settings.SEARCH_CONFIG
+                cursor.execute(
+                    f"UPDATE {RECIPE} r SET {SEARCH_COLUMN} = "
+                    "setweight(to_tsvector(%s::regconfig, r.name), 'A') || "
+                    "setweight(to_tsvector(%s::regconfig, COALESCE("
+                    f"{POSTGRESQL_INGREDIENT_NAMES}, '')), 'B') || "
+                    "setweight(to_tsvector(%s::regconfig, r.text), 'C') "
+                    f"WHERE r.id IN ({placeholders})",
+                    [config, config, config, *chunk],
+                )
+
+
+def rebuild_index():
+    """Index every recipe from scratch. Returns the number of recipes."""
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    recipe_ids = list(Recipe.objects.values_list("id", flat=True))
+    index_recipes(recipe_ids)
+    return len(recipe_ids)
+
+
+def search_recipes(queryset, query):
+    """Filter ``queryset`` to recipes matching ``query`` and order them
+    by relevance, annotated as ``search_rank`` (higher is better).
+
+    The name weighs more than ingredient names, which weigh more than
+    the text. On SQLite every word matches as a prefix.
+    """
+    if connection.vendor == "postgresql":
+        tsquery = "websearch_to_tsquery(%s::regconfig, %s)"
+        params = (settings.SEARCH_CONFIG, query)
+        match = RawSQL(f"{RECIPE}.{SEARCH_COLUMN} @@ {tsquery}", params, BooleanField())
+        rank = RawSQL(
+            f"ts_rank({RECIPE}.{SEARCH_COLUMN}, {tsquery})", params, FloatField()
+        )
+    elif connection.vendor == "sqlite":
+        words = WORD.findall(query)
+        if not words:
+            return queryset.none()
+        params = (" ".join(f'"{word}"*' for word in words),)
+        match = RawSQL(
+            f"{RECIPE}.id IN "
+            f"(SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)",
+            params,
+            BooleanField(),
+        )
+        # bm25() is lower for better matches, weights are set on the table
+        rank = RawSQL(
+            f"(SELECT -rank FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = {RECIPE}.id)",
+            params,
+            FloatField(),
+        )
+    else:
+        return queryset.filter(name__icontains=query)
+    return (
+        queryset.filter(match)
+        .annotate(search_rank=rank)
+        .order_by("-search_rank", "-created", "id")
+    )
@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from PIL import Image
+
+from .counters import count_relation_change, remove_user
+from .models import Ingredient, Recipe, RecipeEvent, RecipeIngredientEntry
+from .renditions import generate_renditions
+from .search import index_recipes
+from .transactions import on_commit_once
+from .trending import record_relation_change
+
+User = get_user_model()
+
+
+def _touch_changed_recipes(instance, action, reverse, pk_set):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        Recipe.objects.filter(pk=instance.pk).touch()
+    elif pk_set is not None:
+        Recipe.objects.filter(pk__in=pk_set).touch()
+    else:
+        instance.recipe_set.all().touch()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    _touch_changed_recipes(instance, action, reverse, pk_set)
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_ingredients_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    _touch_changed_recipes(instance, action, reverse, pk_set)
+
+
+@receiver(post_save, sender=RecipeIngredientEntry)
+@receiver(post_delete, sender=RecipeIngredientEntry)
+def ingredient_entry_changed(sender, instance, raw=False, **kwargs):
+    on_commit_once(index_recipes, (instance.recipe_id,))
+    if raw:
+        return
+    Recipe.objects.filter(pk=instance.recipe_id).touch()
+
+
+def _generate_renditions(image_name):
+    try:
+        generate_renditions(image_name)
+    except (OSError, Image.DecompressionBombError):
+        # The recipe is saved anyway, variants are retried on first request
+        pass
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, raw=False, **kwargs):
+    on_commit_once(index_recipes, (instance.pk,))
+    if raw or not instance.image:
+        return
+    image_name = instance.image.name
+    transaction.on_commit(lambda: _generate_renditions(image_name))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    on_commit_once(index_recipes, (instance.pk,))
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_saved(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    recipe_ids = RecipeIngredientEntry.objects.filter(ingredient=instance).values_list(
+        "recipe_id", flat=True
+    )
+    on_commit_once(index_recipes, recipe_ids)
+
+
+@receiver(m2m_changed, sender=User.favourite.through)
+def favourites_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    count_relation_change("favourites_count", instance, action, reverse, pk_set)
+    record_relation_change(
+        RecipeEvent.Kind.FAVOURITE, instance, action, reverse, pk_set
+    )
+
+
+@receiver(m2m_changed, sender=User.shopping_list.through)
+def shopping_list_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    count_relation_change("in_carts_count", instance, action, reverse, pk_set)
+    record_relation_change(
+        RecipeEvent.Kind.SHOPPING_CART, instance, action, reverse, pk_set
+    )
+
+
+@receiver(pre_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    # The relation rows are deleted by cascade, without m2m_changed
+    remove_user("favourites_count", instance)
+    remove_user("in_carts_count", instance)
@@ -0,0 +1,35 @@
+import threading
+import weakref
+
+from django.db import transaction
+
+_pending = threading.local()
+
+
+class _PendingCall:
+    def __init__(self, func):
+        self.func = func
+        self.ids = set()
+
+    def __call__(self):
+        _pending.calls.pop(self.func, None)
+        self.func(self.ids)
+
+
+def on_commit_once(func, ids):
+    """Call ``func`` once the current transaction commits, with the ids
+    passed by every call made for it in that transaction.
+
+    Only the on_commit callback holds the pending call, so it's gone if
+    the transaction rolls back. Outside transactions ``func`` runs now.
+    """
+    if not hasattr(_pending, "calls"):
+        _pending.calls = weakref.WeakValueDictionary()
+    pending = _pending.calls.get(func)
+    if pending is None:
+        pending = _PendingCall(func)
+        pending.ids.update(ids)
+        _pending.calls[func] = pending
+        transaction.on_commit(pending)
+    else:
+        pending.ids.update(ids)
@@ -0,0 +1,84 @@
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .models import RecipeEvent, TrendingRecipe
+
+DELETE_BATCH_SIZE = 500
+
+
+def record_relation_change(kind, instance, action, reverse, pk_set):
+    """Queue an event for recipes added to favourites or carts.
+
+    Only additions count: a recipe leaving a shopping cart was most
+    likely cooked, and the score of recipes nobody adds decays anyway.
+    """
+    if action != "post_add" or not pk_set:
+        return
+    if reverse:
+        events = (RecipeEvent(recipe_id=instance.pk, kind=kind, weight=len(pk_set)),)
+    else:
+        events = (RecipeEvent(recipe_id=pk, kind=kind) for pk in pk_set)
+    RecipeEvent.objects.bulk_create(events)
+
+
+def refresh_trending(now=None):
+    """Decay the ranking to ``now`` and fold the queued events into it.
+
+    Every score is ``sum(weight * 2 ** (-age / TRENDING_HALF_LIFE))``
+    over the events of its recipe; decaying the stored scores by the
+    time since the last refresh keeps that true without revisiting old
+    events. Returns the number of events processed.
+    """
+    now = now or timezone.now()
+    decay = math.log(2) / settings.TRENDING_HALF_LIFE
+    weights = {
+        kind: settings.TRENDING_EVENT_WEIGHTS[kind.name] for kind in RecipeEvent.Kind
+    }
+    with transaction.atomic():
+        last_event = RecipeEvent.objects.aggregate(last=Max("id"))["last"]
+        refreshed = TrendingRecipe.objects.aggregate(last=Max("refreshed"))["last"]
+        if refreshed is not None:
+            elapsed = max((now - refreshed).total_seconds(), 0)
+            TrendingRecipe.objects.update(
+                score=F("score") * math.exp(-decay * elapsed), refreshed=now
+            )
+        if last_event is None:
+            processed = 0
+        else:
+            events = RecipeEvent.objects.filter(id__lte=last_event)
+            gains = defaultdict(float)
+            # Events committed late can get an id below last_event after
+            # the read, so only the ones folded in here are deleted
+            event_ids = []
+            for event_id, recipe_id, kind, weight, created in events.values_list(
+                "id", "recipe_id", "kind", "weight", "created"
+            ).iterator():
+                age = max((now - created).total_seconds(), 0)
+                gains[recipe_id] += weights[kind] * weight * math.exp(-decay * age)
+                event_ids.append(event_id)
+            processed = len(event_ids)
+            ranked = TrendingRecipe.objects.in_bulk(gains)
+            for recipe_id, ranking in ranked.items():
+                ranking.score += gains[recipe_id]
+            TrendingRecipe.objects.bulk_update(
+                ranked.values(), ("score",), batch_size=500
+            )
+            TrendingRecipe.objects.bulk_create(
+                (
+                    TrendingRecipe(recipe_id=recipe_id, score=gain, refreshed=now)
+                    for recipe_id, gain in gains.items()
+                    if recipe_id not in ranked
+                ),
+                batch_size=500,
+            )
+            for start in range(0, processed, DELETE_BATCH_SIZE):
+                RecipeEvent.objects.filter(
+                    id__in=event_ids[start:start + DELETE_BATCH_SIZE]
+                ).delete()
+        TrendingRecipe.objects.filter(score__lt=settings.TRENDING_MIN_SCORE).delete()
+    return processed
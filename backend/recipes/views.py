@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_safe
+from PIL import Image
+
+from .renditions import (RENDITIONS_DIR, generate_renditions,
+                         parse_rendition_name)
+
+
+@require_safe
+def rendition(request, name):
+    """Generate a missing image rendition on its first request.
+
+    The web server serves existing renditions from the media directory
+    and falls back to this view, later requests never reach Django.
+    """
+    parsed = parse_rendition_name(name)
+    if parsed is None or not default_storage.exists(parsed[0]):
+        raise Http404
+    try:
+        generate_renditions(parsed[0])
+    except (OSError, Image.DecompressionBombError):
+        raise Http404
+    response = FileResponse(default_storage.open(f"{RENDITIONS_DIR}/{name}"))
+    patch_cache_control(
+        response, public=True, max_age=settings.RECIPE_IMAGE_RENDITION_MAX_AGE
+    )
+    return response